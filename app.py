@@ -1,15 +1,46 @@
 import streamlit as st
 import os
 import time
-from functools import lru_cache
 from dotenv import load_dotenv
-from lib.conversation_analyzer import ConversationAnalyzer
-from lib.email_generator import EmailGenerator
+from functools import partial
+from lib.contacts import get_default_contact_store
+from lib.email_generator import EmailCandidate, EmailVariant, rank_email_candidates
+from lib.hooks import set_error_handler, set_secret_source
+from lib.openai_client import StreamInterrupted
+from lib.registry import get_default_registry
+from lib.speculative import SpeculativeAnalyzer
+from lib.telemetry import start_metrics_server, start_trace, traced
 # Removed old validation system - now using AI Input Assistant
 
 # Load environment variables
 load_dotenv()
 
+# lib/ doesn't import Streamlit: surface its errors and read its secrets through the app
+set_error_handler(st.error)
+set_secret_source(st.secrets.get)
+
+# Fused mode analyzes the conversation and drafts the email in one LLM request
+FUSED_MODE = os.getenv("CONVOFLOW_FUSED_MODE", "").lower() in {"1", "true", "yes"}
+
+# Alternative emails drafted per click (one request); the user can switch between them for free
+EMAIL_CANDIDATES = max(1, int(os.getenv("CONVOFLOW_EMAIL_CANDIDATES", "3")))
+
+# Stream the analysis and fill in its sections as they arrive (two-request mode only)
+STREAM_ANALYSIS = os.getenv("CONVOFLOW_STREAM_ANALYSIS", "1").lower() in {"1", "true", "yes"}
+
+# Tones offered for redrafting the email from the stored analysis, and how many drafts one click may request
+VARIANT_TONES = ["Warm", "Formal", "Casual", "Concise", "Enthusiastic"]
+MAX_VARIANTS = 6
+
+# Re-analyze edited notes by sending only the changed sentences and merging the returned patch
+DELTA_ANALYSIS = os.getenv("CONVOFLOW_DELTA_ANALYSIS", "1").lower() in {"1", "true", "yes"}
+
+# Sidebar panel with the per-stage latency of the last request (can also be toggled in the sidebar)
+SHOW_LATENCY_PANEL = os.getenv("CONVOFLOW_SHOW_LATENCY", "").lower() in {"1", "true", "yes"}
+
+# Prometheus endpoint on CONVOFLOW_METRICS_PORT, started once per server process
+start_metrics_server()
+
 # Page configuration
 st.set_page_config(
     page_title="ConvoFlow - AI Networking Assistant",
@@ -52,31 +83,63 @@ def initialize_session_state():
         st.session_state.analysis_complete = False
     if 'conversation_analysis' not in st.session_state:
         st.session_state.conversation_analysis = None
+    if 'analysis_baseline' not in st.session_state:
+        # Last analyzed text and its analysis; edits to it are re-analyzed as a delta
+        st.session_state.analysis_baseline = {}
     if 'generated_email' not in st.session_state:
         st.session_state.generated_email = None
+    if 'email_candidates' not in st.session_state:
+        st.session_state.email_candidates = []
+    if 'email_variants' not in st.session_state:
+        st.session_state.email_variants = []
+    if 'speculative_analyzer' not in st.session_state:
+        # Resolved on the script thread: st.cache_resource misses on worker threads without a script context
+        analyzer = get_resources().analyzer
+        st.session_state.speculative_analyzer = SpeculativeAnalyzer(
+            partial(analyze_in_background, analyzer=analyzer, baseline=st.session_state.analysis_baseline)
+        )
+
+@st.cache_resource(show_spinner=False)
+def get_resources():
+    """Client, analyzer, generator and fused pipeline shared by every session"""
+    return get_default_registry().get()
+
+def analyze_in_background(conversation_input, analyzer, baseline=None):
+    """Run conversation analysis off the script thread for speculative prefetching"""
+    return analyze_edit(analyzer, baseline or {}, conversation_input) or analyzer.analyze(conversation_input)
+
+def analyze_edit(analyzer, baseline, conversation_input):
+    """Patch the baseline analysis of edited notes; None without a baseline, if most changed or if the patch failed"""
+    previous_text, previous_analysis = baseline.get('text'), baseline.get('analysis')
+    if not (DELTA_ANALYSIS and previous_text and previous_analysis):
+        return None
+    return analyzer.analyze_delta(previous_text, previous_analysis, conversation_input)
 
 def display_header():
     """Display application header"""
     st.markdown('<h1 style="text-align: left; margin-bottom: 20px; font-size: 1.8rem; color: #1f77b4;">ConvoFlow - AI Networking Assistant</h1>', unsafe_allow_html=True)
 
-@lru_cache(maxsize=100)
 def analyze_input_with_cache(conversation_input: str):
-    """Cached input analysis to prevent excessive API calls"""
-    from lib.input_analyzer import InputAnalyzer
-    analyzer = InputAnalyzer()
+    """Incremental input analysis that only re-scans the edited part of the text"""
+    from lib.input_analyzer import IncrementalInputAnalyzer
+    analyzer = st.session_state.get('input_analyzer')
+    if analyzer is None:
+        analyzer = IncrementalInputAnalyzer()
+        st.session_state.input_analyzer = analyzer
     return analyzer.analyze_input_quality(conversation_input)
 
+@traced("render.display_ai_assistant")
 def display_ai_assistant(conversation_input: str):
     """Display real-time AI input guidance with qualitative feedback"""
     
     if len(conversation_input.strip()) < 10:
-        return
+        return None
     
     # Get instant analysis (no debouncing needed with rule-based approach)
     analysis = analyze_input_with_cache(conversation_input)
     
     if not analysis:
-        return
+        return None
     
     with st.expander("🧠 AI Input Assistant", expanded=True):
         # Show qualitative response likelihood with emoji
@@ -103,7 +166,10 @@ def display_ai_assistant(conversation_input: str):
         # Only show improvement message if there are actual issues
         if has_issues:
             st.info("💡 You can submit now, but improving these areas will increase response rates!")
+    
+    return analysis
 
+@traced("render.display_conversation_input")
 def display_conversation_input():
     """Display conversation input section with AI guidance"""
     st.subheader("1. Describe Your Networking Conversation")
@@ -124,7 +190,11 @@ Met Sarah Chen, VP of Engineering at Databricks, at the NYC AI Founders meetup.
     
     with col2:
         # Show AI assistant for real-time guidance on the right side
-        display_ai_assistant(conversation_input)
+        input_analysis = display_ai_assistant(conversation_input)
+    
+    # Start analyzing promising input early so "Generate Email" only waits for the email
+    likelihood = input_analysis['overall_score'] if input_analysis else None
+    st.session_state.speculative_analyzer.observe(conversation_input, likelihood)
     
     # Button positioned directly under the input box (left column)
     with col1:
@@ -144,42 +214,117 @@ Met Sarah Chen, VP of Engineering at Databricks, at the NYC AI Founders meetup.
 
 def generate_email(conversation_input):
     """Generate email and analysis in one step"""
+    email = None
     with st.spinner("Generating personalized email..."):
-        # First analyze the conversation
-        analyzer = ConversationAnalyzer()
-        analysis = analyzer.analyze(conversation_input)
+        # Reuse the analysis started speculatively while the user was typing
+        analysis = st.session_state.speculative_analyzer.result_for(conversation_input)
         
         if not analysis:
-            st.error("Failed to analyze conversation. Please try again with more details.")
-            return False
+            # Edited notes: send only what changed and patch the previous analysis
+            baseline = st.session_state.analysis_baseline
+            analysis = analyze_edit(get_resources().analyzer, baseline, conversation_input)
         
-        # Store analysis
-        st.session_state.conversation_analysis = analysis
-        st.session_state.analysis_complete = True
-        
-        # Generate email
-        generator = EmailGenerator()
-        email = generator.generate_follow_up(analysis)
-        
-        if email:
-            st.session_state.generated_email = email
-            st.success("Email generated successfully!")
-            return True
-        else:
-            st.error("Failed to generate email. Please try again.")
-            return False
-
-def display_analysis_results():
-    """Display conversation analysis results in expandable section"""
-    if not st.session_state.conversation_analysis:
+        if not analysis and FUSED_MODE:
+            # Analysis and email come back from a single round-trip
+            analysis, email = get_resources().pipeline.analyze_and_generate(conversation_input)
+        elif not analysis and STREAM_ANALYSIS:
+            # Show the person, topics and strategy as each section of the analysis completes
+            analysis = stream_analysis(conversation_input)
+        elif not analysis:
+            # First analyze the conversation
+            analysis = get_resources().analyzer.analyze(conversation_input)
+    
+    if not analysis:
+        st.error("Failed to analyze conversation. Please try again with more details.")
+        return False
+    
+    # Store analysis
+    st.session_state.conversation_analysis = analysis
+    st.session_state.analysis_baseline.update(text=conversation_input, analysis=analysis)
+    st.session_state.analysis_complete = True
+    
+    if email:
+        candidates = [EmailCandidate(email)]
+    else:
+        # Stream the candidate emails from one request, showing the first as it is generated
+        generator = get_resources().generator
+        emails = render_email_stream(generator.generate_follow_up_candidates_stream(analysis, n=EMAIL_CANDIDATES))
+        candidates = rank_email_candidates(emails, analysis)
+        email = candidates[0].email if candidates else None
+    
+    if email:
+        st.session_state.email_candidates = candidates
+        st.session_state.pop('email_candidate_choice', None)  # new candidates start at the best one
+        st.session_state.email_variants = []  # drafted from the previous analysis
+        st.session_state.generated_email = email
+        # One contact entry per submitted generation; speculative and cached analyses aren't recorded
+        contacts = get_default_contact_store()
+        if contacts is not None:
+            contacts.record(analysis)
+        st.success("Email generated successfully!")
+        return True
+    else:
+        st.error("Failed to generate email. Please try again.")
+        return False
+
+@traced("render.render_email_stream")
+def render_email_stream(chunks):
+    """Render the first streamed candidate progressively and return every candidate's full text
+
+    If the stream fails partway (the error is already reported), only the
+    candidates that finished are returned, so truncated emails are never
+    ranked or stored.
+    """
+    st.subheader("2. Generated Follow-up Email")
+    placeholder = st.empty()
+    emails = {}
+    
+    try:
+        for index, chunk in chunks:
+            emails[index] = emails.get(index, "") + chunk
+            if index == 0:
+                placeholder.markdown(emails[0] + " ▌")
+    except StreamInterrupted as exc:
+        emails = {index: email for index, email in emails.items() if index in exc.finished}
+    
+    completed = [emails[index] for index in sorted(emails)]
+    placeholder.markdown(completed[0] if completed else "")
+    return completed
+
+def stream_analysis(conversation_input):
+    """Render the analysis as its sections stream in and return the final result"""
+    placeholder = st.empty()
+    analysis = None
+    
+    for update in get_resources().analyzer.analyze_stream(conversation_input):
+        with placeholder.container():
+            display_analysis_results(update.analysis, streaming=not update.complete, expanded=True)
+        if update.complete:
+            analysis = update.analysis
+    
+    return analysis
+
+@traced("render.display_analysis_results")
+def display_analysis_results(analysis=None, streaming=False, expanded=False):
+    """Display conversation analysis results in expandable section
+
+    While streaming, the section is expanded and fields that haven't arrived
+    yet show a placeholder.
+    """
+    analysis = analysis if analysis is not None else st.session_state.conversation_analysis
+    if not analysis and not streaming:
         return
     
-    analysis = st.session_state.conversation_analysis
+    def pending(label):
+        if streaming:
+            st.caption(f"⏳ {label}…")
     
-    with st.expander("🧠 Conversation Intelligence", expanded=False):
+    with st.expander("🧠 Conversation Intelligence", expanded=expanded or streaming):
         st.markdown("### Person Information")
         person = analysis.get('person', {})
-        if person.get('name') != 'Unknown':
+        if not person:
+            pending("Identifying the person")
+        elif person.get('name') != 'Unknown':
             st.markdown(f"**Name:** {person.get('name')} - {person.get('title')} at {person.get('company')}")
         
         # Key insights in columns
@@ -193,11 +338,15 @@ def display_analysis_results():
                 st.write("🤝 Personal Connections:")
                 for connection in context['personal_connections']:
                     st.write(f"  • {connection}")
+            elif 'personal_connections' not in context:
+                pending("Personal connections")
             
             if context.get('topics_discussed'):
                 st.write("💬 Topics Discussed:")
                 for topic in context['topics_discussed'][:3]:  # Show top 3
                     st.write(f"  • {topic}")
+            elif 'topics_discussed' not in context:
+                pending("Topics")
         
         with col2:
             st.markdown("**Communication Strategy:**")
@@ -209,16 +358,22 @@ def display_analysis_results():
             
             if strategy.get('recommended_tone'):
                 st.write(f"🎯 Recommended Tone: {strategy['recommended_tone']}")
+            elif 'recommended_tone' not in strategy:
+                pending("Recommended tone")
             
             if strategy.get('optimal_timing'):
                 st.write(f"⏰ Optimal Timing: {strategy['optimal_timing']}")
+            elif 'optimal_timing' not in strategy:
+                pending("Optimal timing")
 
+@traced("render.display_generated_email")
 def display_generated_email():
     """Display the generated email"""
     if not st.session_state.generated_email:
         return
     
     st.subheader("2. Generated Follow-up Email")
+    display_candidate_picker()
     
     # Display the email
     st.markdown('<div class="email-container">', unsafe_allow_html=True)
@@ -228,6 +383,71 @@ def display_generated_email():
     # Show personalization elements
     display_personalization_breakdown()
 
+def display_candidate_picker():
+    """Switch between the alternative emails from the last generation without another request"""
+    candidates = st.session_state.email_candidates
+    if len(candidates) < 2:
+        return
+    
+    labels = [
+        f"Option {index + 1} · {candidate.score} reference{'' if candidate.score == 1 else 's'}"
+        for index, candidate in enumerate(candidates)
+    ]
+    choice = st.radio(
+        "Email options (ranked by personalization)",
+        labels,
+        horizontal=True,
+        key="email_candidate_choice",
+    )
+    candidate = candidates[labels.index(choice)]
+    st.session_state.generated_email = candidate.email
+    if candidate.references:
+        st.caption("References: " + ", ".join(candidate.references))
+
+def requested_variants(tones, contexts_text):
+    """One variant per selected tone and per non-empty line of extra context, up to MAX_VARIANTS"""
+    contexts = [line.strip() for line in contexts_text.splitlines() if line.strip()]
+    variants = [EmailVariant(tone=tone) for tone in tones] + [EmailVariant(context=context) for context in contexts]
+    return list(dict.fromkeys(variants))[:MAX_VARIANTS]
+
+def generate_variants(variants):
+    """Redraft the email for each variant from the stored analysis, without analyzing again"""
+    with st.spinner(f"Drafting {len(variants)} alternative emails..."):
+        emails = get_resources().generator.generate_follow_up_variants(
+            st.session_state.conversation_analysis, variants
+        )
+    st.session_state.email_variants = [
+        (variant.label, email) for variant, email in zip(variants, emails) if email
+    ]
+    if len(st.session_state.email_variants) < len(variants):
+        st.warning("Some alternative emails could not be generated.")
+
+@traced("render.display_email_variants")
+def display_email_variants():
+    """Redraft the email in other tones or with extra context and compare the drafts side by side"""
+    if not st.session_state.conversation_analysis:
+        return
+    
+    with st.expander("🎨 Try other tones or context", expanded=bool(st.session_state.email_variants)):
+        st.caption("Drafts reuse the analysis above; only the emails are generated, all at once.")
+        tones = st.multiselect("Tones", VARIANT_TONES, key="variant_tones")
+        contexts_text = st.text_area(
+            "Extra context (one draft per line)",
+            placeholder="Mention I'll be in SF next week\nAsk about the Series B",
+            key="variant_contexts",
+        )
+        variants = requested_variants(tones, contexts_text)
+        if st.button("Draft alternatives", disabled=not variants, key="draft_variants"):
+            generate_variants(variants)
+        
+        drafts = st.session_state.email_variants
+        for start in range(0, len(drafts), 3):
+            for column, (label, email) in zip(st.columns(3), drafts[start:start + 3]):
+                with column:
+                    st.markdown(f"**{label}**")
+                    st.markdown(email)
+
+@traced("render.display_personalization_breakdown")
 def display_personalization_breakdown():
     """Show what personalization elements were used"""
     if not st.session_state.conversation_analysis:
@@ -248,6 +468,18 @@ def display_personalization_breakdown():
             for connection in context['personal_connections']:
                 st.write(f"✓ {connection}")
 
+def display_latency_panel():
+    """Show how long each stage of the last request took"""
+    trace = st.session_state.get('last_trace')
+    if trace is None:
+        st.caption("Generate an email to see where the time goes.")
+        return
+    
+    breakdown = trace.breakdown()
+    total_ms = sum(row['ms'] for row in breakdown if not row['stage'].startswith(' '))
+    st.metric("Last request", f"{total_ms / 1000:.2f}s")
+    st.table(breakdown)
+
 def main():
     """Main application function"""
     initialize_session_state()
@@ -258,13 +490,20 @@ def main():
     
     # Handle email generation when button is clicked
     if generate_button and conversation_input:
-        if generate_email(conversation_input):
+        with start_trace("generate_email") as trace:
+            generated = generate_email(conversation_input)
+        st.session_state.last_trace = trace
+        if generated:
+            # Rendering the results on the rerun is part of the same request
+            st.session_state.render_trace = trace
             st.rerun()
     
     # Display results if generation is complete
     if st.session_state.analysis_complete:
-        display_generated_email()
-        display_analysis_results()  # Now in expandable section
+        with start_trace("render", trace=st.session_state.pop('render_trace', None)):
+            display_generated_email()
+            display_email_variants()
+            display_analysis_results()  # Now in expandable section
     
     # Sidebar with instructions
     with st.sidebar:
@@ -284,6 +523,9 @@ def main():
         • Describe the conversation tone/quality
         • Include any follow-up hints they gave
         """)
+        
+        if st.checkbox("Show latency breakdown", value=SHOW_LATENCY_PANEL):
+            display_latency_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,4 +1,4 @@
 """ConvoFlow library package."""
 
-__all__ = ["OpenAIClient"]
+__all__ = ["AsyncOpenAIClient", "OpenAIClient"]
 
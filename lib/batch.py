@@ -0,0 +1,247 @@
+"""Headless batch processing: analyze conversations and draft follow-up emails.
+
+Usage::
+
+    python -m lib.batch notes.jsonl -o emails.jsonl --concurrency 8
+
+Input records are streamed from a JSONL or CSV file and run through
+``ConversationAnalyzer`` then ``EmailGenerator`` with at most ``--concurrency``
+records in flight. Results are appended to the output JSONL as they finish and
+the IDs of successful records are appended to a checkpoint file, so rerunning
+the same command after an interruption skips work that is already done (failed
+records are retried).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from .contacts import ContactStore, get_default_contact_store
+from .conversation_analyzer import ConversationAnalyzer
+from .email_generator import EmailGenerator
+from .pipeline import FusedPipeline
+from .rate_limiter import Lane, get_default_limiter, scheduling_lane
+from .registry import get_default_registry
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+
+
+@dataclass
+class BatchStats:
+    """Throughput and latency summary for a batch run."""
+
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+    def percentile(self, fraction: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> str:
+        throughput = self.processed / self.elapsed if self.elapsed else 0.0
+        return (
+            f"Processed {self.processed} records ({self.succeeded} ok, {self.failed} failed, "
+            f"{self.skipped} skipped from checkpoint) in {self.elapsed:.1f}s\n"
+            f"Throughput: {throughput:.2f} records/s\n"
+            f"Latency: p50 {self.percentile(0.5):.2f}s, p95 {self.percentile(0.95):.2f}s, "
+            f"max {max(self.latencies, default=0.0):.2f}s"
+        )
+
+
+def read_records(path: str, *, id_field: str = "id", text_field: str = "conversation") -> Iterator[Tuple[str, str]]:
+    """Stream ``(record_id, conversation_text)`` pairs from a JSONL or CSV file.
+
+    Records without ``id_field`` are identified by their 1-based position in the file.
+    """
+
+    with open(path, newline="", encoding="utf-8") as handle:
+        if path.lower().endswith(".csv"):
+            rows: Iterator[Dict[str, Any]] = csv.DictReader(handle)
+        else:
+            rows = (json.loads(line) for line in handle if line.strip())
+
+        for position, row in enumerate(rows, start=1):
+            record_id = row.get(id_field)
+            yield str(record_id if record_id not in (None, "") else position), row.get(text_field) or ""
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """Return the IDs of records already completed by a previous run."""
+
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as handle:
+        return {line.rstrip("\n") for line in handle if line.strip()}
+
+
+async def _process_record(
+    record_id: str,
+    conversation_text: str,
+    analyzer: ConversationAnalyzer,
+    generator: EmailGenerator,
+    fused: Optional[FusedPipeline],
+) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"id": record_id, "analysis": None, "email": None, "error": None}
+
+    email = None
+    if fused is not None:
+        analysis, email = await fused.analyze_and_generate_async(conversation_text)
+    else:
+        analysis = await analyzer.analyze_async(conversation_text)
+    if not analysis:
+        result["error"] = "Failed to analyze conversation"
+        return result
+
+    result["analysis"] = analysis
+    if not email:
+        email = await generator.generate_follow_up_async(analysis)
+    if not email:
+        result["error"] = "Failed to generate email"
+        return result
+
+    result["email"] = email
+    return result
+
+
+async def run_batch(
+    records: Iterator[Tuple[str, str]],
+    output: TextIO,
+    checkpoint: TextIO,
+    *,
+    completed: Optional[Set[str]] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    analyzer: Optional[ConversationAnalyzer] = None,
+    generator: Optional[EmailGenerator] = None,
+    fused: Optional[FusedPipeline] = None,
+    contacts: Optional[ContactStore] = None,
+) -> BatchStats:
+    """Process ``records`` with bounded concurrency, streaming results to ``output``.
+
+    When ``fused`` is given, each record is analyzed and drafted in one request;
+    ``generator`` is only used if the fused response lacks an email. The
+    analysis of each successful record is recorded in ``contacts``, if given.
+    """
+
+    completed = completed or set()
+    if fused is not None:
+        analyzer, generator = analyzer or fused.analyzer, generator or fused.generator
+    elif analyzer is None or generator is None:
+        resources = get_default_registry().get()
+        analyzer, generator = analyzer or resources.analyzer, generator or resources.generator
+    stats = BatchStats()
+    slots = asyncio.Semaphore(concurrency)
+    pending: Set[asyncio.Task] = set()
+    started = time.perf_counter()
+
+    async def worker(record_id: str, conversation_text: str) -> None:
+        record_started = time.perf_counter()
+        try:
+            result = await _process_record(record_id, conversation_text, analyzer, generator, fused)
+        except Exception as exc:  # pragma: no cover - defensive, clients already catch API errors
+            logger.exception("Batch record %s failed", record_id)
+            result = {"id": record_id, "analysis": None, "email": None, "error": str(exc)}
+        finally:
+            slots.release()
+
+        latency = time.perf_counter() - record_started
+        result["latency_s"] = round(latency, 3)
+        stats.latencies.append(latency)
+
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
+        if result["error"] is None:
+            stats.succeeded += 1
+            if contacts is not None:
+                contacts.record(result["analysis"])
+            checkpoint.write(record_id + "\n")
+            checkpoint.flush()
+        else:
+            stats.failed += 1
+
+    for record_id, conversation_text in records:
+        if record_id in completed:
+            stats.skipped += 1
+            continue
+        # Waiting for a free slot before reading further keeps memory bounded on huge inputs.
+        await slots.acquire()
+        # Tasks copy the current context, so their requests queue behind interactive ones.
+        with scheduling_lane(Lane.BULK):
+            task = asyncio.create_task(worker(record_id, conversation_text))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    if pending:
+        await asyncio.gather(*pending)
+
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate follow-up emails for a file of conversation notes.")
+    parser.add_argument("input", help="JSONL or CSV file of conversation notes")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file results are appended to")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Records in flight at once")
+    parser.add_argument("--id-field", default="id", help="Field holding the record ID")
+    parser.add_argument("--text-field", default="conversation", help="Field holding the conversation notes")
+    parser.add_argument("--fused", action="store_true", help="Analyze and draft each email in a single request")
+    args = parser.parse_args(argv)
+
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+    completed = load_checkpoint(checkpoint_path)
+    records = read_records(args.input, id_field=args.id_field, text_field=args.text_field)
+    contacts = get_default_contact_store()
+
+    with open(args.output, "a", encoding="utf-8") as output, open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        stats = asyncio.run(
+            run_batch(
+                records,
+                output,
+                checkpoint,
+                completed=completed,
+                concurrency=args.concurrency,
+                fused=get_default_registry().get().pipeline if args.fused else None,
+                contacts=contacts,
+            )
+        )
+
+    if contacts is not None:
+        contacts.flush()
+    print(stats.summary(), file=sys.stderr)
+    bulk = get_default_limiter().stats()["bulk"]
+    if bulk["waited"]:
+        print(
+            f"rate limited: {bulk['waited']} requests waited (avg {bulk['avg_wait_s']:.2f}s, max {bulk['max_wait_s']:.2f}s)",
+            file=sys.stderr,
+        )
+    return 0 if stats.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
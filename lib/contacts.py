@@ -0,0 +1,371 @@
+"""Persistent contact store with a full-text index over past analyses.
+
+Every analysis is recorded in a local SQLite database under a key made of
+the normalized person name and company, so "Sarah Chen" at "Databricks, Inc."
+and "sarah  chen" at "databricks" are the same contact. The ``contacts``
+table holds the latest analysis and a conversation count per contact,
+``analyses`` keeps every analysis, and an FTS5 table indexes names, titles,
+companies, topics, connections and strategy for :meth:`ContactStore.search`.
+
+:meth:`ContactStore.record` only queues the write. A background thread
+commits queued analyses in one transaction every ``flush_interval`` seconds,
+or as soon as ``batch_size`` are waiting, so interactive requests never wait on
+the disk. Reads flush first so they see every recorded analysis.
+
+Query from the command line without calling the model::
+
+    python -m lib.contacts databricks hiring     # full-text search
+    python -m lib.contacts --all > contacts.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTACTS_PATH = os.path.join(os.path.expanduser("~"), ".cache", "convoflow", "contacts.sqlite3")
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Placeholders ConversationAnalyzer fills in when the model found no person
+UNKNOWN_VALUES = frozenset({"", "unknown", "n/a", "none"})
+
+_WORD = re.compile(r"\w+")
+_COMPANY_SUFFIXES = frozenset({"inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation", "co", "gmbh"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    title TEXT NOT NULL,
+    company TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    conversations INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS contacts_last_seen ON contacts (last_seen);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    contact_key TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_contact_key ON analyses (contact_key, created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+    key UNINDEXED, name, title, company, topics, connections, strategy, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+_UPSERT = """
+INSERT INTO contacts (key, name, title, company, analysis, conversations, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?, 1, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    name = excluded.name, title = excluded.title, company = excluded.company, analysis = excluded.analysis,
+    conversations = conversations + 1, last_seen = excluded.last_seen
+"""
+
+_COLUMNS = "key, name, title, company, analysis, conversations, first_seen, last_seen"
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(unicodedata.normalize("NFKC", text).casefold())
+
+
+def contact_key(name: str, company: str = "") -> Optional[str]:
+    """Normalized ``name|company`` key, or ``None`` when the name is unknown.
+
+    Case, punctuation, whitespace and legal suffixes of the company ("Inc.",
+    "LLC", ...) are ignored.
+    """
+
+    if (name or "").strip().lower() in UNKNOWN_VALUES:
+        return None
+    company_words = [] if (company or "").strip().lower() in UNKNOWN_VALUES else _words(company)
+    while company_words and company_words[-1] in _COMPANY_SUFFIXES:
+        company_words.pop()
+    return " ".join(_words(name)) + "|" + " ".join(company_words)
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, list):
+        return " ".join(str(item) for item in value if item)
+    return str(value) if value else ""
+
+
+@dataclass
+class Contact:
+    """The latest analysis recorded for a person."""
+
+    key: str
+    name: str
+    title: str
+    company: str
+    analysis: Dict[str, Any]
+    conversations: int
+    first_seen: float
+    last_seen: float
+
+    @classmethod
+    def from_row(cls, row: Tuple[Any, ...]) -> "Contact":
+        key, name, title, company, analysis, conversations, first_seen, last_seen = row
+        return cls(key, name, title, company, json.loads(analysis), conversations, first_seen, last_seen)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ContactStore:
+    """SQLite contact store with FTS search and batched background writes, safe across threads."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CONTACTS_PATH,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.batches_written = 0
+        self._local = threading.local()
+        self._pending: List[Tuple[str, str, float]] = []  # (key, analysis JSON, recorded at)
+        self._pending_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> Optional["ContactStore"]:
+        """Build the store configured by ``CONVOFLOW_CONTACTS_*`` variables, or ``None`` if disabled."""
+
+        if os.getenv("CONVOFLOW_CONTACTS_DISABLED", "").lower() in {"1", "true", "yes"}:
+            return None
+        try:
+            return cls(os.getenv("CONVOFLOW_CONTACTS_PATH", DEFAULT_CONTACTS_PATH))
+        except (OSError, sqlite3.Error):
+            logger.warning("Contact store unavailable; continuing without it", exc_info=True)
+            return None
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads; keep one per thread.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def record(self, analysis: Dict[str, Any]) -> Optional[str]:
+        """Queue ``analysis`` for its contact and return the contact key (``None`` if the person is unknown)."""
+
+        person = analysis.get("person") or {}
+        key = contact_key(_text(person.get("name")), _text(person.get("company")))
+        if key is None:
+            return None
+        # Serialized now so later changes to the caller's dict don't leak into the store
+        document = json.dumps(analysis, ensure_ascii=False)
+        with self._pending_lock:
+            self._pending.append((key, document, time.time()))
+            full = len(self._pending) >= self.batch_size
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="contact-store-writer", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+        if full:
+            self._wakeup.set()
+        return key
+
+    def _write_loop(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                logger.warning("Contact store write failed", exc_info=True)
+
+    def flush(self) -> int:
+        """Write every queued analysis in one transaction; returns how many were written.
+
+        If the transaction fails (e.g. the database stays locked), the analyses
+        go back to the front of the queue for the next flush and the error is raised.
+        """
+
+        with self._write_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return 0
+            connection = self._connection()
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                for key, document, recorded_at in pending:
+                    self._write(connection, key, document, recorded_at)
+                connection.execute("COMMIT")
+            except BaseException:
+                if connection.in_transaction:
+                    connection.execute("ROLLBACK")
+                with self._pending_lock:
+                    self._pending[:0] = pending
+                raise
+            self.batches_written += 1
+            return len(pending)
+
+    @staticmethod
+    def _write(connection: sqlite3.Connection, key: str, document: str, recorded_at: float) -> None:
+        analysis = json.loads(document)
+        person = analysis.get("person") or {}
+        context = analysis.get("conversation_context") or {}
+        strategy = analysis.get("follow_up_strategy") or {}
+        name, title, company = (_text(person.get(field)) for field in ("name", "title", "company"))
+
+        connection.execute(_UPSERT, (key, name, title, company, document, recorded_at, recorded_at))
+        connection.execute(
+            "INSERT INTO analyses (contact_key, analysis, created_at) VALUES (?, ?, ?)", (key, document, recorded_at)
+        )
+        connection.execute("DELETE FROM contacts_fts WHERE key = ?", (key,))
+        connection.execute(
+            "INSERT INTO contacts_fts (key, name, title, company, topics, connections, strategy)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                name,
+                title,
+                company,
+                _text(context.get("topics_discussed")) + " " + _text(context.get("opportunities_expressed")),
+                _text(context.get("personal_connections")),
+                " ".join(_text(value) for value in strategy.values()),
+            ),
+        )
+
+    def get(self, name: str, company: str = "") -> Optional[Contact]:
+        """Return the contact for ``name`` at ``company`` (matched on the normalized key)."""
+
+        key = contact_key(name, company)
+        if key is None:
+            return None
+        self.flush()
+        row = self._connection().execute(f"SELECT {_COLUMNS} FROM contacts WHERE key = ?", (key,)).fetchone()
+        return Contact.from_row(row) if row else None
+
+    def history(self, name: str, company: str = "") -> List[Dict[str, Any]]:
+        """Every analysis recorded for the contact, oldest first."""
+
+        key = contact_key(name, company)
+        if key is None:
+            return []
+        self.flush()
+        rows = self._connection().execute(
+            "SELECT analysis FROM analyses WHERE contact_key = ? ORDER BY created_at, id", (key,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def search(self, query: str, limit: int = 20) -> List[Contact]:
+        """Contacts matching every word of ``query`` in any indexed field, best match first.
+
+        Words are matched as prefixes ("datab" finds Databricks); FTS operators
+        in the query are treated as plain words.
+        """
+
+        words = _words(query)
+        if not words:
+            return []
+        self.flush()
+        match = " ".join(f'"{word}"*' for word in words)
+        rows = self._connection().execute(
+            f"SELECT {', '.join('c.' + column for column in _COLUMNS.split(', '))} FROM contacts_fts"
+            " JOIN contacts AS c ON c.key = contacts_fts.key WHERE contacts_fts MATCH ? ORDER BY rank LIMIT ?",
+            (match, limit),
+        ).fetchall()
+        return [Contact.from_row(row) for row in rows]
+
+    def iter_contacts(self, batch: int = 500) -> Iterator[Contact]:
+        """Every contact, most recently seen first, read ``batch`` rows at a time."""
+
+        self.flush()
+        cursor = self._connection().execute(f"SELECT {_COLUMNS} FROM contacts ORDER BY last_seen DESC")
+        while True:
+            rows = cursor.fetchmany(batch)
+            if not rows:
+                return
+            for row in rows:
+                yield Contact.from_row(row)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contact and analysis counts plus writes still queued."""
+
+        connection = self._connection()
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "contacts": connection.execute("SELECT COUNT(*) FROM contacts").fetchone()[0],
+            "analyses": connection.execute("SELECT COUNT(*) FROM analyses").fetchone()[0],
+            "pending": pending,
+            "batches_written": self.batches_written,
+        }
+
+    def clear(self) -> None:
+        """Remove every contact and analysis, including queued ones."""
+
+        with self._pending_lock:
+            self._pending = []
+        connection = self._connection()
+        connection.executescript("DELETE FROM contacts; DELETE FROM analyses; DELETE FROM contacts_fts;")
+
+
+_default_store: Optional[ContactStore] = None
+_default_store_loaded = False
+_default_store_lock = threading.Lock()
+
+
+def get_default_contact_store() -> Optional[ContactStore]:
+    """Return the process-wide store configured from the environment."""
+
+    global _default_store, _default_store_loaded
+    with _default_store_lock:
+        if not _default_store_loaded:
+            _default_store = ContactStore.from_env()
+            _default_store_loaded = True
+        return _default_store
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Search or export recorded contacts as JSONL.")
+    parser.add_argument("query", nargs="*", help="Words to search for in names, companies, topics and strategy")
+    parser.add_argument("--all", action="store_true", help="Export every contact instead of searching")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum search results")
+    parser.add_argument("--path", default=os.getenv("CONVOFLOW_CONTACTS_PATH", DEFAULT_CONTACTS_PATH))
+    args = parser.parse_args(argv)
+
+    if not args.all and not args.query:
+        parser.error("give a search query or --all")
+
+    store = ContactStore(args.path)
+    contacts = store.iter_contacts() if args.all else store.search(" ".join(args.query), limit=args.limit)
+    for contact in contacts:
+        print(json.dumps(contact.to_dict(), ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,268 @@
-from typing import Dict, Any, Optional
-from .openai_client import OpenAIClient
-from utils.prompts import CONVERSATION_ANALYSIS_PROMPT
+import copy
+import difflib
+import hashlib
+import json
+import logging
+import re
+from typing import Dict, Any, Iterator, List, NamedTuple, Optional
+from .hooks import report_error
+from .near_duplicate import NearDuplicateIndex, normalize_words
+from .openai_client import AsyncOpenAIClient, OpenAIClient, StreamInterrupted
+from .partial_json import IncrementalJSONParser
+from .schema import SchemaError, compile_schema
+from .telemetry import traced
+from utils.prompts import (
+    ANALYSIS_DELTA_PROMPT,
+    ANALYSIS_PATCH_SCHEMA,
+    CONVERSATION_ANALYSIS_PROMPT,
+    CONVERSATION_ANALYSIS_SCHEMA,
+)
+
+# Compiled once; coerces wrongly typed fields instead of failing the request
+ANALYSIS_VALIDATOR = compile_schema(CONVERSATION_ANALYSIS_SCHEMA)
+PATCH_VALIDATOR = compile_schema(ANALYSIS_PATCH_SCHEMA)
+
+# Above this share of changed text a full re-analysis is cheaper and more reliable than a patch
+DELTA_MAX_CHANGED_RATIO = 0.5
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n+")
+
+logger = logging.getLogger(__name__)
+
+class AnalysisUpdate(NamedTuple):
+    """Progress of a streamed analysis: the fields completed so far, or the final result"""
+    analysis: Dict[str, Any]
+    complete: bool
+
+class ConversationDelta(NamedTuple):
+    """Sentences of the notes removed and added (or changed) since the previous analysis"""
+    removed: List[str]
+    added: List[str]
+
+def _sentences(text: str) -> List[str]:
+    return [" ".join(sentence.split()) for sentence in _SENTENCE_BREAK.split(text) if sentence.strip()]
+
+def conversation_delta(previous_text: str, conversation_text: str) -> Optional[ConversationDelta]:
+    """Sentence-level diff of the notes, or None if too much changed for a patch to make sense"""
+    previous, current = _sentences(previous_text), _sentences(conversation_text)
+    removed, added = [], []
+    matcher = difflib.SequenceMatcher(None, previous, current, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag != "equal":
+            removed += previous[old_start:old_end]
+            added += current[new_start:new_end]
+    
+    changed = sum(len(sentence) for sentence in added)
+    if changed > DELTA_MAX_CHANGED_RATIO * max(sum(len(sentence) for sentence in current), 1):
+        return None
+    return ConversationDelta(removed, added)
+
+def mentions_same_person(conversation_text: str, analysis: Dict[str, Any]) -> bool:
+    """Whether every word of the analysis' person name and company appears in the notes"""
+    words = set(normalize_words(conversation_text))
+    person = analysis.get("person") or {}
+    for field in ("name", "company"):
+        value = person.get(field) or ""
+        if value.strip().lower() != "unknown" and not set(normalize_words(value)) <= words:
+            return False
+    return True
+
+def merge_analysis_patch(analysis: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a patch in ANALYSIS_PATCH_SCHEMA format to a copy of the analysis
+
+    List fields take "add" (skipping items already present, ignoring case),
+    "remove" and "set"; text fields take "set". Changes to sections or fields
+    outside the analysis schema are ignored.
+    """
+    merged = copy.deepcopy(analysis)
+    sections = CONVERSATION_ANALYSIS_SCHEMA["properties"]
+    
+    for change in patch.get("changes") or []:
+        field_schema = sections.get(change.get("section"), {}).get("properties", {}).get(change.get("field"))
+        values = [value for value in change.get("values") or [] if value.strip()]
+        if field_schema is None:
+            logger.debug("Ignoring patch to unknown field %s.%s", change.get("section"), change.get("field"))
+            continue
+        
+        section = merged.setdefault(change["section"], {})
+        op = change.get("op")
+        if field_schema["type"] != "array":
+            if op == "set" and values:
+                section[change["field"]] = ", ".join(values)
+            continue
+        
+        current = section.get(change["field"]) or []
+        if op == "set":
+            section[change["field"]] = values
+        elif op == "add":
+            known = {item.lower() for item in current}
+            section[change["field"]] = current + [value for value in values if value.lower() not in known]
+        elif op == "remove":
+            dropped = {value.lower() for value in values}
+            section[change["field"]] = [item for item in current if item.lower() not in dropped]
+    
+    return merged
 
 class ConversationAnalyzer:
-    def __init__(self):
-        self.client = OpenAIClient()
+    def __init__(
+        self,
+        client: Optional[OpenAIClient] = None,
+        async_client: Optional[AsyncOpenAIClient] = None,
+        duplicates: Optional[NearDuplicateIndex] = None
+    ):
+        # Pass clients in to share them (see lib.registry); otherwise build a private pair
+        self.client = client or OpenAIClient()
+        self.async_client = async_client or self.client.async_counterpart()
+        # Reuses analyses of near-duplicate conversations; None analyzes every input
+        self.duplicates = duplicates
+        self._duplicate_scope = hashlib.sha256(
+            f"{self.client.model}\n{CONVERSATION_ANALYSIS_PROMPT}".encode("utf-8")
+        ).hexdigest()[:16]
     
+    @traced("conversation_analyzer.analyze")
     def analyze(self, conversation_text: str) -> Optional[Dict[str, Any]]:
         """Analyze conversation and return structured insights"""
         if not self._validate_input(conversation_text):
             return None
         
+        previous = self._previous_analysis(conversation_text)
+        if previous is not None:
+            return previous
+        
         analysis = self.client.analyze_conversation(
             conversation_text=conversation_text,
-            system_prompt=CONVERSATION_ANALYSIS_PROMPT
+            system_prompt=CONVERSATION_ANALYSIS_PROMPT,
+            validator=ANALYSIS_VALIDATOR
         )
         
         if analysis:
             # Post-process analysis to ensure data quality
             analysis = self._clean_analysis_data(analysis)
+            self._remember_analysis(conversation_text, analysis)
         
         return analysis
     
+    @traced("conversation_analyzer.analyze")
+    async def analyze_async(self, conversation_text: str) -> Optional[Dict[str, Any]]:
+        """Async variant of analyze for concurrent callers"""
+        if not self._validate_input(conversation_text):
+            return None
+        
+        previous = self._previous_analysis(conversation_text)
+        if previous is not None:
+            return previous
+        
+        analysis = await self.async_client.analyze_conversation(
+            conversation_text=conversation_text,
+            system_prompt=CONVERSATION_ANALYSIS_PROMPT,
+            validator=ANALYSIS_VALIDATOR
+        )
+        
+        if analysis:
+            analysis = self._clean_analysis_data(analysis)
+            self._remember_analysis(conversation_text, analysis)
+        
+        return analysis
+    
+    @traced("conversation_analyzer.analyze_delta")
+    def analyze_delta(
+        self, previous_text: str, previous_analysis: Dict[str, Any], conversation_text: str
+    ) -> Optional[Dict[str, Any]]:
+        """Update the analysis of ``previous_text`` for the edited ``conversation_text``
+
+        Only the previous analysis and the changed sentences are sent; the
+        model answers with a patch that is merged into the previous analysis.
+        Returns None when most of the notes changed or the patch request fails,
+        so the caller can analyze from scratch its usual way (fused, streamed, ...).
+        """
+        if not self._validate_input(conversation_text):
+            return None
+        
+        delta = conversation_delta(previous_text, conversation_text)
+        if delta is None:
+            return None
+        if not delta.removed and not delta.added:
+            return copy.deepcopy(previous_analysis)
+        
+        patch = self.client.analyze_conversation(
+            conversation_text=self._build_delta_request(previous_analysis, delta),
+            system_prompt=ANALYSIS_DELTA_PROMPT,
+            call_type="analysis_delta",
+            validator=PATCH_VALIDATOR
+        )
+        if patch is None:
+            return None
+        
+        analysis = self._clean_analysis_data(merge_analysis_patch(previous_analysis, patch))
+        self._remember_analysis(conversation_text, analysis)
+        return analysis
+    
+    def _build_delta_request(self, previous_analysis: Dict[str, Any], delta: ConversationDelta) -> str:
+        """Previous analysis as compact JSON followed by the removed and added sentences"""
+        request = "PREVIOUS ANALYSIS:\n" + json.dumps(previous_analysis, separators=(",", ":"), ensure_ascii=False)
+        if delta.removed:
+            request += "\n\nREMOVED FROM THE NOTES:\n" + "\n".join(delta.removed)
+        if delta.added:
+            request += "\n\nADDED OR CHANGED IN THE NOTES:\n" + "\n".join(delta.added)
+        return request
+    
+    def analyze_stream(self, conversation_text: str) -> Iterator[AnalysisUpdate]:
+        """Stream the analysis, yielding an update whenever a section completes
+
+        Partial updates hold the completed fields only (``person``,
+        ``conversation_context.topics_discussed``, ...). The last update is the
+        validated and cleaned analysis with ``complete=True``; it is missing if
+        the request or parsing failed. The analysis of a near-duplicate
+        conversation is yielded straight away as the final update.
+        """
+        if not self._validate_input(conversation_text):
+            return
+        
+        previous = self._previous_analysis(conversation_text)
+        if previous is not None:
+            yield AnalysisUpdate(previous, complete=True)
+            return
+        
+        parser = IncrementalJSONParser(max_depth=2)
+        chunks = []
+        try:
+            for chunk in self.client.analyze_conversation_stream(
+                conversation_text=conversation_text,
+                system_prompt=CONVERSATION_ANALYSIS_PROMPT,
+                validator=ANALYSIS_VALIDATOR
+            ):
+                chunks.append(chunk)
+                if parser.feed(chunk):
+                    yield AnalysisUpdate(ANALYSIS_VALIDATOR(parser.value, record=False), complete=False)
+        except StreamInterrupted:
+            return  # already reported; the partial updates stay partial
+        
+        if not chunks:
+            return
+        try:
+            analysis = ANALYSIS_VALIDATOR(json.loads("".join(chunks)))
+        except (json.JSONDecodeError, SchemaError) as exc:
+            logger.error("Failed to parse streamed analysis: %s", exc)
+            report_error("Failed to parse GPT response as JSON")
+            return
+        
+        analysis = self._clean_analysis_data(analysis)
+        self._remember_analysis(conversation_text, analysis)
+        yield AnalysisUpdate(analysis, complete=True)
+    
+    def _previous_analysis(self, text: str) -> Optional[Dict[str, Any]]:
+        """A fresh copy of the analysis of a near-duplicate conversation about the same person, if one was indexed"""
+        if self.duplicates is None:
+            return None
+        stored = self.duplicates.lookup(
+            text, scope=self._duplicate_scope, accept=lambda analysis: mentions_same_person(text, json.loads(analysis))
+        )
+        return json.loads(stored) if stored is not None else None
+    
+    def _remember_analysis(self, text: str, analysis: Dict[str, Any]) -> None:
+        if self.duplicates is not None:
+            self.duplicates.add(text, json.dumps(analysis), scope=self._duplicate_scope)
+    
     def _validate_input(self, text: str) -> bool:
         """Validate conversation input"""
         if not text or len(text.strip()) < 50:
@@ -1,11 +1,176 @@
-from typing import Optional
-from .openai_client import OpenAIClient
+import asyncio
+import contextvars
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Sequence, Tuple
+from .openai_client import AsyncOpenAIClient, OpenAIClient, StreamInterrupted
+from .telemetry import traced
 from utils.prompts import EMAIL_GENERATION_PROMPT
 
-class EmailGenerator:
+# Alternatives requested per generation; the UI switches between them without new calls
+DEFAULT_CANDIDATES = 3
+
+# Analysis fields whose items a good follow-up should mention
+REFERENCE_FIELDS = (
+    ("follow_up_strategy", "key_personalization_hooks"),
+    ("conversation_context", "personal_connections"),
+    ("conversation_context", "topics_discussed"),
+)
+
+# Variant drafts in flight at once across the process
+MAX_VARIANT_WORKERS = 8
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOPWORDS = frozenset(
+    "about after also and are both but for from had has have her his how into its our over she that the their "
+    "them they this was were what when with who will you your".split()
+)
+
+_variant_executor: Optional[ThreadPoolExecutor] = None
+_variant_executor_lock = threading.Lock()
+
+def _shared_variant_executor() -> ThreadPoolExecutor:
+    """Worker pool shared by every session for drafting email variants"""
+    global _variant_executor
+    with _variant_executor_lock:
+        if _variant_executor is None:
+            _variant_executor = ThreadPoolExecutor(max_workers=MAX_VARIANT_WORKERS, thread_name_prefix="email-variant")
+        return _variant_executor
+
+class EmailOutputCleaner:
+    """Incremental version of the email cleanup applied to generated output.
+
+    Feeding the email in arbitrary chunks produces exactly the same text as
+    cleaning it in one go: the first "Subject:" is bolded, every line is
+    stripped and non-empty lines are separated by a blank line. Only trailing
+    whitespace and a possible partial "Subject:" are held back between chunks.
+    """
+
+    SUBJECT = "Subject:"
+    SUBJECT_REPLACEMENT = "**Subject:**"
+
     def __init__(self):
-        self.client = OpenAIClient()
+        self._pending = ""  # Text of the current line not emitted yet
+        self._line_started = False
+        self._emitted_any_line = False
+        self._subject_done = False
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk of raw output and return the cleaned text that is now final"""
+        output = []
+        *complete_lines, remainder = chunk.split('\n')
+        
+        for line in complete_lines:
+            self._pending += line
+            output.append(self._emit(line_complete=True))
+        
+        self._pending += remainder
+        output.append(self._emit(line_complete=False))
+        return ''.join(output)
+
+    def flush(self) -> str:
+        """Return any held-back text once the output is complete"""
+        return self._emit(line_complete=True)
+
+    def _emit(self, line_complete: bool) -> str:
+        text = self._pending if self._line_started else self._pending.lstrip()
+        ready = text.rstrip()
+        held = text[len(ready):]
+        
+        if line_complete:
+            held = ""
+        elif not self._subject_done:
+            # Keep a partial "Subject:" at the end so the replacement can't be split
+            for size in range(min(len(self.SUBJECT) - 1, len(ready)), 0, -1):
+                if self.SUBJECT.startswith(ready[-size:]):
+                    held = ready[-size:] + held
+                    ready = ready[:-size]
+                    break
+        
+        self._pending = held
+        output = ""
+        if ready:
+            if not self._subject_done and self.SUBJECT in ready:
+                ready = ready.replace(self.SUBJECT, self.SUBJECT_REPLACEMENT, 1)
+                self._subject_done = True
+            
+            if not self._line_started:
+                if self._emitted_any_line:
+                    output = '\n\n'
+                self._line_started = True
+                self._emitted_any_line = True
+            output += ready
+        
+        if line_complete:
+            self._line_started = False
+        return output
+
+@dataclass
+class EmailCandidate:
+    """A generated email and the analysis items it references"""
+    email: str
+    references: List[str] = field(default_factory=list)
+
+    @property
+    def score(self) -> int:
+        return len(self.references)
+
+@dataclass(frozen=True)
+class EmailVariant:
+    """One way to redraft the email from a stored analysis: a different tone and/or extra context"""
+    tone: str = ""     # Replaces the analysis's recommended tone
+    context: str = ""  # Passed as additional_context
+    
+    @property
+    def label(self) -> str:
+        return " · ".join(part for part in (self.tone, self.context) if part) or "Recommended"
+    
+    def apply(self, analysis: dict) -> dict:
+        """The analysis with this variant's tone, copying only the strategy section"""
+        if not self.tone:
+            return analysis
+        strategy = dict(analysis.get("follow_up_strategy") or {}, recommended_tone=self.tone)
+        return {**analysis, "follow_up_strategy": strategy}
+
+def _keywords(text: str) -> set:
+    return {word for word in _WORD.findall(text.lower()) if len(word) > 2 and word not in _STOPWORDS}
+
+def analysis_references(analysis: dict) -> List[str]:
+    """Hooks, personal connections and topics from the analysis, without duplicates"""
+    references = []
+    for section, key in REFERENCE_FIELDS:
+        for item in (analysis.get(section) or {}).get(key) or []:
+            if isinstance(item, str) and item.strip() and item not in references:
+                references.append(item)
+    return references
+
+def rank_email_candidates(emails: List[str], analysis: dict) -> List[EmailCandidate]:
+    """Order candidate emails by how many analysis items each one references
+
+    An item counts as referenced when at least half of its keywords appear in
+    the email (e.g. "Both Stanford alumni" matches "as a fellow Stanford alum
+    ..."). Duplicate emails are dropped and ties keep the generation order.
+    """
+    items = [(item, _keywords(item)) for item in analysis_references(analysis)]
+    candidates = []
+    for email in dict.fromkeys(emails):
+        words = _keywords(email)
+        references = [
+            item for item, keywords in items
+            if keywords and len(keywords & words) * 2 >= len(keywords)
+        ]
+        candidates.append(EmailCandidate(email, references))
+    return sorted(candidates, key=lambda candidate: -candidate.score)
+
+class EmailGenerator:
+    def __init__(self, client: Optional[OpenAIClient] = None, async_client: Optional[AsyncOpenAIClient] = None):
+        # Pass clients in to share them (see lib.registry); otherwise build a private pair
+        self.client = client or OpenAIClient()
+        self.async_client = async_client or self.client.async_counterpart()
     
+    @traced("email_generator.generate_follow_up")
     def generate_follow_up(self, analysis_data: dict, additional_context: str = "") -> Optional[str]:
         """Generate follow-up email based on conversation analysis"""
         
@@ -23,6 +188,119 @@ class EmailGenerator:
         
         return email
     
+    @traced("email_generator.generate_follow_up")
+    async def generate_follow_up_async(self, analysis_data: dict, additional_context: str = "") -> Optional[str]:
+        """Async variant of generate_follow_up for concurrent callers"""
+        email_request = self._build_email_request(analysis_data, additional_context)
+        
+        email = await self.async_client.generate_email(
+            email_request=email_request,
+            system_prompt=EMAIL_GENERATION_PROMPT
+        )
+        
+        if email:
+            email = self._clean_email_output(email)
+        
+        return email
+    
+    @traced("email_generator.generate_follow_up_variants")
+    def generate_follow_up_variants(self, analysis_data: dict, variants: Sequence[EmailVariant]) -> List[Optional[str]]:
+        """Draft one email per variant from the same analysis, concurrently; None where a draft failed
+
+        Drafts run on a shared thread pool through the pooled sync client, so
+        no event loop (and no per-loop connection pool) is created per call.
+        """
+        executor = _shared_variant_executor()
+        # Each draft runs in a copy of the caller's context, so traces and the scheduling lane carry over
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run, self.generate_follow_up, variant.apply(analysis_data), variant.context
+            )
+            for variant in variants
+        ]
+        return [future.result() for future in futures]
+    
+    @traced("email_generator.generate_follow_up_variants")
+    async def generate_follow_up_variants_async(
+        self, analysis_data: dict, variants: Sequence[EmailVariant]
+    ) -> List[Optional[str]]:
+        """Async variant of generate_follow_up_variants for callers that already run an event loop"""
+        return list(await asyncio.gather(*(
+            self.generate_follow_up_async(variant.apply(analysis_data), variant.context) for variant in variants
+        )))
+    
+    def generate_follow_up_stream(self, analysis_data: dict, additional_context: str = "") -> Iterator[str]:
+        """Stream the follow-up email, yielding cleaned chunks as they arrive
+
+        Raises :class:`lib.openai_client.StreamInterrupted` if the stream fails
+        partway; the chunks yielded until then are not a complete email.
+        """
+        email_request = self._build_email_request(analysis_data, additional_context)
+        cleaner = EmailOutputCleaner()
+        
+        for chunk in self.client.generate_email_stream(
+            email_request=email_request,
+            system_prompt=EMAIL_GENERATION_PROMPT
+        ):
+            cleaned = cleaner.feed(chunk)
+            if cleaned:
+                yield cleaned
+        
+        remainder = cleaner.flush()
+        if remainder:
+            yield remainder
+    
+    @traced("email_generator.generate_follow_up_candidates")
+    def generate_follow_up_candidates(
+        self, analysis_data: dict, additional_context: str = "", n: int = DEFAULT_CANDIDATES
+    ) -> List[EmailCandidate]:
+        """Generate ``n`` alternative emails in one request, best-referenced first"""
+        email_request = self._build_email_request(analysis_data, additional_context)
+        
+        emails = self.client.generate_emails(
+            email_request=email_request,
+            system_prompt=EMAIL_GENERATION_PROMPT,
+            n=n
+        )
+        
+        return rank_email_candidates([self._clean_email_output(email) for email in emails], analysis_data)
+    
+    def generate_follow_up_candidates_stream(
+        self, analysis_data: dict, additional_context: str = "", n: int = DEFAULT_CANDIDATES
+    ) -> Iterator[Tuple[int, str]]:
+        """Stream ``n`` alternative emails from one request, yielding (candidate index, cleaned chunk)
+
+        Rank the completed texts with :func:`rank_email_candidates`. If the
+        stream fails partway, the candidates listed in the raised
+        ``StreamInterrupted.finished`` are complete and the others are not.
+        """
+        email_request = self._build_email_request(analysis_data, additional_context)
+        cleaners = {}
+        
+        try:
+            for index, chunk in self.client.generate_email_candidates_stream(
+                email_request=email_request,
+                system_prompt=EMAIL_GENERATION_PROMPT,
+                n=n
+            ):
+                cleaner = cleaners.setdefault(index, EmailOutputCleaner())
+                cleaned = cleaner.feed(chunk)
+                if cleaned:
+                    yield index, cleaned
+        except StreamInterrupted as exc:
+            # Finished candidates still get their held-back text; truncated ones stay truncated
+            yield from self._flush_cleaners({index: cleaners[index] for index in exc.finished if index in cleaners})
+            raise
+        
+        yield from self._flush_cleaners(cleaners)
+    
+    @staticmethod
+    def _flush_cleaners(cleaners: dict) -> Iterator[Tuple[int, str]]:
+        for index, cleaner in sorted(cleaners.items()):
+            remainder = cleaner.flush()
+            if remainder:
+                yield index, remainder
+    
     def _build_email_request(self, analysis: dict, additional_context: str) -> str:
         """Build structured email generation request"""
         person = analysis.get("person", {})
@@ -62,18 +340,9 @@ ACTUAL CONVERSATION DETAILS:
         
         return request
     
+    @traced("email_generator.clean_email_output")
     def _clean_email_output(self, email: str) -> str:
         """Clean and format email output"""
-        # Remove any GPT artifacts
-        email = email.replace("Subject:", "**Subject:**", 1)
-        
-        # Ensure proper formatting
-        lines = email.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if line:
-                cleaned_lines.append(line)
-        
-        return '\n\n'.join(cleaned_lines)
+        # Bold the subject line, strip each line and separate paragraphs with blank lines
+        cleaner = EmailOutputCleaner()
+        return cleaner.feed(email) + cleaner.flush()
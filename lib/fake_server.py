@@ -0,0 +1,369 @@
+"""Local OpenAI-compatible fake server for tests, demos and load experiments.
+
+Usage::
+
+    python -m lib.fake_server --port 8999 --latency lognormal:0.8:0.4 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8999/v1 OPENAI_API_KEY=sk-fake streamlit run app.py
+
+``POST /v1/chat/completions`` returns canned payloads: an analysis object in
+JSON mode, the fused ``{"analysis", "email"}`` object or an analysis patch
+when the system prompt asks for one, and a follow-up email otherwise (streamed as SSE when
+``stream`` is set). Latency is drawn from a configurable distribution and a
+fraction of requests can fail with 500s or 429s carrying ``Retry-After``.
+``GET /stats`` reports request counts. Tests start it in-process with
+:class:`FakeOpenAIServer`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from .tokens import estimate_message_tokens, estimate_tokens
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAYLOADS: Dict[str, Any] = {
+    "analysis": {
+        "person": {"name": "Sarah Chen", "title": "VP of Engineering", "company": "Databricks"},
+        "conversation_context": {
+            "topics_discussed": ["OpenAI partnership", "ML hiring"],
+            "pain_points_mentioned": ["Hiring senior ML engineers"],
+            "opportunities_expressed": ["Introduction to the recruiting team"],
+            "personal_connections": ["Both Stanford alumni"],
+            "emotional_cues": ["Enthusiastic about the partnership"],
+            "conversation_quality": "good",
+        },
+        "relationship_signals": {
+            "communication_style": "casual",
+            "engagement_indicators": ["Offered an introduction"],
+            "follow_up_readiness": "within_week",
+        },
+        "follow_up_strategy": {
+            "primary_objective": "Take up the recruiting introduction",
+            "recommended_tone": "warm and professional",
+            "key_personalization_hooks": ["OpenAI partnership", "ML hiring", "Stanford"],
+            "optimal_timing": "within 2 days",
+            "success_indicators": ["Introduction made"],
+        },
+        "confidence_scores": {
+            "overall_analysis": "8",
+            "personalization_potential": "8",
+            "relationship_advancement_likelihood": "7",
+        },
+    },
+    "email": {
+        "subject": "Great meeting you at the summit",
+        "body": (
+            "Hi Sarah,\n\nIt was great talking about the OpenAI partnership and how your team is approaching "
+            "ML hiring. As a fellow Stanford alum I'd love to take you up on the offer to meet your recruiting "
+            "team.\n\nWould a short call next week work?\n\nBest,\nAlex"
+        ),
+    },
+    # Answer to the delta re-analysis prompt for edited notes
+    "analysis_patch": {
+        "changes": [
+            {
+                "section": "conversation_context",
+                "field": "topics_discussed",
+                "op": "add",
+                "values": ["Series B fundraising"],
+            },
+        ],
+    },
+    # Further choices when a request asks for ``n`` > 1 emails, each less personalized.
+    "email_alternatives": [
+        {
+            "subject": "Following up",
+            "body": (
+                "Hi Sarah,\n\nThanks for the chat about ML hiring. Would you have time for a call next week?"
+                "\n\nBest,\nAlex"
+            ),
+        },
+        {
+            "subject": "Nice to meet you",
+            "body": "Hi Sarah,\n\nGreat to meet you at the summit. Let's stay in touch.\n\nBest,\nAlex",
+        },
+    ],
+}
+
+
+class LatencyModel:
+    """Response delay distribution parsed from ``constant:S``, ``uniform:LO:HI`` or ``lognormal:MEDIAN:SIGMA``."""
+
+    def __init__(self, spec: str = "constant:0", *, rng: Optional[random.Random] = None) -> None:
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(param) for param in params]
+        self.rng = rng or random.Random()
+        if kind not in ("constant", "uniform", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self) -> float:
+        if self.kind == "constant":
+            return self.params[0] if self.params else 0.0
+        if self.kind == "uniform":
+            low, high = self.params
+            return self.rng.uniform(low, high)
+        median, sigma = self.params
+        return median * self.rng.lognormvariate(0.0, sigma)
+
+
+class FakeBehavior:
+    """Everything that decides what the fake server answers."""
+
+    def __init__(
+        self,
+        *,
+        latency: str = "constant:0",
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        payloads: Optional[Dict[str, Any]] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.rng = random.Random(seed)
+        self.latency = LatencyModel(latency, rng=self.rng)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.payloads = payloads or DEFAULT_PAYLOADS
+        # Scripted status codes served before any random behavior, e.g. [500, 429].
+        self.scripted_errors: list = []
+        self.lock = threading.Lock()
+        self.counts: Dict[str, int] = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+
+    def next_status(self) -> int:
+        with self.lock:
+            self.counts["requests"] += 1
+            if self.scripted_errors:
+                status = self.scripted_errors.pop(0)
+            else:
+                roll = self.rng.random()
+                if roll < self.rate_limit_rate:
+                    status = 429
+                elif roll < self.rate_limit_rate + self.error_rate:
+                    status = 500
+                else:
+                    status = 200
+            self.counts["ok" if status == 200 else "rate_limited" if status == 429 else "errors"] += 1
+            return status
+
+    def content_for(self, request: Dict[str, Any]) -> str:
+        messages = request.get("messages", [])
+        system_prompt = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        if (request.get("response_format") or {}).get("type") in ("json_object", "json_schema"):
+            if '"analysis": {' in system_prompt:
+                return json.dumps({"analysis": self.payloads["analysis"], "email": self.payloads["email"]})
+            if '"changes": [' in system_prompt:
+                return json.dumps(self.payloads.get("analysis_patch", {"changes": []}))
+            return json.dumps(self.payloads["analysis"])
+        email = self.payloads["email"]
+        return f"Subject: {email['subject']}\n\n{email['body']}"
+
+    def contents_for(self, request: Dict[str, Any]) -> List[str]:
+        """One content per requested choice (``n``); extra email choices cycle through the alternatives."""
+
+        first = self.content_for(request)
+        n = int(request.get("n") or 1)
+        alternatives = self.payloads.get("email_alternatives") or []
+        if n == 1 or request.get("response_format") or not alternatives:
+            return [first] * n
+        emails = [f"Subject: {email['subject']}\n\n{email['body']}" for email in alternatives]
+        return [first] + [emails[index % len(emails)] for index in range(n - 1)]
+
+
+def _completion(request: Dict[str, Any], contents: List[str]) -> Dict[str, Any]:
+    prompt_tokens = estimate_message_tokens(request.get("messages", []))
+    completion_tokens = sum(estimate_tokens(content) for content in contents)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "gpt-4"),
+        "choices": [
+            {"index": index, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            for index, content in enumerate(contents)
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _chunk(
+    request: Dict[str, Any], completion_id: str, delta: Dict[str, Any], finish_reason=None, index: int = 0
+) -> bytes:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": request.get("model", "gpt-4"),
+        "choices": [{"index": index, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_FakeHTTPServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("fake server: " + format, *args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/stats"):
+            with self.server.behavior.lock:
+                self._send_json(200, dict(self.server.behavior.counts))
+        else:
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+    def do_POST(self) -> None:
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        behavior = self.server.behavior
+        time.sleep(behavior.latency.sample())
+
+        status = behavior.next_status()
+        if status == 429:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+                headers={"Retry-After": f"{behavior.retry_after:g}"},
+            )
+            return
+        if status != 200:
+            self._send_json(status, {"error": {"message": "The server had an error", "type": "server_error"}})
+            return
+
+        contents = behavior.contents_for(request)
+        if not request.get("stream"):
+            self._send_json(200, _completion(request, contents))
+            return
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for index in range(len(contents)):
+            self.wfile.write(_chunk(request, completion_id, {"role": "assistant", "content": ""}, index=index))
+        # Choices are interleaved chunk by chunk, as the API does for ``n`` > 1.
+        for start in range(0, max(len(content) for content in contents), 16):
+            for index, content in enumerate(contents):
+                if start < len(content):
+                    delta = {"content": content[start : start + 16]}
+                    self.wfile.write(_chunk(request, completion_id, delta, index=index))
+            self.wfile.flush()
+        for index in range(len(contents)):
+            self.wfile.write(_chunk(request, completion_id, {}, finish_reason="stop", index=index))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class _FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, behavior: FakeBehavior) -> None:
+        super().__init__(address, _Handler)
+        self.behavior = behavior
+
+
+class FakeOpenAIServer:
+    """In-process fake server on a background thread; use as a context manager.
+
+    ``base_url`` is suitable for ``OpenAIClient(base_url=...)`` or ``OPENAI_BASE_URL``.
+    """
+
+    def __init__(self, behavior: Optional[FakeBehavior] = None, *, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.behavior = behavior or FakeBehavior()
+        self._server = _FakeHTTPServer((host, port), self.behavior)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, name="fake-openai", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible fake server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency", default="constant:0", help="constant:S, uniform:LO:HI or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--payloads", help="JSON file with 'analysis' and 'email' payloads to serve")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible latency and errors")
+    args = parser.parse_args(argv)
+
+    payloads = None
+    if args.payloads:
+        with open(args.payloads, encoding="utf-8") as handle:
+            payloads = {**DEFAULT_PAYLOADS, **json.load(handle)}
+
+    behavior = FakeBehavior(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        payloads=payloads,
+        seed=args.seed,
+    )
+    server = FakeOpenAIServer(behavior, host=args.host, port=args.port)
+    print(f"Fake OpenAI server listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,71 @@
+"""Integration points that let the host application plug into the library.
+
+``lib`` does not depend on Streamlit: user-facing errors go through
+:func:`report_error` and secrets through :func:`get_secret`. The Streamlit app
+registers ``st.error`` and ``st.secrets`` here at startup; batch jobs, workers
+and tests keep the defaults (log the error, read the environment only).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+ErrorHandler = Callable[[str], None]
+SecretSource = Callable[[str], Optional[str]]
+
+_lock = threading.Lock()
+_error_handler: Optional[ErrorHandler] = None
+_secret_source: Optional[SecretSource] = None
+
+
+def set_error_handler(handler: Optional[ErrorHandler]) -> Optional[ErrorHandler]:
+    """Route user-facing error messages to ``handler``; returns the previous handler."""
+
+    global _error_handler
+    with _lock:
+        previous, _error_handler = _error_handler, handler
+    return previous
+
+
+def report_error(message: str) -> None:
+    """Show ``message`` to the user through the registered handler.
+
+    The caller is expected to have logged the underlying exception already; a
+    failing handler is logged and otherwise ignored.
+    """
+
+    handler = _error_handler
+    if handler is None:
+        return
+    try:
+        handler(message)
+    except Exception:
+        logger.warning("Error handler failed for message: %s", message, exc_info=True)
+
+
+def set_secret_source(source: Optional[SecretSource]) -> Optional[SecretSource]:
+    """Look up secrets missing from the environment in ``source``; returns the previous source."""
+
+    global _secret_source
+    with _lock:
+        previous, _secret_source = _secret_source, source
+    return previous
+
+
+def get_secret(name: str) -> Optional[str]:
+    """Return ``name`` from the environment, falling back to the registered secret source."""
+
+    value = os.getenv(name)
+    if value or _secret_source is None:
+        return value
+    try:
+        return _secret_source(name)
+    except Exception:
+        logger.debug("Secret source has no %s", name, exc_info=True)
+        return None
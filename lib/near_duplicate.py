@@ -0,0 +1,331 @@
+"""Near-duplicate detection for conversations that were already analyzed.
+
+Users often resubmit a note after fixing a typo, adjusting whitespace or
+punctuation, or moving a sentence around. The exact-hash response cache misses
+every such edit. :class:`NearDuplicateIndex` normalizes the text, splits it
+into overlapping word shingles and keeps a MinHash signature per analyzed
+conversation. Signatures are bucketed by band (locality-sensitive hashing), so
+a lookup only compares the handful of entries that share a band. The estimated
+Jaccard similarity of the closest entry decides whether its analysis is reused.
+
+Similarity alone can't tell "she offered an intro" from "she did not offer an
+intro". Entries are therefore also keyed by the words each negation applies to,
+and a lookup only matches text negating the same words. Callers that know what
+the stored value means (the analyzer checks the person and company) can reject
+a candidate with ``accept``.
+
+The index holds at most ``max_entries`` signatures and drops the least
+recently used ones. With a ``path`` it is also written through to SQLite and
+reloaded on start, so analyses survive restarts. Other processes' additions
+are only seen after a restart.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .telemetry import metrics
+
+if TYPE_CHECKING:  # pragma: no cover - imported lazily, only needed for annotations
+    import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "convoflow", "near_duplicates.sqlite3")
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_MAX_ENTRIES = 5000
+SHINGLE_SIZE = 2
+NUM_PERMUTATIONS = 128
+BANDS = 32  # 4 rows per band: near-certain to surface entries above ~0.7 similarity
+
+_SHINGLE_MULTIPLIER = 0x100000001B3  # FNV-1a prime; spreads word order across the shingle hash
+_PERMUTATION_SEED = 1
+_WORD = re.compile(r"\w+")
+# "t" is what word splitting leaves of "didn't", "won't", "can't", ...
+_NEGATIONS = frozenset({"not", "no", "never", "nor", "neither", "cannot", "without", "t"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS near_duplicates (
+    id INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    analysis TEXT NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS near_duplicates_accessed_at ON near_duplicates (accessed_at);
+"""
+
+
+def normalize_words(text: str) -> List[str]:
+    """Case-folded words of ``text``; punctuation and whitespace only separate them."""
+
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text)
+    return _WORD.findall(text.casefold())
+
+
+def negation_key(words: List[str]) -> str:
+    """The words following each negation, so "did not offer" and "didn't offer" share a key but "offered" doesn't."""
+
+    negated = sorted(words[index + 1] if index + 1 < len(words) else "" for index, word in enumerate(words)
+                     if word in _NEGATIONS)
+    return " ".join(negated)
+
+
+_permutations: Optional[Tuple["np.ndarray", "np.ndarray"]] = None
+
+
+def _permutation_parameters() -> Tuple["np.ndarray", "np.ndarray"]:
+    global _permutations
+    if _permutations is None:
+        import numpy as np
+
+        generator = np.random.default_rng(_PERMUTATION_SEED)
+        # Multiply-add-shift hashing: odd 64-bit multipliers, top 32 bits of the wrapped result
+        _permutations = (
+            generator.integers(0, 1 << 63, NUM_PERMUTATIONS, dtype=np.uint64)[:, None] * 2 + 1,
+            generator.integers(0, 1 << 63, NUM_PERMUTATIONS, dtype=np.uint64)[:, None],
+        )
+    return _permutations
+
+
+def minhash_signature(text: str) -> Optional["np.ndarray"]:
+    """MinHash signature of the text's ``SHINGLE_SIZE``-word shingles, or ``None`` for text without words.
+
+    Words are hashed with CRC-32 and combined per shingle, so signatures are
+    stable across processes and can be persisted. Text shorter than a shingle
+    is one shingle.
+    """
+
+    return _signature(normalize_words(text))
+
+
+def _signature(words: List[str]) -> Optional["np.ndarray"]:
+    import numpy as np
+
+    if not words:
+        return None
+    hashes = np.fromiter(map(zlib.crc32, map(str.encode, words)), dtype=np.uint64, count=len(words))
+    size = min(SHINGLE_SIZE, len(words))
+    count = len(words) - size + 1
+    shingles = hashes[:count]
+    for offset in range(1, size):
+        shingles = shingles * _SHINGLE_MULTIPLIER + hashes[offset:offset + count]
+    a, b = _permutation_parameters()
+    return ((a * shingles + b) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """Bounded MinHash/LSH index from conversation text to a stored analysis."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        *,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._memory_ids = 0
+        # id -> (scope, signature, analysis JSON); ordered from least to most recently used
+        self._entries: "OrderedDict[int, Tuple[str, np.ndarray, str]]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, bytes], Set[int]] = {}
+
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._connection().executescript(_SCHEMA)
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> Optional["NearDuplicateIndex"]:
+        """Build the index configured by ``CONVOFLOW_NEAR_DUPLICATE_*`` variables, or ``None`` if disabled."""
+
+        threshold = os.getenv("CONVOFLOW_NEAR_DUPLICATE_THRESHOLD", "")
+        if threshold.lower() in {"0", "off", "false", "no"}:
+            return None
+        path = os.getenv("CONVOFLOW_NEAR_DUPLICATE_PATH", DEFAULT_INDEX_PATH)
+        try:
+            return cls(
+                path if path.lower() not in {"", "memory", ":memory:"} else None,
+                threshold=float(threshold or DEFAULT_THRESHOLD),
+                max_entries=int(os.getenv("CONVOFLOW_NEAR_DUPLICATE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            )
+        except (OSError, sqlite3.Error):
+            logger.warning("Near-duplicate index unavailable; continuing without it", exc_info=True)
+            return None
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads; keep one per thread.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _load(self) -> None:
+        import numpy as np
+
+        rows = self._connection().execute(
+            "SELECT id, scope, signature, analysis, accessed_at FROM near_duplicates"
+            " ORDER BY accessed_at DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for entry_id, scope, signature, analysis, _ in reversed(rows):
+            self._insert(entry_id, scope, np.frombuffer(signature, dtype=np.uint32), analysis)
+        if len(rows) == self.max_entries:
+            self._write("DELETE FROM near_duplicates WHERE accessed_at < ?", (rows[-1][4],))
+
+    def _write(self, sql: str, parameters: Tuple[Any, ...]) -> Optional[int]:
+        """Run a write statement against the database, if any; returns the inserted row id."""
+
+        if self.path is None:
+            return None
+        try:
+            return self._connection().execute(sql, parameters).lastrowid
+        except sqlite3.Error:
+            logger.warning("Near-duplicate index write failed", exc_info=True)
+            return None
+
+    @staticmethod
+    def _bands(scope: str, signature: "np.ndarray") -> List[Tuple[str, int, bytes]]:
+        rows = NUM_PERMUTATIONS // BANDS
+        return [(scope, band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+
+    def _insert(self, entry_id: int, scope: str, signature: "np.ndarray", analysis: str) -> None:
+        self._entries[entry_id] = (scope, signature, analysis)
+        for band in self._bands(scope, signature):
+            self._buckets.setdefault(band, set()).add(entry_id)
+
+    def _remove(self, entry_id: int) -> None:
+        scope, signature, _ = self._entries.pop(entry_id)
+        for band in self._bands(scope, signature):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _matches(self, scope: str, signature: "np.ndarray") -> List[Tuple[float, int]]:
+        """(similarity, id) of the entries at or above the threshold, most similar first."""
+
+        candidates: Set[int] = set()
+        for band in self._bands(scope, signature):
+            candidates.update(self._buckets.get(band, ()))
+        matches = []
+        for entry_id in candidates:
+            similarity = float((self._entries[entry_id][1] == signature).mean())
+            if similarity >= self.threshold:
+                matches.append((similarity, entry_id))
+        return sorted(matches, reverse=True)
+
+    @staticmethod
+    def _key(scope: str, words: List[str]) -> str:
+        return f"{scope}\x1f{negation_key(words)}"
+
+    def lookup(self, text: str, scope: str = "", accept: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """Return the stored analysis JSON of the closest entry at or above the threshold.
+
+        Only entries added with the same ``scope`` (e.g. model and prompt) and
+        negating the same words match. ``accept`` is called with the stored
+        JSON of each match, most similar first; rejected matches are skipped.
+        """
+
+        words = normalize_words(text)
+        signature = _signature(words)
+        entry_id, similarity = (None, 0.0)
+        if signature is not None:
+            with self._lock:
+                for similarity, candidate in self._matches(self._key(scope, words), signature):
+                    if accept is None or accept(self._entries[candidate][2]):
+                        entry_id = candidate
+                        break
+                if entry_id is not None:
+                    self._entries.move_to_end(entry_id)
+                    analysis = self._entries[entry_id][2]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        if entry_id is None:
+            metrics.inc("convoflow_near_duplicate_lookups_total", 1, "Near-duplicate index lookups", result="miss")
+            return None
+        metrics.inc("convoflow_near_duplicate_lookups_total", 1, "Near-duplicate index lookups", result="hit")
+        logger.debug("Reusing analysis of a near-duplicate conversation (similarity %.2f)", similarity)
+        self._write("UPDATE near_duplicates SET accessed_at = ? WHERE id = ?", (time.time(), entry_id))
+        return analysis
+
+    def add(self, text: str, analysis: str, scope: str = "") -> None:
+        """Remember ``analysis`` (JSON) for ``text``, replacing a near-duplicate entry if there is one."""
+
+        words = normalize_words(text)
+        signature = _signature(words)
+        if signature is None:
+            return
+        scope = self._key(scope, words)
+        row_id = self._write(
+            "INSERT INTO near_duplicates (scope, signature, analysis, accessed_at) VALUES (?, ?, ?, ?)",
+            (scope, signature.tobytes(), analysis, time.time()),
+        )
+        evicted = []
+        with self._lock:
+            matches = self._matches(scope, signature)
+            if matches:
+                self._remove(matches[0][1])
+                evicted.append(matches[0][1])
+            if row_id is None:
+                # Memory-only entries use negative ids so they never clash with database rows
+                self._memory_ids -= 1
+                row_id = self._memory_ids
+            self._insert(row_id, scope, signature, analysis)
+            while len(self._entries) > self.max_entries:
+                stale = next(iter(self._entries))
+                self._remove(stale)
+                evicted.append(stale)
+        for stale in evicted:
+            self._write("DELETE FROM near_duplicates WHERE id = ?", (stale,))
+
+    def clear(self) -> None:
+        """Remove every entry."""
+
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+        self._write("DELETE FROM near_duplicates", ())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_default_index: Optional[NearDuplicateIndex] = None
+_default_index_loaded = False
+_default_index_lock = threading.Lock()
+
+
+def get_default_near_duplicate_index() -> Optional[NearDuplicateIndex]:
+    """Return the process-wide index configured from the environment."""
+
+    global _default_index, _default_index_loaded
+    with _default_index_lock:
+        if not _default_index_loaded:
+            _default_index = NearDuplicateIndex.from_env()
+            _default_index_loaded = True
+        return _default_index
@@ -2,73 +2,621 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
-from typing import Any, Dict, Optional
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple, TypeVar
 
-import openai
-import streamlit as st
+from .hooks import get_secret, report_error
+from .rate_limiter import Lane, RateLimiter, current_lane, estimate_request_tokens, get_default_limiter
+from .resilience import Resilience, get_default_resilience
+from .response_cache import ResponseCache, get_default_cache, request_cache_key
+from .schema import SchemaError, Validator, structured_outputs_enabled
+from .single_flight import SingleFlight, get_default_single_flight
+from .telemetry import record_llm_call, record_span, span
+from .tokens import (
+    compact_prompt,
+    compact_text,
+    completion_token_limit,
+    estimate_message_tokens,
+    estimate_tokens,
+    get_usage_recorder,
+)
+
+if TYPE_CHECKING:
+    import openai
 
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+
+class StreamInterrupted(RuntimeError):
+    """Raised by the streaming methods when a stream fails; the text yielded so far is incomplete.
+
+    The error has already been passed to :func:`lib.hooks.report_error`.
+    ``finished`` holds the indexes of choices that completed before the failure.
+    """
+
+    def __init__(self, message: str, finished: FrozenSet[int] = frozenset()) -> None:
+        super().__init__(message)
+        self.finished = finished
+
+# Sentinels meaning "use the process-wide instance configured from the environment".
+_DEFAULT_CACHE: Any = object()
+_DEFAULT_RESILIENCE: Any = object()
+_DEFAULT_LIMITER: Any = object()
+_DEFAULT_SINGLE_FLIGHT: Any = object()
+
+# Connection pool shared by every client in the process. Keep-alive connections
+# are reused across Streamlit sessions and batch workers instead of opening a
+# fresh TLS connection per request.
+HTTP_LIMITS = dict(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+HTTP_TIMEOUT = dict(timeout=60.0, connect=10.0)
+
+_clients_lock = threading.Lock()
+_sync_clients: Dict[Tuple[str, Optional[str]], openai.OpenAI] = {}
+# httpx.AsyncClient connections are bound to the event loop that opened them,
+# so async clients are pooled per loop (one per process for a single-loop worker).
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Optional[str]], openai.AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _http_options() -> Dict[str, Any]:
+    import httpx
+
+    return {"limits": httpx.Limits(**HTTP_LIMITS), "timeout": httpx.Timeout(**HTTP_TIMEOUT)}
+
+
+def _resolve_api_key(api_key: Optional[str]) -> str:
+    resolved = api_key or get_secret("OPENAI_API_KEY")
+    if not resolved:
+        raise ValueError("OpenAI API key not found")
+    return resolved
+
+
+def resolve_client_settings(
+    api_key: Optional[str] = None, model: Optional[str] = None, base_url: Optional[str] = None
+) -> Tuple[str, str, Optional[str]]:
+    """``(api_key, model, base_url)`` with environment and secret defaults applied."""
+
+    return (
+        _resolve_api_key(api_key),
+        model or os.getenv("OPENAI_MODEL", "gpt-4"),
+        # Point at a compatible server (e.g. ``python -m lib.fake_server``); None means api.openai.com.
+        base_url or os.getenv("OPENAI_BASE_URL") or None,
+    )
+
+
+def _shared_sync_client(api_key: str, base_url: Optional[str] = None) -> openai.OpenAI:
+    """Return the process-wide synchronous SDK client for ``api_key`` and ``base_url``.
+
+    The SDK (and httpx) is imported here, on the first request, rather than when
+    ``lib`` is imported: it accounts for most of the library's import time.
+    """
+
+    with _clients_lock:
+        client = _sync_clients.get((api_key, base_url))
+        if client is None:
+            import httpx
+            import openai
+
+            client = openai.OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,  # retries are handled by lib.resilience
+                http_client=httpx.Client(**_http_options()),
+            )
+            _sync_clients[(api_key, base_url)] = client
+        return client
+
+
+def _shared_async_client(api_key: str, base_url: Optional[str] = None) -> openai.AsyncOpenAI:
+    """Return the async SDK client for ``api_key`` and ``base_url`` bound to the running event loop."""
+
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get((api_key, base_url))
+        if client is None:
+            import httpx
+            import openai
+
+            client = openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(**_http_options()),
+            )
+            clients[(api_key, base_url)] = client
+        return client
+
+
+def _messages(system_prompt: str, user_content: str) -> list:
+    """Chat messages with indentation, filler and redundant whitespace trimmed before sending."""
+
+    return [
+        {"role": "system", "content": compact_prompt(system_prompt)},
+        {"role": "user", "content": compact_text(user_content)},
+    ]
+
+
+def _analysis_request(
+    model: str,
+    conversation_text: str,
+    system_prompt: str,
+    call_type: str = "analysis",
+    validator: Optional[Validator] = None,
+) -> Dict[str, Any]:
+    use_schema = validator is not None and structured_outputs_enabled(model)
+    return {
+        "model": model,
+        "messages": _messages(system_prompt, conversation_text),
+        "response_format": validator.response_format() if use_schema else {"type": "json_object"},
+        "max_tokens": completion_token_limit(call_type),
+    }
+
+
+def _json_parser(validator: Optional[Validator]) -> Callable[[str], Any]:
+    if validator is None:
+        return json.loads
+    return lambda content: validator(json.loads(content))
+
+
+def _email_request(model: str, email_request: str, system_prompt: str, n: int = 1) -> Dict[str, Any]:
+    request_options = {
+        "model": model,
+        "messages": _messages(system_prompt, email_request),
+        "max_tokens": completion_token_limit("email"),
+    }
+    if n > 1:
+        request_options["n"] = n
+    return request_options
 
-class OpenAIClient:
+
+def _parse_candidates(n: int) -> Callable[[str], List[str]]:
+    return json.loads if n > 1 else (lambda content: [content])
+
+
+def _response_content(request_options: Dict[str, Any], response: Any) -> str:
+    """Completion text; with ``n`` choices, a JSON list of their texts (cached as one entry)."""
+
+    if request_options.get("n", 1) > 1:
+        choices = sorted(response.choices, key=lambda choice: choice.index)
+        return json.dumps([choice.message.content for choice in choices])
+    return response.choices[0].message.content
+
+
+class _BaseOpenAIClient:
+    """Configuration and response caching shared by the sync and async clients."""
+
+    def __init__(
+        self,
+        *,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        base_url: Optional[str] = None,
+        cache: Optional[ResponseCache] = _DEFAULT_CACHE,
+        resilience: Optional[Resilience] = _DEFAULT_RESILIENCE,
+        limiter: Optional[RateLimiter] = _DEFAULT_LIMITER,
+        single_flight: Optional[SingleFlight] = _DEFAULT_SINGLE_FLIGHT,
+    ) -> None:
+        self.api_key, self.model, self.base_url = resolve_client_settings(api_key, model, base_url)
+        self.cache = get_default_cache() if cache is _DEFAULT_CACHE else cache
+        self.resilience = get_default_resilience() if resilience is _DEFAULT_RESILIENCE else resilience
+        self.limiter = get_default_limiter() if limiter is _DEFAULT_LIMITER else limiter
+        self.single_flight = get_default_single_flight() if single_flight is _DEFAULT_SINGLE_FLIGHT else single_flight
+
+    def _request_key(self, request_options: Dict[str, Any]) -> str:
+        """Content hash of a request; responses from a non-default server are kept apart."""
+
+        if self.base_url:
+            request_options = {**request_options, "base_url": self.base_url}
+        return request_cache_key(request_options)
+
+    def _cache_lookup(self, request_options: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        """Return ``(cache_key, cached_content)`` for a request; both ``None`` when caching is off."""
+
+        if self.cache is None:
+            return None, None
+        cache_key = self._request_key(request_options)
+        return cache_key, self.cache.get(cache_key)
+
+    def _flight_key(self, cache_key: Optional[str], request_options: Dict[str, Any]) -> Optional[str]:
+        """Key identifying identical requests (model + prompt + input); ``None`` disables coalescing."""
+
+        if self.single_flight is None:
+            return None
+        return cache_key or self._request_key(request_options)
+
+    def _cache_store(self, cache_key: Optional[str], content: str) -> None:
+        if cache_key is not None:
+            self.cache.set(cache_key, content)
+
+    @staticmethod
+    def _usage_attributes(usage: Any) -> Dict[str, Any]:
+        if usage is None:
+            return {}
+        return {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+
+    @staticmethod
+    def _record_usage(
+        call_type: str, request_options: Dict[str, Any], usage: Any, started: float, completion_text: str = ""
+    ) -> None:
+        """Record the API-reported usage of one upstream call next to the local estimate."""
+
+        estimated = estimate_message_tokens(request_options["messages"])
+        latency = time.perf_counter() - started
+        recorder = get_usage_recorder()
+        recorder.record(
+            call_type, usage=usage, estimated_prompt_tokens=estimated, latency=latency, completion_text=completion_text
+        )
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        record_llm_call(
+            call_type,
+            request_options["model"],
+            latency,
+            prompt_tokens if prompt_tokens is not None else estimated,
+            completion_tokens if completion_tokens is not None else estimate_tokens(completion_text),
+        )
+        logger.debug(
+            "%s call: %s prompt / %s completion tokens (estimated prompt %d) in %.2fs",
+            call_type,
+            getattr(usage, "prompt_tokens", "?"),
+            getattr(usage, "completion_tokens", "?"),
+            estimated,
+            latency,
+        )
+
+    @staticmethod
+    def _latency_key(request_options: Dict[str, Any]) -> str:
+        """Group requests with comparable latency: same model and response format."""
+
+        response_format = request_options.get("response_format") or {}
+        return f"{request_options.get('model')}:{response_format.get('type', 'text')}"
+
+
+class OpenAIClient(_BaseOpenAIClient):
     """Client encapsulating OpenAI chat completion functionality."""
 
-    def __init__(self, *, api_key: Optional[str] = None, model: Optional[str] = None) -> None:
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY") or st.secrets.get("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("OpenAI API key not found")
+    def async_counterpart(self) -> "AsyncOpenAIClient":
+        """An :class:`AsyncOpenAIClient` with this client's settings, cache, limiter, resilience and single flight."""
 
-        openai.api_key = self.api_key
-        self.model = model or os.getenv("OPENAI_MODEL", "gpt-4")
+        return AsyncOpenAIClient(
+            api_key=self.api_key,
+            model=self.model,
+            base_url=self.base_url,
+            cache=self.cache,
+            resilience=self.resilience,
+            limiter=self.limiter,
+            single_flight=self.single_flight,
+        )
 
-    def analyze_conversation(self, conversation_text: str, system_prompt: str) -> Optional[Dict[str, Any]]:
-        """Analyze a conversation and return structured JSON data."""
+    def _send(self, request_options: Dict[str, Any]) -> Any:
+        """Send one chat completion request over the shared connection pool."""
 
-        request_options = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": conversation_text},
-            ],
-            "response_format": {"type": "json_object"},
-        }
+        return _shared_sync_client(self.api_key, self.base_url).chat.completions.create(**request_options)
 
-        try:
-            response = openai.chat.completions.create(**request_options)
+    def _admitted_send(self, request_options: Dict[str, Any], lane: Lane) -> Any:
+        """Wait for the rate limiter (every attempt counts against it), then send."""
+
+        if self.limiter is not None:
+            self.limiter.acquire(estimate_request_tokens(request_options), lane=lane)
+        return self._send(request_options)
+
+    def _complete(self, request_options: Dict[str, Any]) -> Any:
+        """Send a request with rate limiting, retries, hedging and the circuit breaker.
+
+        Streaming requests are retried until the stream opens but never hedged.
+        """
+
+        # Resolve the lane here: hedged attempts run on worker threads without this context.
+        lane = current_lane()
+        if self.resilience is None:
+            return self._admitted_send(request_options, lane)
+        return self.resilience.call(
+            lambda: self._admitted_send(request_options, lane),
+            key=self._latency_key(request_options),
+            hedge=not request_options.get("stream"),
+        )
+
+    def _complete_content(self, request_options: Dict[str, Any], parse: Callable[[str], T], call_type: str) -> T:
+        """Return parsed completion content, served from the response cache when possible.
+
+        Identical concurrent requests share one upstream call. Only content that
+        ``parse`` accepts is cached, so malformed responses are retried.
+        """
+
+        cache_key, content = self._cache_lookup(request_options)
+        if content is not None:
+            return parse(content)
+
+        def fetch() -> str:
+            with span(f"llm.{call_type}", model=self.model) as current:
+                started = time.perf_counter()
+                response = self._complete(request_options)
+                usage = getattr(response, "usage", None)
+                self._record_usage(call_type, request_options, usage, started)
+                current.set(**self._usage_attributes(usage))
+                return _response_content(request_options, response)
+
+        flight_key = self._flight_key(cache_key, request_options)
+        content = fetch() if flight_key is None else self.single_flight.do(flight_key, fetch)
+        result = parse(content)
+        self._cache_store(cache_key, content)
+        return result
 
-            return json.loads(response.choices[0].message.content)
+    def analyze_conversation(
+        self,
+        conversation_text: str,
+        system_prompt: str,
+        *,
+        call_type: str = "analysis",
+        validator: Optional[Validator] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Analyze a conversation and return structured JSON data.
+
+        ``call_type`` selects the completion token budget (``"fused"`` for the
+        combined analysis + email prompt). With a ``validator`` the schema is
+        requested as a strict structured output (where the model supports it)
+        and the response is coerced to it before being cached or returned.
+        """
+
+        request_options = _analysis_request(self.model, conversation_text, system_prompt, call_type, validator)
+
+        try:
+            return self._complete_content(request_options, _json_parser(validator), call_type)
 
         except json.JSONDecodeError as exc:
             logger.error("Failed to parse GPT response as JSON", exc_info=exc)
-            st.error("Failed to parse GPT response as JSON")
+            report_error("Failed to parse GPT response as JSON")
+            return None
+        except SchemaError as exc:
+            logger.error("GPT response does not match the schema: %s", exc)
+            report_error("GPT response did not match the expected format")
             return None
         except Exception as exc:  # pragma: no cover - network failure path
             logger.exception("OpenAI API error during conversation analysis")
-            st.error(f"OpenAI API error: {exc}")
+            report_error(f"OpenAI API error: {exc}")
             return None
 
     def generate_email(self, email_request: str, system_prompt: str) -> Optional[str]:
         """Generate a follow-up email using GPT."""
 
-        request_options = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": email_request},
-            ],
-        }
+        request_options = _email_request(self.model, email_request, system_prompt)
 
         try:
-            response = openai.chat.completions.create(**request_options)
+            return self._complete_content(request_options, str.strip, "email")
+
+        except Exception as exc:  # pragma: no cover - network failure path
+            logger.exception("OpenAI API error during email generation")
+            report_error(f"Email generation error: {exc}")
+            return None
 
-            return response.choices[0].message.content.strip()
+    def generate_emails(self, email_request: str, system_prompt: str, n: int) -> List[str]:
+        """Generate ``n`` alternative emails in one request (the API's ``n`` parameter)."""
+
+        request_options = _email_request(self.model, email_request, system_prompt, n)
+
+        try:
+            texts = self._complete_content(request_options, _parse_candidates(n), "email")
+            return [text.strip() for text in texts if text]
 
         except Exception as exc:  # pragma: no cover - network failure path
             logger.exception("OpenAI API error during email generation")
-            st.error(f"Email generation error: {exc}")
+            report_error(f"Email generation error: {exc}")
+            return []
+
+    def generate_email_candidates_stream(
+        self, email_request: str, system_prompt: str, n: int
+    ) -> Iterator[Tuple[int, str]]:
+        """Stream ``n`` alternative emails from one request, yielding ``(candidate index, delta)``."""
+
+        request_options = _email_request(self.model, email_request, system_prompt, n)
+        yield from self._stream_choices(request_options, "email", "Email generation error")
+
+    def generate_email_stream(self, email_request: str, system_prompt: str) -> Iterator[str]:
+        """Generate a follow-up email, yielding raw content deltas as they arrive.
+
+        A cached response is yielded as a single chunk. The streamed text is cached
+        once complete, under the same key as :meth:`generate_email`. Raises
+        :class:`StreamInterrupted` if the stream fails partway.
+        """
+
+        request_options = _email_request(self.model, email_request, system_prompt)
+        yield from self._stream_content(request_options, "email", "Email generation error")
+
+    def analyze_conversation_stream(
+        self,
+        conversation_text: str,
+        system_prompt: str,
+        *,
+        call_type: str = "analysis",
+        validator: Optional[Validator] = None,
+    ) -> Iterator[str]:
+        """Analyze a conversation, yielding the raw JSON text as it arrives.
+
+        Feed the chunks to :class:`lib.partial_json.IncrementalJSONParser` to use
+        fields before the response is complete. The text is cached under the same
+        key as :meth:`analyze_conversation`, but only if it parses and validates.
+        """
+
+        request_options = _analysis_request(self.model, conversation_text, system_prompt, call_type, validator)
+        yield from self._stream_content(request_options, call_type, "OpenAI API error", _json_parser(validator))
+
+    def _stream_content(
+        self,
+        request_options: Dict[str, Any],
+        call_type: str,
+        error_message: str,
+        parse: Optional[Callable[[str], Any]] = None,
+    ) -> Iterator[str]:
+        for _, delta in self._stream_choices(request_options, call_type, error_message, parse):
+            yield delta
+
+    def _stream_choices(
+        self,
+        request_options: Dict[str, Any],
+        call_type: str,
+        error_message: str,
+        parse: Optional[Callable[[str], Any]] = None,
+    ) -> Iterator[Tuple[int, str]]:
+        """Stream ``(choice index, delta)`` pairs, serving and filling the response cache.
+
+        Errors are reported through :func:`lib.hooks.report_error`, then
+        :class:`StreamInterrupted` is raised so a truncated response can't pass
+        for a complete one. Complete text is cached unless ``parse`` rejects it; with ``n``
+        choices the cached entry is the JSON list that :meth:`generate_emails` uses.
+        """
+
+        n = request_options.get("n", 1)
+        cache_key, content = self._cache_lookup(request_options)
+        if content is not None:
+            yield from enumerate(_parse_candidates(n)(content))
+            return
+
+        parts: Dict[int, List[str]] = {}
+        finished: Set[int] = set()
+        started = time.perf_counter()
+        try:
+            for chunk in self._complete({**request_options, "stream": True}):
+                for choice in chunk.choices:
+                    index = getattr(choice, "index", 0)
+                    delta = choice.delta.content
+                    if delta:
+                        parts.setdefault(index, []).append(delta)
+                        yield index, delta
+                    if getattr(choice, "finish_reason", None):
+                        finished.add(index)
+
+        except Exception as exc:
+            logger.exception("OpenAI API error during streaming %s", call_type)
+            report_error(f"{error_message}: {exc}")
+            raise StreamInterrupted(f"{error_message}: {exc}", frozenset(finished)) from exc
+
+        if parts:
+            texts = ["".join(parts[index]) for index in sorted(parts)]
+            content = json.dumps(texts) if n > 1 else texts[0]
+            # Streams don't report usage, so completion tokens are estimated from the text.
+            self._record_usage(call_type, request_options, None, started, completion_text="".join(texts))
+            record_span(f"llm.{call_type}_stream", time.perf_counter() - started, model=self.model)
+            try:
+                if parse is not None:
+                    parse(content)
+            except ValueError:
+                logger.warning("Not caching streamed %s response that fails to parse", call_type)
+                return
+            self._cache_store(cache_key, content)
+
+
+class AsyncOpenAIClient(_BaseOpenAIClient):
+    """Asyncio counterpart of :class:`OpenAIClient` for high-concurrency callers.
+
+    All instances running on the same event loop share one pooled, keep-alive
+    HTTP client, so a single worker process can keep many requests in flight.
+    """
+
+    async def _send(self, request_options: Dict[str, Any]) -> Any:
+        """Send one chat completion request over the loop's shared connection pool."""
+
+        return await _shared_async_client(self.api_key, self.base_url).chat.completions.create(**request_options)
+
+    async def _admitted_send(self, request_options: Dict[str, Any]) -> Any:
+        if self.limiter is not None:
+            await self.limiter.acquire_async(estimate_request_tokens(request_options))
+        return await self._send(request_options)
+
+    async def _complete(self, request_options: Dict[str, Any]) -> Any:
+        """Send a request with rate limiting, retries, hedging and the circuit breaker."""
+
+        if self.resilience is None:
+            return await self._admitted_send(request_options)
+        return await self.resilience.acall(
+            lambda: self._admitted_send(request_options),
+            key=self._latency_key(request_options),
+            hedge=not request_options.get("stream"),
+        )
+
+    async def _complete_content(self, request_options: Dict[str, Any], parse: Callable[[str], T], call_type: str) -> T:
+        """Return parsed completion content, served from the response cache when possible."""
+
+        cache_key, content = self._cache_lookup(request_options)
+        if content is not None:
+            return parse(content)
+
+        async def fetch() -> str:
+            with span(f"llm.{call_type}", model=self.model) as current:
+                started = time.perf_counter()
+                response = await self._complete(request_options)
+                usage = getattr(response, "usage", None)
+                self._record_usage(call_type, request_options, usage, started)
+                current.set(**self._usage_attributes(usage))
+                return _response_content(request_options, response)
+
+        flight_key = self._flight_key(cache_key, request_options)
+        content = await (fetch() if flight_key is None else self.single_flight.do_async(flight_key, fetch))
+        result = parse(content)
+        self._cache_store(cache_key, content)
+        return result
+
+    async def analyze_conversation(
+        self,
+        conversation_text: str,
+        system_prompt: str,
+        *,
+        call_type: str = "analysis",
+        validator: Optional[Validator] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Analyze a conversation and return structured JSON data."""
+
+        request_options = _analysis_request(self.model, conversation_text, system_prompt, call_type, validator)
+
+        try:
+            return await self._complete_content(request_options, _json_parser(validator), call_type)
+
+        except json.JSONDecodeError as exc:
+            logger.error("Failed to parse GPT response as JSON", exc_info=exc)
+            report_error("Failed to parse GPT response as JSON")
+            return None
+        except SchemaError as exc:
+            logger.error("GPT response does not match the schema: %s", exc)
+            report_error("GPT response did not match the expected format")
             return None
+        except Exception as exc:  # pragma: no cover - network failure path
+            logger.exception("OpenAI API error during conversation analysis")
+            report_error(f"OpenAI API error: {exc}")
+            return None
+
+    async def generate_email(self, email_request: str, system_prompt: str) -> Optional[str]:
+        """Generate a follow-up email using GPT."""
+
+        request_options = _email_request(self.model, email_request, system_prompt)
+
+        try:
+            return await self._complete_content(request_options, str.strip, "email")
+
+        except Exception as exc:  # pragma: no cover - network failure path
+            logger.exception("OpenAI API error during email generation")
+            report_error(f"Email generation error: {exc}")
+            return None
+
+    async def generate_emails(self, email_request: str, system_prompt: str, n: int) -> List[str]:
+        """Generate ``n`` alternative emails in one request (the API's ``n`` parameter)."""
+
+        request_options = _email_request(self.model, email_request, system_prompt, n)
 
+        try:
+            texts = await self._complete_content(request_options, _parse_candidates(n), "email")
+            return [text.strip() for text in texts if text]
+
+        except Exception as exc:  # pragma: no cover - network failure path
+            logger.exception("OpenAI API error during email generation")
+            report_error(f"Email generation error: {exc}")
+            return []
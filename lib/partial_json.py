@@ -0,0 +1,123 @@
+"""Incremental parsing of a JSON object that is still streaming in.
+
+:class:`IncrementalJSONParser` is fed raw chunks and reports each value that
+has just become complete, e.g. ``("person",)`` once the ``person`` object's
+closing brace arrives or ``("conversation_context", "topics_discussed")``
+once that list is closed, long before the whole document is valid JSON.
+Every character is scanned once; completed values are decoded with
+``json.loads`` on their exact slice of the buffer.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+PathPart = Union[str, int]
+Path = Tuple[PathPart, ...]
+
+_WHITESPACE = " \t\r\n"
+
+
+@dataclass
+class _Frame:
+    kind: str  # "{" or "["
+    path: Path
+    start: int
+    key: Optional[str] = None
+    expecting_key: bool = True
+    index: int = 0
+
+
+class IncrementalJSONParser:
+    """Reports completed values of a streaming JSON document, up to ``max_depth`` levels deep.
+
+    ``value`` holds the object assembled from the completed fields so far
+    (array items are only reported, not assembled).
+    """
+
+    def __init__(self, max_depth: int = 2) -> None:
+        self.max_depth = max_depth
+        self.value: Dict[str, Any] = {}
+        self._buffer = ""
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escaped = False
+        self._token_start: Optional[int] = None  # start of the string or scalar being read
+
+    def feed(self, chunk: str) -> List[Tuple[Path, Any]]:
+        """Consume ``chunk`` and return ``(path, value)`` for every value completed by it."""
+
+        completed: List[Tuple[Path, Any]] = []
+        offset = len(self._buffer)
+        self._buffer += chunk
+        buffer = self._buffer
+
+        for position in range(offset, len(buffer)):
+            char = buffer[position]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    self._end_token(position + 1, completed, is_string=True)
+                continue
+
+            if self._token_start is not None and (char in _WHITESPACE or char in ",]}"):
+                self._end_token(position, completed)
+
+            if char == '"':
+                self._in_string = True
+                self._token_start = position
+            elif char in "{[":
+                self._stack.append(_Frame(char, self._child_path(), position))
+            elif char in "}]":
+                if self._stack:
+                    frame = self._stack.pop()
+                    self._complete(frame.path, frame.start, position + 1, completed)
+            elif char == ":":
+                if self._stack:
+                    self._stack[-1].expecting_key = False
+            elif char == ",":
+                if self._stack:
+                    frame = self._stack[-1]
+                    frame.expecting_key = frame.kind == "{"
+                    frame.index += 1
+            elif char not in _WHITESPACE and self._token_start is None:
+                self._token_start = position
+
+        return completed
+
+    def _child_path(self) -> Path:
+        if not self._stack:
+            return ()
+        frame = self._stack[-1]
+        return frame.path + ((frame.key or "",) if frame.kind == "{" else (frame.index,))
+
+    def _end_token(self, end: int, completed: List[Tuple[Path, Any]], is_string: bool = False) -> None:
+        start, self._token_start = self._token_start, None
+        frame = self._stack[-1] if self._stack else None
+        if is_string and frame is not None and frame.kind == "{" and frame.expecting_key:
+            frame.key = json.loads(self._buffer[start:end])
+            return
+        self._complete(self._child_path(), start, end, completed)
+
+    def _complete(self, path: Path, start: int, end: int, completed: List[Tuple[Path, Any]]) -> None:
+        if not path or len(path) > self.max_depth:
+            return
+        try:
+            value = json.loads(self._buffer[start:end])
+        except ValueError:
+            return
+        completed.append((path, value))
+        if all(isinstance(part, str) for part in path):
+            target = self.value
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+                if not isinstance(target, dict):
+                    return
+            target[path[-1]] = value
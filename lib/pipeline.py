@@ -0,0 +1,75 @@
+from typing import Any, Dict, Optional, Tuple
+from .conversation_analyzer import ConversationAnalyzer
+from .email_generator import EmailGenerator
+from .schema import compile_schema
+from .telemetry import traced
+from utils.prompts import FUSED_ANALYSIS_EMAIL_PROMPT, FUSED_ANALYSIS_EMAIL_SCHEMA
+
+FUSED_VALIDATOR = compile_schema(FUSED_ANALYSIS_EMAIL_SCHEMA)
+
+class FusedPipeline:
+    """Analyze a conversation and draft the email in a single LLM round-trip"""
+
+    def __init__(self, analyzer: Optional[ConversationAnalyzer] = None, generator: Optional[EmailGenerator] = None):
+        self.analyzer = analyzer or ConversationAnalyzer()
+        self.generator = generator or EmailGenerator(self.analyzer.client, self.analyzer.async_client)
+
+    @traced("pipeline.analyze_and_generate")
+    def analyze_and_generate(self, conversation_text: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Return (analysis, email); email is None if the fused response didn't include one"""
+        if not self.analyzer._validate_input(conversation_text):
+            return None, None
+
+        previous = self.analyzer._previous_analysis(conversation_text)
+        if previous is not None:
+            # The email is drafted by a separate request, as when the fused response lacks one
+            return previous, None
+
+        response = self.analyzer.client.analyze_conversation(
+            conversation_text=conversation_text,
+            system_prompt=FUSED_ANALYSIS_EMAIL_PROMPT,
+            call_type="fused",
+            validator=FUSED_VALIDATOR
+        )
+
+        return self._split_response(conversation_text, response)
+
+    @traced("pipeline.analyze_and_generate")
+    async def analyze_and_generate_async(self, conversation_text: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Async variant of analyze_and_generate for concurrent callers"""
+        if not self.analyzer._validate_input(conversation_text):
+            return None, None
+
+        previous = self.analyzer._previous_analysis(conversation_text)
+        if previous is not None:
+            # The email is drafted by a separate request, as when the fused response lacks one
+            return previous, None
+
+        response = await self.analyzer.async_client.analyze_conversation(
+            conversation_text=conversation_text,
+            system_prompt=FUSED_ANALYSIS_EMAIL_PROMPT,
+            call_type="fused",
+            validator=FUSED_VALIDATOR
+        )
+
+        return self._split_response(conversation_text, response)
+
+    def _split_response(
+        self, conversation_text: str, response: Optional[Dict[str, Any]]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Post-process the fused JSON exactly as the two-call path would"""
+        if not response or not isinstance(response.get("analysis"), dict):
+            return None, None
+
+        analysis = self.analyzer._clean_analysis_data(response["analysis"])
+        self.analyzer._remember_analysis(conversation_text, analysis)
+
+        email_data = response.get("email")
+        if not isinstance(email_data, dict) or not email_data.get("body"):
+            return analysis, None
+
+        email = email_data["body"]
+        if email_data.get("subject"):
+            email = f"Subject: {email_data['subject']}\n\n{email}"
+
+        return analysis, self.generator._clean_email_output(email)
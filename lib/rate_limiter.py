@@ -0,0 +1,270 @@
+"""Process-wide rate limiting and priority scheduling for LLM requests.
+
+Every Streamlit session and batch worker in a process shares one API key, so
+requests are admitted through a single :class:`RateLimiter` with token buckets
+for requests per minute and (estimated) tokens per minute. Requests that would
+exceed a limit wait in a queue instead of failing, and interactive requests are
+always admitted ahead of queued bulk work.
+
+The lane of the current call is taken from a context variable, so batch code
+only has to wrap its work in ``with scheduling_lane(Lane.BULK):``. Queue depth
+and wait times per lane are exported through :data:`lib.telemetry.metrics`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .telemetry import metrics
+from .tokens import estimate_message_tokens
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long a queued async waiter sleeps before re-checking.
+_ASYNC_POLL_SECONDS = 0.05
+# Completion allowance used when a request doesn't set max_tokens.
+DEFAULT_COMPLETION_TOKENS = 1000
+
+
+class Lane(IntEnum):
+    """Scheduling priority; lower values are admitted first."""
+
+    INTERACTIVE = 0
+    BULK = 1
+
+
+_current_lane: contextvars.ContextVar[Lane] = contextvars.ContextVar("convoflow_lane", default=Lane.INTERACTIVE)
+
+
+def current_lane() -> Lane:
+    return _current_lane.get()
+
+
+@contextlib.contextmanager
+def scheduling_lane(lane: Lane) -> Iterator[None]:
+    """Run the enclosed calls (and asyncio tasks created inside) in ``lane``."""
+
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def estimate_request_tokens(request_options: Dict[str, Any]) -> int:
+    """Rough prompt + completion token estimate used for the tokens-per-minute bucket."""
+
+    prompt_tokens = estimate_message_tokens(request_options.get("messages", []))
+    completion_tokens = int(request_options.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+    # ``n`` choices each get up to ``max_tokens``.
+    return prompt_tokens + completion_tokens * int(request_options.get("n") or 1)
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding at most ``capacity`` units."""
+
+    def __init__(self, per_minute: float, *, capacity: Optional[float] = None) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` units are available (0 if they are now)."""
+
+        self._refill(now)
+        # A request larger than the bucket is admitted once the bucket is full.
+        missing = min(amount, self.capacity) - self._level
+        return max(0.0, missing / self.rate) if self.rate > 0 else (0.0 if missing <= 0 else float("inf"))
+
+    def take(self, amount: float) -> None:
+        self._level -= min(amount, self.capacity)
+
+
+@dataclass
+class LaneStats:
+    """Queueing metrics for one lane."""
+
+    admitted: int = 0
+    waited: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def record(self, wait: float) -> None:
+        self.admitted += 1
+        if wait > 0.001:
+            self.waited += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+@dataclass(order=True)
+class _Waiter:
+    lane: int
+    sequence: int
+
+
+class RateLimiter:
+    """Token-bucket admission with strict priority between lanes.
+
+    Waiters queue in ``(lane, arrival)`` order and only the head of the queue may
+    take from the buckets, so a burst of bulk requests can't starve a later
+    interactive one. Limits of ``None`` disable that bucket; the queue metrics
+    are still collected.
+    """
+
+    def __init__(self, *, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None) -> None:
+        self._buckets: List[Tuple[str, TokenBucket]] = []
+        if requests_per_minute:
+            self._buckets.append(("requests", TokenBucket(requests_per_minute)))
+        if tokens_per_minute:
+            self._buckets.append(("tokens", TokenBucket(tokens_per_minute)))
+        self._condition = threading.Condition()
+        self._queue: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._stats: Dict[Lane, LaneStats] = {lane: LaneStats() for lane in Lane}
+        self._depth: Dict[Lane, int] = {lane: 0 for lane in Lane}
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """Limiter configured by ``CONVOFLOW_RPM`` and ``CONVOFLOW_TPM`` (unset means unlimited)."""
+
+        def limit(name: str) -> Optional[float]:
+            value = os.getenv(name)
+            return float(value) if value else None
+
+        return cls(requests_per_minute=limit("CONVOFLOW_RPM"), tokens_per_minute=limit("CONVOFLOW_TPM"))
+
+    def _enqueue(self, lane: Lane) -> _Waiter:
+        waiter = _Waiter(int(lane), next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._queue, waiter)
+            self._track_depth_locked(Lane(lane), 1)
+        return waiter
+
+    def _track_depth_locked(self, lane: Lane, change: int) -> None:
+        self._depth[lane] += change
+        metrics.set(
+            "convoflow_rate_limit_queue_depth",
+            self._depth[lane],
+            "Requests waiting for the rate limiter",
+            lane=lane.name.lower(),
+        )
+
+    def _try_admit_locked(self, waiter: _Waiter, tokens: int) -> Optional[float]:
+        """Admit ``waiter`` if it is next and the buckets allow; else return a wait hint."""
+
+        if self._queue[0] is not waiter:
+            return None
+        now = time.monotonic()
+        amounts = {"requests": 1, "tokens": tokens}
+        wait = max((bucket.wait_time(amounts[name], now) for name, bucket in self._buckets), default=0.0)
+        if wait > 0:
+            return wait
+        for name, bucket in self._buckets:
+            bucket.take(amounts[name])
+        heapq.heappop(self._queue)
+        self._track_depth_locked(Lane(waiter.lane), -1)
+        self._condition.notify_all()
+        return 0.0
+
+    def _finish(self, waiter: _Waiter, started: float) -> float:
+        wait = time.perf_counter() - started
+        with self._condition:
+            self._stats[Lane(waiter.lane)].record(wait)
+        metrics.observe(
+            "convoflow_rate_limit_wait_seconds",
+            wait,
+            "Time requests waited for the rate limiter in seconds",
+            lane=Lane(waiter.lane).name.lower(),
+        )
+        if wait > 1.0:
+            logger.info("Request waited %.2fs for rate limit in lane %s", wait, Lane(waiter.lane).name.lower())
+        return wait
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        with self._condition:
+            if waiter in self._queue:
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+                self._track_depth_locked(Lane(waiter.lane), -1)
+                self._condition.notify_all()
+
+    def acquire(self, tokens: int = 0, *, lane: Optional[Lane] = None) -> float:
+        """Block until a request of ``tokens`` estimated tokens may be sent; return the wait."""
+
+        waiter = self._enqueue(current_lane() if lane is None else lane)
+        started = time.perf_counter()
+        try:
+            with self._condition:
+                while True:
+                    hint = self._try_admit_locked(waiter, tokens)
+                    if hint == 0.0:
+                        break
+                    self._condition.wait(timeout=hint)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        return self._finish(waiter, started)
+
+    async def acquire_async(self, tokens: int = 0, *, lane: Optional[Lane] = None) -> float:
+        """Async counterpart of :meth:`acquire` that never blocks the event loop."""
+
+        waiter = self._enqueue(current_lane() if lane is None else lane)
+        started = time.perf_counter()
+        try:
+            while True:
+                with self._condition:
+                    hint = self._try_admit_locked(waiter, tokens)
+                if hint == 0.0:
+                    break
+                await asyncio.sleep(min(hint, _ASYNC_POLL_SECONDS) if hint is not None else _ASYNC_POLL_SECONDS)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        return self._finish(waiter, started)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-lane queue depth, admissions and wait times."""
+
+        with self._condition:
+            return {
+                lane.name.lower(): {
+                    "queue_depth": self._depth[lane],
+                    "admitted": stats.admitted,
+                    "waited": stats.waited,
+                    "avg_wait_s": stats.total_wait / stats.admitted if stats.admitted else 0.0,
+                    "max_wait_s": stats.max_wait,
+                }
+                for lane, stats in self._stats.items()
+            }
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_default_limiter() -> RateLimiter:
+    """Return the process-wide limiter shared by every client."""
+
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter.from_env()
+        return _default_limiter
@@ -0,0 +1,97 @@
+"""Process-wide registry of ready-to-use clients, analyzers and generators.
+
+Building a :class:`ConversationAnalyzer` or :class:`EmailGenerator` resolves
+the API key and model and creates client objects. The registry does that once
+per ``(api_key, model, base_url)`` and hands every caller the same instances,
+so the per-request cost is a dictionary lookup. Different keys or models
+(e.g. one per tenant) get their own entry. The Streamlit app wraps
+:meth:`ResourceRegistry.get` in ``st.cache_resource``; batch jobs and workers
+can use :func:`get_default_registry` directly. Registry analyzers share the
+process-wide near-duplicate index, so a resubmitted note with small edits
+reuses the earlier analysis.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from .conversation_analyzer import ConversationAnalyzer
+from .email_generator import EmailGenerator
+from .near_duplicate import get_default_near_duplicate_index
+from .openai_client import AsyncOpenAIClient, OpenAIClient, resolve_client_settings
+from .pipeline import FusedPipeline
+
+
+ResourceKey = Tuple[str, str, Optional[str]]
+
+
+@dataclass(frozen=True)
+class Resources:
+    """Shared instances for one ``(api_key, model, base_url)``; all are safe to use from any thread."""
+
+    client: OpenAIClient
+    async_client: AsyncOpenAIClient
+    analyzer: ConversationAnalyzer
+    generator: EmailGenerator
+    pipeline: FusedPipeline
+
+
+class ResourceRegistry:
+    """Thread-safe, build-once cache of :class:`Resources` keyed by client settings."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._resources: Dict[ResourceKey, Resources] = {}
+        self.builds = 0
+
+    def get(
+        self, *, api_key: Optional[str] = None, model: Optional[str] = None, base_url: Optional[str] = None
+    ) -> Resources:
+        """Return the resources for these settings, building them on first use.
+
+        Unset values fall back to the environment (``OPENAI_API_KEY``,
+        ``OPENAI_MODEL``, ``OPENAI_BASE_URL``) or the app's secrets, exactly as
+        :class:`OpenAIClient` resolves them.
+        """
+
+        key = resolve_client_settings(api_key, model, base_url)
+        resources = self._resources.get(key)
+        if resources is not None:
+            return resources
+        with self._lock:
+            resources = self._resources.get(key)
+            if resources is None:
+                resources = self._resources[key] = _build(*key)
+                self.builds += 1
+            return resources
+
+    def clear(self) -> None:
+        with self._lock:
+            self._resources.clear()
+
+    def __len__(self) -> int:
+        return len(self._resources)
+
+
+def _build(api_key: str, model: str, base_url: Optional[str]) -> Resources:
+    client = OpenAIClient(api_key=api_key, model=model, base_url=base_url)
+    async_client = client.async_counterpart()
+    analyzer = ConversationAnalyzer(client, async_client, duplicates=get_default_near_duplicate_index())
+    generator = EmailGenerator(client, async_client)
+    return Resources(client, async_client, analyzer, generator, FusedPipeline(analyzer, generator))
+
+
+_default_registry: Optional[ResourceRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_default_registry() -> ResourceRegistry:
+    """Return the process-wide registry."""
+
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ResourceRegistry()
+        return _default_registry
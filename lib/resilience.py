@@ -0,0 +1,390 @@
+"""Retry, hedging and circuit-breaking for upstream LLM calls.
+
+``Resilience.call`` / ``Resilience.acall`` wrap a zero-argument request
+function with:
+
+* retries with jittered exponential backoff for transient errors (timeouts,
+  connection errors, 408/409/429 and 5xx responses), honouring ``Retry-After``;
+* optional hedged requests: if the first attempt hasn't answered within a
+  fixed delay or the observed p95 latency, a duplicate is sent and whichever
+  succeeds first wins;
+* a per-process circuit breaker that fails fast while upstream is unhealthy.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+
+class RetryPolicy:
+    """Jittered exponential backoff for transient upstream errors."""
+
+    def __init__(self, *, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @staticmethod
+    def is_retryable(exc: BaseException) -> bool:
+        # An SDK exception implies the SDK is loaded; don't import it just to check.
+        openai = sys.modules.get("openai")
+        if openai is None:
+            return False
+        if isinstance(exc, openai.APIConnectionError):
+            # Includes APITimeoutError
+            return True
+        if isinstance(exc, openai.APIStatusError):
+            return exc.status_code in RETRYABLE_STATUS_CODES
+        return False
+
+    def delay(self, attempt: int, exc: Optional[BaseException] = None) -> float:
+        """Seconds to wait before retry number ``attempt`` (1-based), with full jitter."""
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = _retry_after_seconds(exc)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+def _upstream_answered(exc: BaseException) -> bool:
+    """Whether ``exc`` is an error response from upstream, as opposed to a local or connection error."""
+
+    openai = sys.modules.get("openai")
+    return openai is not None and isinstance(exc, openai.APIStatusError)
+
+
+def _retry_after_seconds(exc: Optional[BaseException]) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    header = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(header) if header is not None else None
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open trial after a cool-down."""
+
+    def __init__(self, *, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state_locked()
+
+    def _state_locked(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Raise :class:`CircuitOpenError` unless a request may be sent now.
+
+        Returns ``True`` if the request is the half-open trial; the caller must
+        then record its outcome or call :meth:`end_trial`.
+        """
+
+        with self._lock:
+            state = self._state_locked()
+            if state == "open" or (state == "half-open" and self._trial_in_flight):
+                raise CircuitOpenError("Upstream is unavailable; circuit breaker is open")
+            if state == "half-open":
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def end_trial(self) -> None:
+        """Let another request through as the trial, e.g. after the trial was cancelled."""
+
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Opening circuit breaker after %d consecutive failures", self._failures)
+                self._opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of recent successful request latencies."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float, *, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class HedgePolicy:
+    """When to send a duplicate request: after ``after`` seconds, or the tracked p95."""
+
+    def __init__(self, *, after: Optional[float] = None, percentile: float = 0.95, min_samples: int = 20) -> None:
+        self.after = after
+        self.percentile = percentile
+        self.min_samples = min_samples
+
+    def delay(self, tracker: LatencyTracker) -> Optional[float]:
+        if self.after is not None:
+            return self.after
+        return tracker.percentile(self.percentile, min_samples=self.min_samples)
+
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _shared_hedge_executor() -> ThreadPoolExecutor:
+    """Pool for hedges only; first attempts never wait for one of its workers."""
+
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedged-request")
+        return _hedge_executor
+
+
+def _start_thread(send: Callable[[], Any]) -> "Future[Any]":
+    """Run ``send`` on a thread of its own and return a future for its result."""
+
+    future: "Future[Any]" = Future()
+
+    def run() -> None:
+        try:
+            result = send()
+        except BaseException as exc:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    future.set_running_or_notify_cancel()
+    threading.Thread(target=run, name="hedged-request-first", daemon=True).start()
+    return future
+
+
+class Resilience:
+    """Bundle of retry, hedging and circuit-breaker policies applied to one upstream."""
+
+    def __init__(
+        self,
+        *,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge: Optional[HedgePolicy] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self._sleep = sleep
+        self._latency: Dict[str, LatencyTracker] = {}
+        self._latency_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Resilience":
+        """Process-wide policies configured by ``CONVOFLOW_RETRY_*``, ``CONVOFLOW_BREAKER_*``, ``CONVOFLOW_HEDGE_AFTER``."""
+
+        hedge_after = os.getenv("CONVOFLOW_HEDGE_AFTER", "").strip().lower()
+        hedge = None
+        if hedge_after == "p95":
+            hedge = HedgePolicy()
+        elif hedge_after:
+            hedge = HedgePolicy(after=float(hedge_after))
+
+        return cls(
+            retry=RetryPolicy(
+                max_attempts=int(os.getenv("CONVOFLOW_RETRY_ATTEMPTS", "3")),
+                base_delay=float(os.getenv("CONVOFLOW_RETRY_BASE_DELAY", "0.5")),
+            ),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("CONVOFLOW_BREAKER_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("CONVOFLOW_BREAKER_RESET", "30")),
+            ),
+            hedge=hedge,
+        )
+
+    def latency(self, key: str) -> LatencyTracker:
+        """Latency window for one kind of request (e.g. model + response format)."""
+
+        with self._latency_lock:
+            tracker = self._latency.get(key)
+            if tracker is None:
+                tracker = self._latency[key] = LatencyTracker()
+            return tracker
+
+    def _hedge_delay(self, hedge: bool, key: str) -> Optional[float]:
+        return self.hedge.delay(self.latency(key)) if hedge and self.hedge is not None else None
+
+    def _record_error(self, exc: BaseException, attempt: int) -> bool:
+        """Update the breaker for a failed attempt and return whether to retry it."""
+
+        if not self.retry.is_retryable(exc):
+            if _upstream_answered(exc):
+                # Upstream answered (e.g. 400/401), so it is healthy even though the call failed
+                self.breaker.record_success()
+            # Anything else (a bug in the caller, CircuitOpenError) says nothing about upstream;
+            # a half-open trial is released by the caller without changing the breaker state
+            return False
+        self.breaker.record_failure()
+        if attempt >= self.retry.max_attempts:
+            return False
+        logger.warning("Transient upstream error on attempt %d, retrying: %s", attempt, exc)
+        return True
+
+    def call(self, send: Callable[[], Any], *, key: str = "default", hedge: bool = True) -> Any:
+        """Run ``send`` with retries, optional hedging and the circuit breaker.
+
+        ``key`` groups requests whose latencies are comparable for the p95 hedge
+        threshold; pass ``hedge=False`` for requests that must not be duplicated.
+        """
+
+        attempt = 0
+        while True:
+            attempt += 1
+            trial = self.breaker.before_call()
+            started = time.perf_counter()
+            try:
+                delay = self._hedge_delay(hedge, key)
+                result = self._hedged(send, delay) if delay is not None else send()
+            except Exception as exc:
+                if not self._record_error(exc, attempt):
+                    raise
+                self._sleep(self.retry.delay(attempt, exc))
+                continue
+            else:
+                self.latency(key).record(time.perf_counter() - started)
+                self.breaker.record_success()
+                return result
+            finally:
+                if trial:
+                    # No-op once the outcome was recorded; frees the trial after KeyboardInterrupt and the like
+                    self.breaker.end_trial()
+
+    async def acall(self, send: Callable[[], Awaitable[Any]], *, key: str = "default", hedge: bool = True) -> Any:
+        """Async counterpart of :meth:`call`; hedged losers are cancelled."""
+
+        attempt = 0
+        while True:
+            attempt += 1
+            trial = self.breaker.before_call()
+            started = time.perf_counter()
+            try:
+                delay = self._hedge_delay(hedge, key)
+                result = await (self._ahedged(send, delay) if delay is not None else send())
+            except Exception as exc:
+                if not self._record_error(exc, attempt):
+                    raise
+                await asyncio.sleep(self.retry.delay(attempt, exc))
+                continue
+            else:
+                self.latency(key).record(time.perf_counter() - started)
+                self.breaker.record_success()
+                return result
+            finally:
+                if trial:
+                    # No-op once the outcome was recorded; frees the trial if the task was cancelled
+                    self.breaker.end_trial()
+
+    @staticmethod
+    def _hedged(send: Callable[[], Any], delay: float) -> Any:
+        # The first attempt gets a thread of its own, so hedging neither caps concurrent requests at the
+        # pool size nor makes hedges queue behind first attempts. It can't run on the caller's thread:
+        # the caller has to be free to return the hedge's result if that comes back first.
+        first = _start_thread(send)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+
+        # The slow attempt can't be interrupted; whichever finishes second is discarded.
+        pending = {first, _shared_hedge_executor().submit(send)}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    @staticmethod
+    async def _ahedged(send: Callable[[], Awaitable[Any]], delay: float) -> Any:
+        first = asyncio.ensure_future(send())
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        pending = {first, asyncio.ensure_future(send())}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+_default_resilience: Optional[Resilience] = None
+_default_resilience_lock = threading.Lock()
+
+
+def get_default_resilience() -> Resilience:
+    """Return the process-wide policies, so every client shares one circuit breaker."""
+
+    global _default_resilience
+    with _default_resilience_lock:
+        if _default_resilience is None:
+            _default_resilience = Resilience.from_env()
+        return _default_resilience
+
@@ -0,0 +1,210 @@
+"""Persistent, content-addressed cache for LLM responses.
+
+Entries live in a SQLite database in WAL mode so several Streamlit or batch
+processes can share one cache file. Keys are SHA-256 digests of the request
+(model, system prompt, user content and request options), entries expire
+after a TTL and the file is kept under a byte budget by evicting the least
+recently used rows.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "convoflow", "llm_cache.sqlite3")
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at);
+CREATE TABLE IF NOT EXISTS responses_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);
+CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN
+    UPDATE responses_size SET total = total + new.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses BEGIN
+    UPDATE responses_size SET total = total - old.size + new.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN
+    UPDATE responses_size SET total = total - old.size WHERE id = 0;
+END;
+INSERT OR IGNORE INTO responses_size (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM responses;
+"""
+
+
+def request_cache_key(request_options: Dict[str, Any]) -> str:
+    """Return a stable content hash for a chat completion request."""
+
+    canonical = json.dumps(request_options, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache with TTL expiry, safe across threads and processes."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        *,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One transaction, so caches created before the size table get an exact starting total.
+        self._connection().executescript(f"BEGIN IMMEDIATE;{_SCHEMA}COMMIT;")
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """Build the cache configured by ``CONVOFLOW_CACHE_*`` variables, or ``None`` if disabled."""
+
+        if os.getenv("CONVOFLOW_CACHE_DISABLED", "").lower() in {"1", "true", "yes"}:
+            return None
+        try:
+            return cls(
+                os.getenv("CONVOFLOW_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl_seconds=float(os.getenv("CONVOFLOW_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+                max_bytes=int(os.getenv("CONVOFLOW_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            )
+        except (OSError, sqlite3.Error):
+            logger.warning("Response cache unavailable; continuing without it", exc_info=True)
+            return None
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads; keep one per thread.
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for ``key``, or ``None`` on a miss or expiry."""
+
+        now = time.time()
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._count("misses")
+                return None
+            connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            logger.warning("Response cache read failed", exc_info=True)
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """Store ``value`` under ``key`` and evict LRU entries beyond the size budget."""
+
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        try:
+            connection = self._connection()
+            # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete skips the size triggers.
+            connection.execute(
+                "INSERT INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                (key, value, size, now, now),
+            )
+            self._evict(connection, now)
+        except sqlite3.Error:
+            logger.warning("Response cache write failed", exc_info=True)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        expired = connection.execute(
+            "DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        evicted = max(expired, 0)
+
+        excess = connection.execute("SELECT total FROM responses_size WHERE id = 0").fetchone()[0] - self.max_bytes
+        if excess > 0:
+            # Walk the accessed_at index from the oldest entry and stop once enough bytes are freed.
+            stale = []
+            for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+                stale.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            connection.executemany("DELETE FROM responses WHERE key = ?", stale)
+            evicted += len(stale)
+
+        if evicted:
+            self._count("evictions", evicted)
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+
+        self._connection().execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for this process plus the current cache footprint."""
+
+        entries, size = self._connection().execute(
+            "SELECT (SELECT COUNT(*) FROM responses), total FROM responses_size WHERE id = 0"
+        ).fetchone()
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": size,
+            }
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_loaded = False
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ResponseCache]:
+    """Return the process-wide cache configured from the environment."""
+
+    global _default_cache, _default_cache_loaded
+    with _default_cache_lock:
+        if not _default_cache_loaded:
+            _default_cache = ResponseCache.from_env()
+            _default_cache_loaded = True
+        return _default_cache
@@ -0,0 +1,205 @@
+"""Strict structured-output formats and a compiled, coercing JSON Schema validator.
+
+:func:`compile_schema` turns the subset of JSON Schema used by
+``utils.prompts`` (objects, arrays, strings, numbers, booleans) into a tree of
+closures once, so checking a response is a handful of type tests rather than a
+walk over the schema. Values are coerced where the intent is clear instead of
+rejecting the whole response:
+
+* a string where a list belongs becomes a one-item list (blank → ``[]``);
+* numbers and booleans become strings, and a list of scalars where a string
+  belongs is joined with ``", "``;
+* numeric strings become numbers;
+* unknown keys are dropped when ``additionalProperties`` is false, and values
+  that can't be coerced (``null``, an object where a string belongs) are
+  dropped so the caller's defaults apply.
+
+Only a root value of the wrong type raises :class:`SchemaError`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from .telemetry import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# Model families that accept ``response_format={"type": "json_schema", "strict": true}``.
+STRUCTURED_OUTPUT_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+# Snapshots of those families released before structured outputs.
+UNSTRUCTURED_SNAPSHOTS = ("gpt-4o-2024-05-13", "o1-preview", "o1-mini")
+
+
+class SchemaError(ValueError):
+    """Raised when a response can't be coerced to its schema."""
+
+
+class _Invalid(Exception):
+    pass
+
+
+_Coercer = Callable[[Any, str, List[str]], Any]
+
+
+def _compile(schema: Dict[str, Any]) -> _Coercer:
+    kind = schema.get("type")
+    if kind == "object":
+        return _compile_object(schema)
+    if kind == "array":
+        return _compile_array(schema)
+    if kind == "string":
+        return _coerce_string
+    if kind in ("number", "integer"):
+        return _number_coercer(int if kind == "integer" else float)
+    if kind == "boolean":
+        return _coerce_boolean
+    raise ValueError(f"Unsupported schema type: {kind!r}")
+
+
+def _compile_object(schema: Dict[str, Any]) -> _Coercer:
+    properties = {name: _compile(subschema) for name, subschema in schema.get("properties", {}).items()}
+    keep_unknown = schema.get("additionalProperties", True) is not False
+
+    def coerce(value: Any, path: str, fixes: List[str]) -> Dict[str, Any]:
+        if not isinstance(value, dict):
+            raise _Invalid
+        result = {}
+        for key, item in value.items():
+            coerce_item = properties.get(key)
+            if coerce_item is None:
+                if keep_unknown:
+                    result[key] = item
+                else:
+                    fixes.append(f"{path}.{key}: dropped unknown key")
+                continue
+            try:
+                result[key] = coerce_item(item, f"{path}.{key}", fixes)
+            except _Invalid:
+                fixes.append(f"{path}.{key}: dropped {type(item).__name__}")
+        return result
+
+    return coerce
+
+
+def _compile_array(schema: Dict[str, Any]) -> _Coercer:
+    coerce_item = _compile(schema.get("items", {"type": "string"}))
+
+    def coerce(value: Any, path: str, fixes: List[str]) -> List[Any]:
+        if value is None or (isinstance(value, str) and not value.strip()):
+            fixes.append(f"{path}: empty {type(value).__name__} as []")
+            return []
+        if not isinstance(value, list):
+            if isinstance(value, dict):
+                raise _Invalid
+            fixes.append(f"{path}: wrapped {type(value).__name__} in a list")
+            value = [value]
+        result = []
+        for index, item in enumerate(value):
+            try:
+                result.append(coerce_item(item, f"{path}[{index}]", fixes))
+            except _Invalid:
+                fixes.append(f"{path}[{index}]: dropped {type(item).__name__}")
+        return result
+
+    return coerce
+
+
+def _coerce_string(value: Any, path: str, fixes: List[str]) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bool, int, float)):
+        fixes.append(f"{path}: {type(value).__name__} as string")
+        return str(value)
+    if isinstance(value, list) and all(isinstance(item, (str, int, float)) for item in value):
+        fixes.append(f"{path}: joined list")
+        return ", ".join(str(item) for item in value)
+    raise _Invalid
+
+
+def _number_coercer(number_type: type) -> _Coercer:
+    def coerce(value: Any, path: str, fixes: List[str]) -> Any:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return number_type(value)
+        if isinstance(value, str):
+            try:
+                number = float(value.strip())
+            except ValueError:
+                raise _Invalid from None
+            fixes.append(f"{path}: string as number")
+            return number_type(number)
+        raise _Invalid
+
+    return coerce
+
+
+def _coerce_boolean(value: Any, path: str, fixes: List[str]) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        fixes.append(f"{path}: string as boolean")
+        return value.strip().lower() == "true"
+    raise _Invalid
+
+
+class Validator:
+    """Coercing validator for one schema; build it once with :func:`compile_schema`."""
+
+    def __init__(self, schema: Dict[str, Any]) -> None:
+        self.schema = schema
+        self.name = schema.get("title", "response")
+        self._coerce = _compile(schema)
+        body = {key: value for key, value in schema.items() if key != "title"}
+        self._response_format = {
+            "type": "json_schema",
+            "json_schema": {"name": self.name, "strict": True, "schema": body},
+        }
+
+    def __call__(self, value: Any, *, record: bool = True) -> Any:
+        """Return ``value`` coerced to the schema; raises :class:`SchemaError` if the root can't be.
+
+        ``record=False`` skips metrics and logging, e.g. for partial responses
+        that are re-checked as they stream in.
+        """
+
+        fixes: List[str] = []
+        try:
+            result = self._coerce(value, "$", fixes)
+        except _Invalid:
+            if not record:
+                raise SchemaError(f"{self.name} response is a {type(value).__name__}") from None
+            metrics.inc("convoflow_schema_rejections_total", 1, "Responses rejected by the schema", schema=self.name)
+            kind = type(value).__name__
+            raise SchemaError(f"{self.name} response is a {kind}, not a {self.schema['type']}") from None
+        if fixes and record:
+            metrics.inc("convoflow_schema_coercions_total", len(fixes), "Fields coerced to a schema", schema=self.name)
+            logger.debug("Coerced %s response: %s", self.name, "; ".join(fixes))
+        return result
+
+    def response_format(self) -> Dict[str, Any]:
+        """``response_format`` for a strict structured output with this schema."""
+
+        return self._response_format
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    return Validator(schema)
+
+
+def structured_outputs_enabled(model: str, setting: Optional[str] = None) -> bool:
+    """Whether to request strict structured outputs from ``model``.
+
+    ``CONVOFLOW_STRUCTURED_OUTPUTS`` forces it on (``1``) or off (``0``); the
+    default (``auto``) enables it for model families known to support it.
+    Otherwise the request falls back to JSON mode and relies on local validation.
+    """
+
+    setting = (setting if setting is not None else os.getenv("CONVOFLOW_STRUCTURED_OUTPUTS", "auto")).lower()
+    if setting in ("1", "true", "yes", "on"):
+        return True
+    if setting in ("0", "false", "no", "off"):
+        return False
+    return model.startswith(STRUCTURED_OUTPUT_MODELS) and not model.startswith(UNSTRUCTURED_SNAPSHOTS)
@@ -0,0 +1,126 @@
+"""Coalescing of identical concurrent LLM requests ("single flight").
+
+When several sessions submit the same conversation at once, or one user
+double-clicks "Generate Email", only the first request goes upstream. Callers
+with the same key wait for that in-flight call and share its result (or its
+exception). Keys are request cache keys, i.e. a hash of the model, prompt and
+input, so only truly identical requests are merged. If the leading call is
+cancelled (or interrupted), waiters aren't: they retry, and one of them leads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+class _LeaderInterrupted(Exception):
+    """Set on a shared call whose leader was cancelled or interrupted; waiters retry."""
+
+
+class SingleFlight:
+    """Per-process registry of in-flight calls, usable from threads and asyncio."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._async_calls: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        """Run ``fn`` unless a call with ``key`` is already running; then share its outcome."""
+
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            try:
+                return future.result()
+            except _LeaderInterrupted:
+                return self.do(key, fn)
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            # KeyboardInterrupt and the like concern the leader's thread only
+            future.set_exception(exc if isinstance(exc, Exception) else _LeaderInterrupted())
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Async counterpart of :meth:`do`; calls are coalesced per event loop."""
+
+        flight_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            future = self._async_calls.get(flight_key)
+            leader = future is None
+            if leader:
+                future = self._async_calls[flight_key] = asyncio.get_running_loop().create_future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            try:
+                # Shield so a cancelled follower doesn't cancel the shared result.
+                return await asyncio.shield(future)
+            except _LeaderInterrupted:
+                return await self.do_async(key, fn)
+
+        try:
+            result = await fn()
+        except BaseException as exc:
+            # Cancelling the leader mustn't cancel its followers
+            future.set_exception(exc if isinstance(exc, Exception) else _LeaderInterrupted())
+            # Mark retrieved so an unshared failure isn't reported as never awaited.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._async_calls[flight_key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Upstream calls made and calls saved by coalescing."""
+
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._async_calls),
+                "saved_ratio": self.coalesced / total if total else 0.0,
+            }
+
+
+_default_single_flight: Optional[SingleFlight] = None
+_default_single_flight_lock = threading.Lock()
+
+
+def get_default_single_flight() -> SingleFlight:
+    """Return the registry shared by every client in the process."""
+
+    global _default_single_flight
+    with _default_single_flight_lock:
+        if _default_single_flight is None:
+            _default_single_flight = SingleFlight()
+        return _default_single_flight
@@ -0,0 +1,136 @@
+"""Speculative conversation analysis that starts while the user is still editing.
+
+The input assistant already scores the text on every Streamlit rerun. Once the
+score is promising and the text has been idle for a short window, the analysis
+request is started on a background thread. When the user clicks "Generate
+Email" for the same text, the finished (or in-flight) analysis is reused and
+only email generation remains on the critical path.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_SECONDS = 1.5
+ELIGIBLE_LIKELIHOODS = ("Likely", "Extremely Likely")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    """Worker pool shared by every session so speculation stays bounded per process."""
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative-analysis")
+        return _executor
+
+
+def text_key(text: str) -> str:
+    """Hash identifying one exact version of the conversation input."""
+
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SpeculativeAnalyzer:
+    """Debounced background analysis for a single user session.
+
+    ``observe`` is called with the current text on every rerun. Only the job for
+    the latest text is kept: a changed text cancels the pending timer and
+    discards the previous job's result.
+    """
+
+    def __init__(
+        self,
+        analyze: Callable[[str], Optional[Dict[str, Any]]],
+        *,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ) -> None:
+        self._analyze = analyze
+        self.idle_seconds = idle_seconds
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._latest_key: Optional[str] = None
+        self._timer: Optional[threading.Timer] = None
+        self._job_key: Optional[str] = None
+        self._job: Optional[Future] = None
+
+    def observe(self, text: str, likelihood: Optional[str]) -> None:
+        """Record the latest input and schedule speculation if it looks promising."""
+
+        key = text_key(text)
+        with self._lock:
+            if key == self._latest_key:
+                return
+            self._latest_key = key
+            self._discard_stale_locked(key)
+
+            if likelihood not in ELIGIBLE_LIKELIHOODS or self._job_key == key:
+                return
+
+            self._timer = threading.Timer(self.idle_seconds, self._start, args=(key, text))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _discard_stale_locked(self, key: str) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._job is not None and self._job_key != key:
+            # A running request can't be interrupted, but its result is no longer used.
+            self._job.cancel()
+            self._job = None
+            self._job_key = None
+
+    def _start(self, key: str, text: str) -> None:
+        with self._lock:
+            if key != self._latest_key or self._job_key == key:
+                return
+            self._timer = None
+            executor = self._executor or _shared_executor()
+            self._job = executor.submit(self._analyze, text)
+            self._job_key = key
+        logger.debug("Started speculative analysis for input %s", key[:12])
+
+    def result_for(self, text: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return the speculative analysis for exactly ``text``, waiting if it is in flight.
+
+        Returns ``None`` when no job was started for this text or the job failed,
+        in which case the caller should run the analysis itself.
+        """
+
+        key = text_key(text)
+        with self._lock:
+            job = self._job if self._job_key == key else None
+            if job is None and key == self._latest_key and self._timer is not None:
+                # The idle window hasn't elapsed yet; the caller's own request replaces it.
+                self._timer.cancel()
+                self._timer = None
+
+        if job is None:
+            return None
+        try:
+            return job.result(timeout=timeout)
+        except (CancelledError, FutureTimeoutError):
+            return None
+        except Exception:
+            logger.warning("Speculative analysis failed; falling back to a fresh request", exc_info=True)
+            return None
+
+    def cancel(self) -> None:
+        """Cancel pending speculation and discard any job."""
+
+        with self._lock:
+            self._latest_key = None
+            self._discard_stale_locked("")
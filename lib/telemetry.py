@@ -0,0 +1,327 @@
+"""Lightweight tracing spans and Prometheus-style metrics for the analyze → email pipeline.
+
+``span("analyze")`` times a block, records the duration in the
+``convoflow_span_seconds`` histogram and, when a trace is active (see
+:func:`start_trace`), appends it to that trace so the app can show a per-stage
+breakdown of the last request. Metrics are exported in the Prometheus text
+format, either from a small HTTP endpoint (``CONVOFLOW_METRICS_PORT``) or by
+rewriting a file after each trace (``CONVOFLOW_METRICS_FILE``).
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+
+logger = logging.getLogger(__name__)
+
+# Prometheus' default buckets, extended for multi-second LLM calls.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: Dict[LabelKey, List[float]] = {}  # bucket counts..., +Inf count, sum
+
+    def observe(self, value: float, labels: LabelKey) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', le),))} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative:g}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._series: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float, labels: LabelKey) -> None:
+        self._series[labels] = self._series.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(labels)} {value:g}" for labels, value in sorted(self._series.items())]
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._series: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, labels: LabelKey) -> None:
+        self._series[labels] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        lines += [f"{self.name}{_format_labels(labels)} {value:g}" for labels, value in sorted(self._series.items())]
+        return lines
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe set of named metrics rendered in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+
+    def _get(self, cls, name: str, help_text: str):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help_text)
+        return metric
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels: Any) -> None:
+        with self._lock:
+            self._get(Histogram, name, help_text).observe(value, _label_key(labels))
+
+    def inc(self, name: str, amount: float = 1.0, help_text: str = "", **labels: Any) -> None:
+        with self._lock:
+            self._get(Counter, name, help_text).inc(amount, _label_key(labels))
+
+    def set(self, name: str, value: float, help_text: str = "", **labels: Any) -> None:
+        with self._lock:
+            self._get(Gauge, name, help_text).set(value, _label_key(labels))
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            lines = [line for _, metric in sorted(self._metrics.items()) for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+
+metrics = MetricsRegistry()
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    started: float
+    seconds: float
+    depth: int
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+class Trace:
+    """Spans recorded for one user request, in completion order."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.started = time.time()
+        self.spans: List[SpanRecord] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: SpanRecord) -> None:
+        with self._lock:
+            self.spans.append(record)
+
+    def breakdown(self) -> List[Dict[str, Any]]:
+        """Rows of ``stage`` / ``ms`` / attributes in start order, nested spans indented."""
+
+        with self._lock:
+            spans = sorted(self.spans, key=lambda record: (record.started, record.depth))
+        return [
+            {"stage": "  " * record.depth + record.name, "ms": round(record.seconds * 1000, 1), **record.attributes}
+            for record in spans
+        ]
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("convoflow_trace", default=None)
+_span_depth: contextvars.ContextVar[int] = contextvars.ContextVar("convoflow_span_depth", default=0)
+
+
+@contextlib.contextmanager
+def start_trace(name: str, trace: Optional[Trace] = None) -> Iterator[Trace]:
+    """Collect spans from the enclosed block into ``trace`` (a new one by default)."""
+
+    trace = trace or Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        export_metrics_file()
+
+
+class Span:
+    """Handle for an open span; ``set`` attaches attributes such as token counts."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.attributes = attributes
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+def record_span(name: str, seconds: float, *, depth: Optional[int] = None, **attributes: Any) -> None:
+    """Record an already-measured span (e.g. a stream consumed across yields)."""
+
+    metrics.observe("convoflow_span_seconds", seconds, "Duration of pipeline stages in seconds", span=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        depth = _span_depth.get() if depth is None else depth
+        trace.add(SpanRecord(name, time.perf_counter() - seconds, seconds, depth, attributes))
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time the enclosed block as pipeline stage ``name``."""
+
+    handle = Span(name, dict(attributes))
+    depth = _span_depth.get()
+    token = _span_depth.set(depth + 1)
+    started = time.perf_counter()
+    try:
+        yield handle
+    finally:
+        _span_depth.reset(token)
+        record_span(name, time.perf_counter() - started, depth=depth, **handle.attributes)
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator form of :func:`span` for plain and ``async`` functions."""
+
+    def decorate(func: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def record_llm_call(call_type: str, model: str, seconds: float, prompt_tokens: int, completion_tokens: int) -> None:
+    """Metrics for one upstream LLM call."""
+
+    metrics.observe(
+        "convoflow_llm_request_seconds",
+        seconds,
+        "Upstream LLM request latency in seconds",
+        model=model,
+        call_type=call_type,
+    )
+    help_text = "Tokens used by LLM requests"
+    metrics.inc("convoflow_llm_tokens_total", prompt_tokens, help_text, model=model, call_type=call_type, kind="prompt")
+    metrics.inc(
+        "convoflow_llm_tokens_total", completion_tokens, help_text, model=model, call_type=call_type, kind="completion"
+    )
+
+
+def export_metrics_file(path: Optional[str] = None) -> None:
+    """Atomically rewrite the metrics file (``CONVOFLOW_METRICS_FILE``), if one is configured."""
+
+    path = path or os.getenv("CONVOFLOW_METRICS_FILE")
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            handle.write(metrics.render_prometheus())
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.warning("Could not write metrics file %s", path, exc_info=True)
+
+
+def _metrics_handler():
+    # http.server is only imported when the endpoint is enabled.
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            logger.debug("metrics endpoint: " + format, *args)
+
+    return MetricsHandler
+
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Serve ``/metrics`` on ``port`` (default ``CONVOFLOW_METRICS_PORT``); started at most once per process."""
+
+    global _metrics_server
+    port = port if port is not None else int(os.getenv("CONVOFLOW_METRICS_PORT", "0") or 0)
+    if not port:
+        return None
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            from http.server import ThreadingHTTPServer
+
+            _metrics_server = ThreadingHTTPServer((host, port), _metrics_handler())
+            _metrics_server.daemon_threads = True
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+            logger.info("Serving Prometheus metrics on http://%s:%d/metrics", host, port)
+        return _metrics_server
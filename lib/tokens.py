@@ -0,0 +1,154 @@
+"""Offline token estimation, completion budgets and per-call usage accounting.
+
+``estimate_tokens`` approximates the GPT BPE tokenizers without downloading
+vocabulary files: words, numbers and punctuation runs are counted separately,
+with long words split into several pieces. It is meant for budgeting
+and rate limiting, where being within ~10-15% is enough.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+# Completion budgets per call type; override with CONVOFLOW_MAX_TOKENS_<TYPE>.
+COMPLETION_TOKEN_LIMITS = {
+    "analysis": 1200,
+    "analysis_delta": 400,
+    "email": 600,
+    "fused": 1800,
+}
+
+# Per-message framing overhead of the chat format (role, separators).
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]+|\s+")
+# Case-sensitive on purpose: "UM" may well be a university.
+_FILLER_WORDS = re.compile(r"(?<!\w)(?:[Uu]m+|[Uu]h+|[Ee]rm+|[Hh]mm+)(?!\w)[,.]?[ \t]*")
+_INLINE_WHITESPACE = re.compile(r"[ \t\f\v\u00a0]+")
+_EXTRA_BLANK_LINES = re.compile(r"\n{3,}")
+_REPEATED_PUNCTUATION = re.compile(r"([!?.,])\1{2,}")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of GPT tokens in ``text``."""
+
+    tokens = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        first = piece[0]
+        if first.isspace():
+            # A single space merges into the next word; newlines and indentation cost tokens.
+            tokens += piece.count("\n") + (len(piece.rsplit("\n", 1)[-1]) > 1)
+        elif first.isalpha():
+            tokens += 1 + (len(piece) - 1) // 6
+        elif first.isdigit():
+            tokens += 1
+        else:
+            tokens += (len(piece) + 1) // 2
+    return tokens
+
+
+def estimate_message_tokens(messages) -> int:
+    return sum(_MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content") or "") for message in messages)
+
+
+def completion_token_limit(call_type: str) -> int:
+    """``max_tokens`` for a call type, honouring ``CONVOFLOW_MAX_TOKENS_<TYPE>``."""
+
+    override = os.getenv(f"CONVOFLOW_MAX_TOKENS_{call_type.upper()}")
+    return int(override) if override else COMPLETION_TOKEN_LIMITS[call_type]
+
+
+def compact_text(text: str) -> str:
+    """Drop verbal filler and redundant whitespace from user-supplied notes.
+
+    Removes standalone "um"/"uh"/"erm"/"hmm", collapses runs of spaces and tabs,
+    trailing spaces and more than one blank line, and shortens "!!!!" to "!!".
+    Wording and line structure are otherwise left untouched.
+    """
+
+    text = _FILLER_WORDS.sub("", text)
+    text = _REPEATED_PUNCTUATION.sub(r"\1\1", text)
+    lines = (_INLINE_WHITESPACE.sub(" ", line).strip() for line in text.splitlines())
+    return _EXTRA_BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+@functools.lru_cache(maxsize=32)
+def compact_prompt(prompt: str) -> str:
+    """Strip indentation and blank-line padding from a static system prompt (memoized)."""
+
+    lines = (line.strip() for line in prompt.strip().splitlines())
+    return _EXTRA_BLANK_LINES.sub("\n\n", "\n".join(lines))
+
+
+@dataclass
+class UsageTotals:
+    """Accumulated token usage and latency for one call type."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    estimated_prompt_tokens: int = 0
+    latency: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "estimated_prompt_tokens": self.estimated_prompt_tokens,
+            "avg_latency_s": self.latency / self.calls if self.calls else 0.0,
+        }
+
+
+class UsageRecorder:
+    """Thread-safe per-call-type totals of the ``usage`` reported by the API."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._totals: Dict[str, UsageTotals] = {}
+
+    def record(
+        self,
+        call_type: str,
+        *,
+        usage: Optional[Any],
+        estimated_prompt_tokens: int,
+        latency: float,
+        completion_text: str = "",
+    ) -> None:
+        """Add one call. Without ``usage`` (e.g. streams), tokens are estimated."""
+
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        with self._lock:
+            totals = self._totals.setdefault(call_type, UsageTotals())
+            totals.calls += 1
+            totals.prompt_tokens += prompt_tokens if prompt_tokens is not None else estimated_prompt_tokens
+            totals.completion_tokens += (
+                completion_tokens if completion_tokens is not None else estimate_tokens(completion_text)
+            )
+            totals.estimated_prompt_tokens += estimated_prompt_tokens
+            totals.latency += latency
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {call_type: totals.as_dict() for call_type, totals in self._totals.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+
+
+_default_recorder = UsageRecorder()
+
+
+def get_usage_recorder() -> UsageRecorder:
+    """Return the process-wide usage recorder."""
+
+    return _default_recorder
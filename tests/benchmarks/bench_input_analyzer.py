@@ -0,0 +1,59 @@
+"""Microbenchmark: compiled rule engine vs. the original InputAnalyzer.
+
+Run with ``python tests/benchmarks/bench_input_analyzer.py``.
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import timeit
+from pathlib import Path
+
+TESTS_DIR = Path(__file__).resolve().parents[1]
+PROJECT_ROOT = TESTS_DIR.parent
+for path in (str(PROJECT_ROOT), str(TESTS_DIR)):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from input_analyzer_reference import ReferenceInputAnalyzer
+from lib.input_analyzer import InputAnalyzer
+
+
+RICH_WORDS = (
+    "met sarah chen vp of engineering at databricks we discussed their partnership and she "
+    "mentioned hiring we are both alumni she offered to introduce me to recruiting"
+).split()
+SPARSE_WORDS = "hello weather booth coffee lunch nice great good quick note while queue line".split()
+SIZES = (100, 1_000, 10_000)
+
+
+def make_text(words, size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(words) for _ in range(size))
+
+
+def time_call(func, text: str) -> float:
+    """Best-of-5 mean seconds per call."""
+
+    timer = timeit.Timer(lambda: func(text))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main() -> None:
+    current = InputAnalyzer()
+    reference = ReferenceInputAnalyzer()
+
+    print(f"{'input':<22}{'reference':>12}{'compiled':>12}{'speedup':>10}")
+    for label, words in (("keyword-rich", RICH_WORDS), ("keyword-sparse", SPARSE_WORDS)):
+        for size in SIZES:
+            text = make_text(words, size)
+            before = time_call(reference.analyze_input_quality, text)
+            after = time_call(current.analyze_input_quality, text)
+            name = f"{label} {size}w"
+            print(f"{name:<22}{before * 1e6:>10.1f}us{after * 1e6:>10.1f}us{before / after:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
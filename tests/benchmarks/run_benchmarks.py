@@ -0,0 +1,301 @@
+"""Benchmark suite for the hot paths, with JSON baselines and regression checks.
+
+Run with::
+
+    python tests/benchmarks/run_benchmarks.py                     # print timings
+    python tests/benchmarks/run_benchmarks.py --save               # write baseline.json
+    python tests/benchmarks/run_benchmarks.py --compare --threshold 25
+
+``--compare`` exits with status 1 when any benchmark is more than
+``--threshold`` percent slower than the baseline. Baselines are machine
+specific: re-save them when moving to different hardware. ``--filter`` runs
+only benchmarks whose name contains the given text.
+
+``import[...]`` entries are cold-start costs: the cumulative import time of a
+library module in a fresh interpreter, as reported by ``python -X importtime``
+(``--filter import`` runs only those).
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.contacts import ContactStore
+from lib.conversation_analyzer import ANALYSIS_VALIDATOR, ConversationAnalyzer
+from lib.email_generator import EmailGenerator
+from lib.fake_server import DEFAULT_PAYLOADS
+from lib.input_analyzer import InputAnalyzer
+from lib.near_duplicate import NearDuplicateIndex, minhash_signature
+from lib.openai_client import AsyncOpenAIClient, OpenAIClient
+from utils.validation import ConversationValidator
+
+
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_THRESHOLD = 20.0
+SIZES = (100, 1_000, 10_000)
+IMPORT_MODULES = ("lib.conversation_analyzer", "lib.email_generator", "lib.pipeline", "lib.batch")
+
+CONVERSATION_WORDS = (
+    "met sarah chen vp of engineering at databricks we discussed their openai partnership and she "
+    "mentioned hiring challenges we are both alumni she offered to introduce me to recruiting "
+    "the conversation was great and we talked about coffee next week"
+).split()
+
+Benchmark = Tuple[str, Callable[[], Callable[[], object]]]
+
+
+def make_conversation(words: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    body = " ".join(rng.choice(CONVERSATION_WORDS) for _ in range(words))
+    return "Met Sarah Chen at Databricks. " + body
+
+
+def make_analysis(items: int) -> Dict[str, object]:
+    analysis = copy.deepcopy(DEFAULT_PAYLOADS["analysis"])
+    context = analysis["conversation_context"]
+    for field in ("topics_discussed", "personal_connections", "opportunities_expressed"):
+        context[field] = [f"{field.replace('_', ' ')} {index}" for index in range(items)]
+    return analysis
+
+
+def make_email(words: int) -> str:
+    rng = random.Random(words)
+    lines = [f"Subject: {DEFAULT_PAYLOADS['email']['subject']}", ""]
+    line: List[str] = []
+    for _ in range(words):
+        line.append(rng.choice(CONVERSATION_WORDS))
+        if len(line) == 12:
+            lines.append("  " + " ".join(line) + "  ")
+            line = []
+            if rng.random() < 0.2:
+                lines.extend(["", ""])
+    lines.append(" ".join(line))
+    return "\n".join(lines)
+
+
+def _stubbed_clients() -> Tuple[ConversationAnalyzer, EmailGenerator]:
+    """Analyzer and generator whose clients answer instantly with canned payloads."""
+
+    def send(request_options):
+        if request_options.get("response_format"):
+            content = json.dumps(DEFAULT_PAYLOADS["analysis"])
+        else:
+            email = DEFAULT_PAYLOADS["email"]
+            content = f"Subject: {email['subject']}\n\n{email['body']}"
+        usage = SimpleNamespace(prompt_tokens=500, completion_tokens=200)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    options = dict(api_key="sk-bench", cache=None, resilience=None, limiter=None, single_flight=None)
+    analyzer = ConversationAnalyzer.__new__(ConversationAnalyzer)
+    generator = EmailGenerator.__new__(EmailGenerator)
+    for component in (analyzer, generator):
+        component.client = OpenAIClient(**options)
+        component.client._send = send
+        component.async_client = AsyncOpenAIClient(**options)
+    analyzer.duplicates = None
+    return analyzer, generator
+
+
+def benchmarks() -> List[Benchmark]:
+    """All benchmark cases as ``(name, setup)``; ``setup`` returns the function timed."""
+
+    cases: List[Benchmark] = []
+    input_analyzer = InputAnalyzer()
+    generator = EmailGenerator.__new__(EmailGenerator)
+    analyzer = ConversationAnalyzer.__new__(ConversationAnalyzer)
+
+    for size in SIZES:
+        cases += [
+            (
+                f"input_analyzer.analyze_input_quality[{size}w]",
+                lambda size=size: (lambda text=make_conversation(size): input_analyzer.analyze_input_quality(text)),
+            ),
+            (
+                f"validation.validate_conversation_input[{size}w]",
+                lambda size=size: (
+                    lambda text=make_conversation(size): ConversationValidator.validate_conversation_input(text)
+                ),
+            ),
+            (
+                f"validation.get_input_suggestions[{size}w]",
+                lambda size=size: (
+                    lambda text=make_conversation(size): ConversationValidator.get_input_suggestions(text)
+                ),
+            ),
+            (
+                f"email_generator._clean_email_output[{size}w]",
+                lambda size=size: (lambda text=make_email(size): generator._clean_email_output(text)),
+            ),
+        ]
+
+    for items in (3, 30, 300):
+        cases.append(
+            (
+                f"email_generator._build_email_request[{items} items]",
+                lambda items=items: (
+                    lambda analysis=make_analysis(items): generator._build_email_request(analysis, "")
+                ),
+            )
+        )
+
+    cases += [
+        (
+            "conversation_analyzer._clean_analysis_data[complete]",
+            lambda: (lambda analysis=make_analysis(3): analyzer._clean_analysis_data(analysis)),
+        ),
+        ("conversation_analyzer._clean_analysis_data[empty]", lambda: (lambda: analyzer._clean_analysis_data({}))),
+        ("schema.validate[analysis]", lambda: (lambda analysis=make_analysis(3): ANALYSIS_VALIDATOR(analysis))),
+    ]
+
+    def near_duplicate_lookup():
+        index = NearDuplicateIndex(max_entries=5000)
+        for seed in range(5000):
+            index.add(make_conversation(150, seed=seed), "{}")
+        text = make_conversation(150, seed=5000)
+        return lambda: index.lookup(text)
+
+    cases += [
+        ("near_duplicate.signature[150w]", lambda: (lambda text=make_conversation(150): minhash_signature(text))),
+        ("near_duplicate.lookup[5000 entries]", near_duplicate_lookup),
+    ]
+
+    def contact_store(operation):
+        def setup():
+            store = ContactStore(str(Path(tempfile.mkdtemp()) / "contacts.sqlite3"), flush_interval=3600)
+            for index in range(2000):
+                analysis = make_analysis(3)
+                analysis["person"].update(name=f"Person {index}", company=f"Company {index % 50}")
+                store.record(analysis)
+            store.flush()
+            return lambda: operation(store)
+
+        return setup
+
+    cases += [
+        ("contacts.get[2000 contacts]", contact_store(lambda store: store.get("Person 1234", "Company 34"))),
+        ("contacts.search[2000 contacts]", contact_store(lambda store: store.search("company 34", limit=20))),
+    ]
+
+    def end_to_end():
+        e2e_analyzer, e2e_generator = _stubbed_clients()
+        text = make_conversation(150)
+
+        def run():
+            analysis = e2e_analyzer.analyze(text)
+            return e2e_generator.generate_follow_up(analysis)
+
+        return run
+
+    cases.append(("end_to_end.analyze_generate[stubbed client]", end_to_end))
+    return cases
+
+
+def parse_importtime(stderr: str, module: str) -> float:
+    """Cumulative import seconds of ``module`` from ``-X importtime`` output."""
+
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1e6
+    raise ValueError(f"{module} not found in -X importtime output")
+
+
+def time_import(module: str, repeat: int = 5) -> float:
+    """Best-of-``repeat`` cold import time of ``module``, each in a fresh interpreter."""
+
+    command = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+        timings.append(parse_importtime(result.stderr, module))
+    return min(timings)
+
+
+def time_call(func: Callable[[], object], repeat: int = 5) -> float:
+    """Best-of-``repeat`` mean seconds per call."""
+
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(name_filter: str = "") -> Dict[str, float]:
+    results = {}
+    for name, setup in benchmarks():
+        if name_filter in name:
+            results[name] = time_call(setup())
+            print(f"{name:<58}{results[name] * 1e6:>12.1f}us", flush=True)
+    for module in IMPORT_MODULES:
+        name = f"import[{module}]"
+        if name_filter in name:
+            results[name] = time_import(module)
+            print(f"{name:<58}{results[name] * 1e6:>12.1f}us", flush=True)
+    return results
+
+
+def compare_results(
+    baseline: Dict[str, float], current: Dict[str, float], threshold: float
+) -> List[Tuple[str, float, float, float]]:
+    """Return ``(name, baseline, current, percent slower)`` for every regression past ``threshold``."""
+
+    regressions = []
+    for name, seconds in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        change = (seconds - before) / before * 100
+        if change > threshold:
+            regressions.append((name, before, seconds, change))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ConvoFlow's hot paths.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Write results to the baseline file")
+    parser.add_argument("--compare", action="store_true", help="Fail if slower than the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown in percent")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this text")
+    args = parser.parse_args(argv)
+
+    results = run(args.filter)
+
+    if args.save:
+        existing = json.loads(args.baseline.read_text())["results"] if args.baseline.exists() else {}
+        payload = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": {**existing, **results},
+        }
+        args.baseline.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n")
+        print(f"Saved {len(results)} results to {args.baseline}")
+
+    if args.compare:
+        baseline = json.loads(args.baseline.read_text())["results"]
+        regressions = compare_results(baseline, results, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before * 1e6:.1f}us -> {after * 1e6:.1f}us (+{change:.0f}%)")
+        if regressions:
+            return 1
+        print(f"No benchmark is more than {args.threshold:g}% slower than the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
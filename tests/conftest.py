@@ -0,0 +1,31 @@
+"""Shared pytest fixtures."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib import contacts, near_duplicate, response_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch):
+    """Keep the process-wide stores out of ~/.cache: no response cache, databases under tmp_path"""
+
+    monkeypatch.setenv("CONVOFLOW_CACHE_DISABLED", "1")
+    monkeypatch.setenv("CONVOFLOW_NEAR_DUPLICATE_PATH", str(tmp_path / "near_duplicates.sqlite3"))
+    monkeypatch.setenv("CONVOFLOW_CONTACTS_PATH", str(tmp_path / "contacts.sqlite3"))
+    # Rebuild the defaults from this environment instead of reusing another test's instances
+    for module, name in (
+        (response_cache, "_default_cache"),
+        (near_duplicate, "_default_index"),
+        (contacts, "_default_store"),
+    ):
+        monkeypatch.setattr(module, name, None)
+        monkeypatch.setattr(module, f"{name}_loaded", False)
@@ -0,0 +1,94 @@
+"""Unit tests for the asyncio OpenAI client and its shared transport."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.openai_client import AsyncOpenAIClient, OpenAIClient, _shared_async_client, _shared_sync_client
+
+
+def _completion(content: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_sync_clients_share_one_transport() -> None:
+    """Every OpenAIClient with the same key reuses one pooled SDK client."""
+
+    first = OpenAIClient(api_key="sk-test", cache=None)
+    second = OpenAIClient(api_key="sk-test", cache=None)
+
+    assert _shared_sync_client(first.api_key) is _shared_sync_client(second.api_key)
+    assert _shared_sync_client("sk-test") is not _shared_sync_client("sk-other")
+
+
+def test_async_client_shared_per_loop() -> None:
+    """Async SDK clients are reused within an event loop."""
+
+    async def fetch_twice():
+        return _shared_async_client("sk-test"), _shared_async_client("sk-test")
+
+    first, second = asyncio.run(fetch_twice())
+    assert first is second
+
+
+def test_async_requests_run_concurrently() -> None:
+    """Many analyses can be in flight at once on a single event loop."""
+
+    client = AsyncOpenAIClient(api_key="sk-test", cache=None)
+
+    async def slow_complete(request_options):
+        await asyncio.sleep(0.05)
+        return _completion('{"person": {"name": "Sarah Chen"}}')
+
+    async def run_batch():
+        with patch.object(client, "_complete", side_effect=slow_complete):
+            return await asyncio.gather(
+                *(client.analyze_conversation("Met Sarah Chen", "Return JSON") for _ in range(20))
+            )
+
+    started = time.perf_counter()
+    results = asyncio.run(run_batch())
+    elapsed = time.perf_counter() - started
+
+    assert all(result == {"person": {"name": "Sarah Chen"}} for result in results)
+    assert elapsed < 0.5  # 20 sequential calls would take >= 1s
+
+
+def test_async_generate_email_strips_output() -> None:
+    """Async email generation mirrors the sync client's post-processing."""
+
+    client = AsyncOpenAIClient(api_key="sk-test", cache=None)
+
+    async def fake_complete(request_options):
+        assert "response_format" not in request_options
+        return _completion("  Subject: Hello\n\nHi Sarah  ")
+
+    with patch.object(client, "_complete", side_effect=fake_complete):
+        email = asyncio.run(client.generate_email("Write an email", "You write emails"))
+
+    assert email == "Subject: Hello\n\nHi Sarah"
+
+
+def test_fallback_async_client_shares_the_sync_clients_components() -> None:
+    """Analyzers and generators built from a client never fall back to the process-wide cache or limiter."""
+
+    from lib.conversation_analyzer import ConversationAnalyzer
+    from lib.email_generator import EmailGenerator
+
+    client = OpenAIClient(api_key="sk-test", cache=None, resilience=None, limiter=None, single_flight=None)
+
+    for async_client in (ConversationAnalyzer(client).async_client, EmailGenerator(client).async_client):
+        assert (async_client.api_key, async_client.model, async_client.base_url) == (
+            client.api_key, client.model, client.base_url
+        )
+        components = (async_client.cache, async_client.resilience, async_client.limiter, async_client.single_flight)
+        assert components == (None, None, None, None)
@@ -0,0 +1,94 @@
+"""Unit tests for the headless batch runner."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.batch import load_checkpoint, read_records, run_batch
+
+
+class FakeAnalyzer:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    async def analyze_async(self, conversation_text):
+        self.calls.append(conversation_text)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        if "fail" in conversation_text:
+            return None
+        return {"person": {"name": conversation_text}}
+
+
+class FakeGenerator:
+    async def generate_follow_up_async(self, analysis_data, additional_context=""):
+        return f"Hi {analysis_data['person']['name']}"
+
+
+def test_read_records_jsonl_and_csv(tmp_path) -> None:
+    """Both JSONL and CSV inputs are streamed as (id, text) pairs."""
+
+    jsonl = tmp_path / "notes.jsonl"
+    jsonl.write_text('{"id": "a", "conversation": "Met Sarah"}\n\n{"conversation": "Met Bob"}\n')
+    csv_path = tmp_path / "notes.csv"
+    csv_path.write_text("id,conversation\nx,Met Sarah\n,Met Bob\n")
+
+    assert list(read_records(str(jsonl))) == [("a", "Met Sarah"), ("2", "Met Bob")]
+    assert list(read_records(str(csv_path))) == [("x", "Met Sarah"), ("2", "Met Bob")]
+
+
+def test_run_batch_respects_concurrency_limit() -> None:
+    """No more than ``concurrency`` records are processed at once."""
+
+    analyzer = FakeAnalyzer(delay=0.01)
+    output, checkpoint = io.StringIO(), io.StringIO()
+    records = ((str(i), f"note {i}") for i in range(20))
+
+    stats = asyncio.run(
+        run_batch(records, output, checkpoint, concurrency=3, analyzer=analyzer, generator=FakeGenerator())
+    )
+
+    assert stats.succeeded == 20
+    assert analyzer.max_in_flight == 3
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert {result["id"] for result in results} == {str(i) for i in range(20)}
+    assert all(result["email"].startswith("Hi note") for result in results)
+
+
+def test_run_batch_resumes_from_checkpoint(tmp_path) -> None:
+    """Completed records are skipped and failures are not checkpointed."""
+
+    checkpoint_path = tmp_path / "out.jsonl.checkpoint"
+    checkpoint_path.write_text("1\n")
+    analyzer = FakeAnalyzer()
+    output = io.StringIO()
+
+    with open(checkpoint_path, "a") as checkpoint:
+        stats = asyncio.run(
+            run_batch(
+                iter([("1", "done"), ("2", "fresh"), ("3", "fail me")]),
+                output,
+                checkpoint,
+                completed=load_checkpoint(str(checkpoint_path)),
+                analyzer=analyzer,
+                generator=FakeGenerator(),
+            )
+        )
+
+    assert analyzer.calls == ["fresh", "fail me"]
+    assert (stats.succeeded, stats.failed, stats.skipped) == (1, 1, 1)
+    assert load_checkpoint(str(checkpoint_path)) == {"1", "2"}
+    assert "p95" in stats.summary()
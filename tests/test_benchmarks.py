@@ -0,0 +1,52 @@
+"""Unit tests for the benchmark suite's baseline comparison."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+TESTS_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = TESTS_DIR.parent
+for path in (str(PROJECT_ROOT), str(TESTS_DIR / "benchmarks")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+import run_benchmarks
+
+
+def test_compare_flags_only_regressions_past_threshold() -> None:
+    baseline = {"fast": 1.0, "steady": 1.0, "slower": 1.0, "new": 0.0}
+    current = {"fast": 0.5, "steady": 1.1, "slower": 1.5, "unknown": 9.0}
+
+    regressions = run_benchmarks.compare_results(baseline, current, threshold=20)
+
+    assert [(name, round(change)) for name, _, _, change in regressions] == [("slower", 50)]
+
+
+def test_save_and_compare_round_trip(tmp_path, monkeypatch) -> None:
+    """--save writes a baseline; --compare fails once a benchmark gets slower."""
+
+    baseline = tmp_path / "baseline.json"
+    timings = iter([{"path": 1e-6}, {"path": 1e-6}, {"path": 2e-6}])
+    monkeypatch.setattr(run_benchmarks, "run", lambda name_filter="": next(timings))
+
+    assert run_benchmarks.main(["--baseline", str(baseline), "--save"]) == 0
+    assert json.loads(baseline.read_text())["results"] == {"path": 1e-6}
+    assert run_benchmarks.main(["--baseline", str(baseline), "--compare"]) == 0
+    assert run_benchmarks.main(["--baseline", str(baseline), "--compare", "--threshold", "50"]) == 1
+
+
+def test_every_benchmark_runs_once() -> None:
+    for name, setup in run_benchmarks.benchmarks():
+        setup()()
+
+
+def test_parse_importtime_reads_cumulative_microseconds() -> None:
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   lib.tokens\n"
+        "import time:       300 |      41250 | lib.pipeline\n"
+    )
+
+    assert run_benchmarks.parse_importtime(stderr, "lib.pipeline") == 0.04125
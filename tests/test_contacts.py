@@ -0,0 +1,139 @@
+"""Unit tests for the persistent contact store."""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import io
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.batch import run_batch
+from lib.contacts import ContactStore, contact_key, main
+from lib.fake_server import DEFAULT_PAYLOADS
+
+ANALYSIS = DEFAULT_PAYLOADS["analysis"]
+
+
+def _analysis(name: str, company: str, topics=("Kubernetes",)) -> dict:
+    analysis = copy.deepcopy(ANALYSIS)
+    analysis["person"].update(name=name, company=company)
+    analysis["conversation_context"].update(topics_discussed=list(topics), personal_connections=[])
+    return analysis
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContactStore(str(tmp_path / "contacts.sqlite3"), flush_interval=60)
+
+
+def test_contact_key_normalizes_name_and_company() -> None:
+    assert contact_key("Sarah  Chen", "Databricks, Inc.") == contact_key("sarah chen", "DATABRICKS")
+    assert contact_key("Sarah Chen", "Databricks") == "sarah chen|databricks"
+    assert contact_key("Sarah Chen", "Unknown") == "sarah chen|"
+    assert contact_key("Unknown", "Databricks") is None
+
+
+def test_recorded_analyses_are_looked_up_by_normalized_key(store) -> None:
+    first = store.record(ANALYSIS)
+    store.record(_analysis("SARAH CHEN", "Databricks Inc", topics=["Lakehouse"]))
+
+    contact = store.get("sarah chen", "databricks")
+
+    assert first == contact.key == "sarah chen|databricks"
+    assert contact.conversations == 2
+    assert contact.name == "SARAH CHEN"
+    assert contact.analysis["conversation_context"]["topics_discussed"] == ["Lakehouse"]
+    history = store.history("Sarah Chen", "Databricks")
+    assert [item["person"]["name"] for item in history] == ["Sarah Chen", "SARAH CHEN"]
+    assert store.get("Sarah Chen", "Snowflake") is None
+    assert store.record({"person": {"name": "Unknown"}}) is None
+
+
+def test_search_matches_prefixes_across_fields(store) -> None:
+    store.record(ANALYSIS)
+    store.record(_analysis("James Park", "Stripe", topics=["payment rails", "seed round"]))
+
+    assert [contact.name for contact in store.search("datab")] == ["Sarah Chen"]
+    assert [contact.name for contact in store.search("payment SEED")] == ["James Park"]
+    assert [contact.name for contact in store.search("alumni")] == ["Sarah Chen"]
+    assert store.search('zzz" OR NOT') == [] and store.search("  ") == []
+    assert len(store.search("engineering", limit=1)) == 1
+
+
+def test_writes_are_batched_off_the_request_path(tmp_path) -> None:
+    store = ContactStore(str(tmp_path / "contacts.sqlite3"), batch_size=100, flush_interval=60)
+
+    for index in range(99):
+        store.record(_analysis(f"Person {index}", "Acme"))
+    assert store.stats()["pending"] == 99
+
+    store.record(_analysis("Person 99", "Acme"))
+    deadline = time.monotonic() + 5
+    while store.batches_written == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)  # the full batch wakes the writer long before the flush interval
+    assert store.stats() == {"contacts": 100, "analyses": 100, "pending": 0, "batches_written": 1}
+
+    assert [contact.name for contact in store.iter_contacts(batch=7)][:2] == ["Person 99", "Person 98"]
+
+
+def test_failed_flush_keeps_the_queue(store) -> None:
+    store.record(ANALYSIS)
+    store.record(_analysis("James Park", "Stripe"))
+    locked = sqlite3.OperationalError("database is locked")
+
+    with patch.object(ContactStore, "_write", side_effect=[None, locked]), pytest.raises(sqlite3.OperationalError):
+        store.flush()
+    store.record(_analysis("Priya Patel", "Snowflake"))
+
+    assert store.stats()["pending"] == 3
+    assert store.flush() == 3
+    assert [contact.name for contact in store.iter_contacts()] == ["Priya Patel", "James Park", "Sarah Chen"]
+
+
+def test_batch_records_each_successful_record_once(store) -> None:
+    class Analyzer:
+        async def analyze_async(self, conversation_text):
+            return _analysis(conversation_text, "Acme") if conversation_text != "fail" else None
+
+    class Generator:
+        async def generate_follow_up_async(self, analysis, additional_context=""):
+            return "Hi"
+
+    records = iter([("1", "Sarah Chen"), ("2", "fail"), ("3", "James Park"), ("4", "Sarah Chen")])
+    asyncio.run(
+        run_batch(records, io.StringIO(), io.StringIO(), analyzer=Analyzer(), generator=Generator(), contacts=store)
+    )
+
+    assert store.get("Sarah Chen", "Acme").conversations == 2
+    assert store.stats()["contacts"] == 2
+
+
+def test_recorded_analysis_is_a_snapshot(store) -> None:
+    analysis = copy.deepcopy(ANALYSIS)
+    store.record(analysis)
+    analysis["person"]["name"] = "Changed later"
+
+    assert store.get("Sarah Chen", "Databricks").analysis["person"]["name"] == "Sarah Chen"
+
+
+def test_cli_searches_and_exports_jsonl(store, capsys) -> None:
+    store.record(ANALYSIS)
+    store.record(_analysis("James Park", "Stripe"))
+    store.flush()
+
+    assert main(["databricks", "--path", store.path]) == 0
+    assert [json.loads(line)["name"] for line in capsys.readouterr().out.splitlines()] == ["Sarah Chen"]
+
+    assert main(["--all", "--path", store.path]) == 0
+    assert len(capsys.readouterr().out.splitlines()) == 2
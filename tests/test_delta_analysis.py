@@ -0,0 +1,117 @@
+"""Unit tests for incremental re-analysis of edited notes."""
+
+from __future__ import annotations
+
+import copy
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.conversation_analyzer import ConversationAnalyzer, conversation_delta, merge_analysis_patch
+from lib.fake_server import DEFAULT_PAYLOADS, FakeOpenAIServer
+from lib.openai_client import OpenAIClient, _messages
+from lib.tokens import completion_token_limit, estimate_message_tokens
+from utils.prompts import ANALYSIS_DELTA_PROMPT, CONVERSATION_ANALYSIS_PROMPT
+
+ANALYSIS = DEFAULT_PAYLOADS["analysis"]
+NOTES = (
+    "Met Sarah Chen, VP of Engineering at Databricks, at the AI summit. We discussed their OpenAI partnership "
+    "and the ML hiring challenges her team is facing.\nWe are both Stanford alumni. She offered to introduce "
+    "me to her recruiting team."
+)
+ADDED = "She also mentioned they are raising a Series B next quarter."
+
+
+def test_delta_holds_only_changed_sentences() -> None:
+    assert conversation_delta(NOTES, NOTES + " " + ADDED) == ([], [ADDED])
+    assert conversation_delta(NOTES, "  " + NOTES.replace(". ", ".   ")) == ([], [])
+    assert conversation_delta(NOTES, NOTES.replace("Stanford", "MIT")) == (
+        ["We are both Stanford alumni."],
+        ["We are both MIT alumni."],
+    )
+    assert conversation_delta(NOTES, "Met James Park at a fintech meetup and discussed payment rails.") is None
+
+
+def test_patch_merges_into_a_copy() -> None:
+    def change(section, field, op, *values):
+        return {"section": section, "field": field, "op": op, "values": list(values)}
+
+    patch_ = {
+        "changes": [
+            change("conversation_context", "topics_discussed", "add", "ml HIRING", "Series B"),
+            change("conversation_context", "personal_connections", "remove", "both stanford alumni"),
+            change("follow_up_strategy", "recommended_tone", "set", "upbeat"),
+            change("follow_up_strategy", "success_indicators", "set", "Call booked"),
+            change("person", "title", "remove", "VP"),
+            change("person", "hobbies", "add", "golf"),
+        ]
+    }
+
+    merged = merge_analysis_patch(ANALYSIS, patch_)
+
+    assert merged["conversation_context"]["topics_discussed"] == ["OpenAI partnership", "ML hiring", "Series B"]
+    assert merged["conversation_context"]["personal_connections"] == []
+    assert merged["follow_up_strategy"]["recommended_tone"] == "upbeat"
+    assert merged["follow_up_strategy"]["success_indicators"] == ["Call booked"]
+    assert merged["person"] == ANALYSIS["person"]
+    assert ANALYSIS["conversation_context"]["personal_connections"] == ["Both Stanford alumni"]
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    return ConversationAnalyzer()
+
+
+def test_only_the_previous_analysis_and_changed_text_are_sent(analyzer) -> None:
+    change = {"section": "conversation_context", "field": "topics_discussed", "op": "add", "values": ["Series B"]}
+    patch_ = {"changes": [change]}
+
+    with patch.object(analyzer.client, "analyze_conversation", return_value=patch_) as send:
+        analysis = analyzer.analyze_delta(NOTES, ANALYSIS, NOTES + " " + ADDED)
+
+    request = send.call_args.kwargs
+    assert request["call_type"] == "analysis_delta"
+    assert request["conversation_text"].endswith("ADDED OR CHANGED IN THE NOTES:\n" + ADDED)
+    assert "Stanford alumni. She offered" not in request["conversation_text"]
+    assert analysis["conversation_context"]["topics_discussed"][-1] == "Series B"
+    assert analysis["relationship_signals"]["receptiveness_score"]  # run through _clean_analysis_data
+
+
+def test_unchanged_notes_reuse_and_rewritten_notes_are_left_to_the_caller(analyzer) -> None:
+    with patch.object(analyzer.client, "analyze_conversation", return_value=copy.deepcopy(ANALYSIS)) as send:
+        unchanged = analyzer.analyze_delta(NOTES, ANALYSIS, NOTES + "\n")
+        rewritten = "Met James Park at a fintech meetup and we discussed payment rails in Southeast Asia at length."
+        assert analyzer.analyze_delta(NOTES, ANALYSIS, rewritten) is None
+
+    assert send.call_count == 0 and unchanged == ANALYSIS and unchanged is not ANALYSIS
+
+
+def test_failed_patch_returns_none(analyzer) -> None:
+    with patch.object(analyzer.client, "analyze_conversation", return_value=None):
+        assert analyzer.analyze_delta(NOTES, ANALYSIS, NOTES + " " + ADDED) is None
+
+
+def test_delta_request_against_fake_server() -> None:
+    with FakeOpenAIServer() as server:
+        client = OpenAIClient(api_key="sk-test", base_url=server.base_url, cache=None, resilience=None, limiter=None)
+        analysis = ConversationAnalyzer(client).analyze_delta(NOTES, ANALYSIS, NOTES + " " + ADDED)
+
+    assert analysis["conversation_context"]["topics_discussed"][-1] == "Series B fundraising"
+
+
+def test_delta_prompt_is_smaller_for_long_notes(analyzer) -> None:
+    notes = " ".join(f"We talked about project {index} and how her team ships it." for index in range(80))
+    edited = notes + " " + ADDED
+    delta_request = analyzer._build_delta_request(ANALYSIS, conversation_delta(notes, edited))
+
+    full = estimate_message_tokens(_messages(CONVERSATION_ANALYSIS_PROMPT, edited))
+    delta = estimate_message_tokens(_messages(ANALYSIS_DELTA_PROMPT, delta_request))
+    assert delta < full / 2
+    assert completion_token_limit("analysis_delta") < completion_token_limit("analysis") / 2
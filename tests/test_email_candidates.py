@@ -0,0 +1,114 @@
+"""Unit tests for multi-candidate email generation and local ranking."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.email_generator import EmailGenerator, analysis_references, rank_email_candidates
+from lib.fake_server import DEFAULT_PAYLOADS, FakeOpenAIServer
+from lib.openai_client import OpenAIClient, StreamInterrupted
+from lib.rate_limiter import estimate_request_tokens
+from lib.response_cache import ResponseCache
+
+ANALYSIS = DEFAULT_PAYLOADS["analysis"]
+
+
+def _client(**kwargs):
+    return OpenAIClient(api_key="sk-test", resilience=None, limiter=None, single_flight=None, **kwargs)
+
+
+def test_references_come_from_hooks_connections_and_topics() -> None:
+    assert analysis_references(ANALYSIS) == [
+        "OpenAI partnership",
+        "ML hiring",
+        "Stanford",
+        "Both Stanford alumni",
+    ]
+    assert analysis_references({"follow_up_strategy": {"key_personalization_hooks": None}}) == []
+
+
+def test_candidates_are_ranked_by_references() -> None:
+    generic = "Hi Sarah, great to meet you."
+    partial = "Hi Sarah, thanks for the chat about hiring for ML roles."
+    full = DEFAULT_PAYLOADS["email"]["body"]
+
+    ranked = rank_email_candidates([generic, partial, full, partial], ANALYSIS)
+
+    assert [candidate.email for candidate in ranked] == [full, partial, generic]
+    assert ranked[1].references == ["ML hiring"]
+    assert ranked[2].score == 0
+
+
+def test_one_request_returns_every_choice() -> None:
+    client = _client(cache=None)
+    response = SimpleNamespace(
+        choices=[
+            SimpleNamespace(index=1, message=SimpleNamespace(content="Subject: B\n\nHi, ML hiring?")),
+            SimpleNamespace(index=0, message=SimpleNamespace(content="Subject: A\n\nHi")),
+        ],
+        usage=None,
+    )
+    generator = EmailGenerator(client)
+
+    with patch.object(client, "_send", return_value=response) as send:
+        candidates = generator.generate_follow_up_candidates(ANALYSIS, n=2)
+
+    assert send.call_count == 1 and send.call_args.args[0]["n"] == 2
+    assert [candidate.email.split("\n")[0] for candidate in candidates] == ["**Subject:** B", "**Subject:** A"]
+
+
+def test_rate_limit_estimate_counts_every_choice() -> None:
+    request = {"messages": [], "max_tokens": 100}
+
+    assert estimate_request_tokens({**request, "n": 3}) - estimate_request_tokens(request) == 200
+
+
+def test_streamed_candidates_are_cached_together(tmp_path) -> None:
+    with FakeOpenAIServer() as server:
+        generator = EmailGenerator(_client(base_url=server.base_url, cache=ResponseCache(str(tmp_path / "c.db"))))
+
+        streamed = {}
+        for index, chunk in generator.generate_follow_up_candidates_stream(ANALYSIS, n=3):
+            streamed[index] = streamed.get(index, "") + chunk
+        cached = generator.generate_follow_up_candidates(ANALYSIS, n=3)
+
+        assert server.behavior.counts["requests"] == 1
+
+    assert sorted(streamed) == [0, 1, 2]
+    assert streamed[0].startswith("**Subject:** Great meeting you at the summit")
+    assert {candidate.email for candidate in cached} == set(streamed.values())
+
+
+def _choice(index, content, finish_reason=None):
+    return SimpleNamespace(choices=[
+        SimpleNamespace(index=index, delta=SimpleNamespace(content=content), finish_reason=finish_reason)
+    ])
+
+
+def test_interrupted_stream_marks_only_finished_candidates_complete() -> None:
+    def stream():
+        yield _choice(0, "Subject: A\n\nHi Sarah, about ")
+        yield _choice(1, "Subject: B\n\nHi Sarah")
+        yield _choice(1, None, finish_reason="stop")
+        raise ConnectionError("connection reset")
+
+    client = _client(cache=None)
+    streamed = {}
+
+    with patch.object(client, "_complete", side_effect=lambda _: stream()), patch(
+        "lib.openai_client.report_error"
+    ), pytest.raises(StreamInterrupted) as interrupted:
+        for index, chunk in EmailGenerator(client).generate_follow_up_candidates_stream(ANALYSIS, n=2):
+            streamed[index] = streamed.get(index, "") + chunk
+
+    assert interrupted.value.finished == {1}
+    assert streamed[1] == "**Subject:** B\n\nHi Sarah"
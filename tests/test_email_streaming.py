@@ -0,0 +1,137 @@
+"""Unit tests for streaming email generation and incremental output cleaning."""
+
+from __future__ import annotations
+
+import random
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.email_generator import EmailGenerator, EmailOutputCleaner
+from lib.openai_client import OpenAIClient, StreamInterrupted
+
+
+SAMPLE_EMAIL = (
+    "Subject: Great meeting you at the NYC AI Founders meetup\n\n"
+    "Hi Sarah,   \n"
+    "\n\n"
+    "  It was great talking about the OpenAI partnership.\t\n"
+    "As fellow UW alumni, I'd love to stay in touch.\n"
+    "\n"
+    "Best regards,\n"
+    "Alex\n"
+)
+
+
+def _reference_clean(email: str) -> str:
+    """The original one-shot cleanup, kept as the behavioural reference."""
+
+    email = email.replace("Subject:", "**Subject:**", 1)
+    return "\n\n".join(line.strip() for line in email.split("\n") if line.strip())
+
+
+def _clean_in_chunks(email: str, sizes) -> str:
+    cleaner = EmailOutputCleaner()
+    output, start = [], 0
+    for size in sizes:
+        output.append(cleaner.feed(email[start:start + size]))
+        start += size
+    output.append(cleaner.feed(email[start:]))
+    output.append(cleaner.flush())
+    return "".join(output)
+
+
+def test_single_chunk_matches_reference() -> None:
+    """Cleaning the whole email at once matches the original behaviour."""
+
+    assert _clean_in_chunks(SAMPLE_EMAIL, []) == _reference_clean(SAMPLE_EMAIL)
+
+
+def test_character_by_character_matches_reference() -> None:
+    """Token-sized chunks, including a split "Subject:", give identical output."""
+
+    assert _clean_in_chunks(SAMPLE_EMAIL, [1] * len(SAMPLE_EMAIL)) == _reference_clean(SAMPLE_EMAIL)
+
+
+def test_random_chunking_matches_reference() -> None:
+    """Arbitrary inputs and chunk boundaries always match the one-shot cleanup."""
+
+    rng = random.Random(7)
+    pieces = ["Subject:", "Sub", "ject:", "S", " ", "\n", "\t", "\r", "Hi", "\n\n", "x:"]
+    for _ in range(2000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+        sizes = [rng.randint(1, 4) for _ in range(rng.randint(0, 6))]
+        assert _clean_in_chunks(text, sizes) == _reference_clean(text)
+
+
+def test_cleaner_emits_before_line_ends() -> None:
+    """Paragraph text is released as it arrives rather than once the line completes."""
+
+    cleaner = EmailOutputCleaner()
+    assert cleaner.feed("Hi Sarah, it was great ") == "Hi Sarah, it was great"
+    assert cleaner.feed("meeting you") == " meeting you"
+
+
+def test_generate_follow_up_stream_yields_cleaned_chunks(monkeypatch) -> None:
+    """The generator stream yields cleaned text equal to the non-streaming result."""
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    generator = EmailGenerator()
+    raw_chunks = [SAMPLE_EMAIL[i:i + 5] for i in range(0, len(SAMPLE_EMAIL), 5)]
+
+    with patch.object(generator.client, "generate_email_stream", return_value=iter(raw_chunks)):
+        chunks = list(generator.generate_follow_up_stream({"person": {"name": "Sarah Chen"}}))
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == generator._clean_email_output(SAMPLE_EMAIL)
+
+
+def test_client_stream_caches_completed_email(tmp_path) -> None:
+    """A completed stream is cached and replayed for the non-streaming call."""
+
+    from lib.response_cache import ResponseCache
+
+    client = OpenAIClient(api_key="sk-test", cache=ResponseCache(str(tmp_path / "cache.sqlite3")))
+    stream = [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+        for part in ["Subject: Hi", "\n\nHello", None]
+    ]
+
+    with patch.object(client, "_complete", return_value=iter(stream)) as complete:
+        assert list(client.generate_email_stream("Write", "System")) == ["Subject: Hi", "\n\nHello"]
+        assert client.generate_email("Write", "System") == "Subject: Hi\n\nHello"
+
+    assert complete.call_count == 1
+    assert complete.call_args.args[0]["stream"] is True
+
+
+def test_stream_failing_partway_is_not_a_complete_email(tmp_path) -> None:
+    """A stream that breaks after a few chunks raises instead of ending like a finished email."""
+
+    from lib.response_cache import ResponseCache
+
+    def stream():
+        for part in ["Subject: Hi", "\n\nIt was great", " meeting"]:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+        raise ConnectionError("connection reset")
+
+    client = OpenAIClient(api_key="sk-test", cache=ResponseCache(str(tmp_path / "cache.sqlite3")))
+    generator = EmailGenerator(client)
+    chunks = []
+
+    with patch.object(client, "_complete", side_effect=lambda _: stream()), patch(
+        "lib.openai_client.report_error"
+    ) as report_error, pytest.raises(StreamInterrupted):
+        for chunk in generator.generate_follow_up_stream({"person": {"name": "Sarah Chen"}}):
+            chunks.append(chunk)
+
+    assert "".join(chunks).startswith("**Subject:** Hi")
+    report_error.assert_called_once_with("Email generation error: connection reset")
+    assert client.cache.stats()["entries"] == 0
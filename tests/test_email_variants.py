@@ -0,0 +1,75 @@
+"""Unit tests for redrafting emails from a stored analysis in several variants."""
+
+from __future__ import annotations
+
+import copy
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.email_generator import EmailGenerator, EmailVariant
+from lib.fake_server import DEFAULT_PAYLOADS, FakeBehavior, FakeOpenAIServer
+from lib.openai_client import OpenAIClient
+
+ANALYSIS = DEFAULT_PAYLOADS["analysis"]
+
+
+def test_variant_overrides_tone_without_touching_the_analysis() -> None:
+    original = copy.deepcopy(ANALYSIS)
+    formal = EmailVariant(tone="Formal").apply(ANALYSIS)
+
+    assert formal["follow_up_strategy"]["recommended_tone"] == "Formal"
+    assert formal["person"] is ANALYSIS["person"]
+    assert ANALYSIS == original
+    assert EmailVariant(context="Ask about the Series B").apply(ANALYSIS) is ANALYSIS
+    assert [variant.label for variant in (EmailVariant(), EmailVariant("Casual", "Mention SF"))] == [
+        "Recommended",
+        "Casual · Mention SF",
+    ]
+
+
+def test_variants_are_drafted_concurrently_from_one_analysis() -> None:
+    behavior = FakeBehavior(latency="constant:0.3")
+    variants = [EmailVariant(tone="Formal"), EmailVariant(tone="Casual"), EmailVariant(context="Series B")]
+    options = dict(cache=None, resilience=None, limiter=None, single_flight=None)
+
+    with FakeOpenAIServer(behavior) as server:
+        client = OpenAIClient(api_key="sk-test", base_url=server.base_url, **options)
+        generator = EmailGenerator(client)
+        generator.generate_follow_up_variants(ANALYSIS, [EmailVariant()])  # loads the SDK outside the timing
+
+        # Drafts share the pooled sync client instead of building an async client per call
+        with (
+            patch.object(client, "generate_email", wraps=client.generate_email) as generate,
+            patch("lib.openai_client._shared_async_client", side_effect=AssertionError),
+        ):
+            started = time.perf_counter()
+            emails = generator.generate_follow_up_variants(ANALYSIS, variants)
+            elapsed = time.perf_counter() - started
+
+        assert server.behavior.counts["requests"] == 1 + 3
+
+    assert elapsed < 0.6
+    assert all(email.startswith("**Subject:**") for email in emails)
+    requests = [call.kwargs["email_request"] for call in generate.call_args_list]
+    assert sum("TONE: Formal" in request for request in requests) == 1
+    assert sum("TONE: Casual" in request for request in requests) == 1
+    assert sum("ADDITIONAL CONTEXT: Series B" in request for request in requests) == 1
+
+
+def test_failed_variant_is_none() -> None:
+    generator = EmailGenerator(OpenAIClient(api_key="sk-test"))
+    drafts = {"Formal": "Subject: Hi\n\nDear Sarah", "Casual": None}
+
+    def generate_email(email_request, system_prompt):
+        return drafts["Formal" if "TONE: Formal" in email_request else "Casual"]
+
+    with patch.object(generator.client, "generate_email", side_effect=generate_email):
+        emails = generator.generate_follow_up_variants(ANALYSIS, [EmailVariant("Formal"), EmailVariant("Casual")])
+
+    assert emails == ["**Subject:** Hi\n\nDear Sarah", None]
@@ -0,0 +1,109 @@
+"""End-to-end tests of the OpenAI clients against the bundled fake server."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import urllib.request
+from pathlib import Path
+
+import openai
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.fake_server import DEFAULT_PAYLOADS, FakeBehavior, FakeOpenAIServer, LatencyModel
+from lib.openai_client import AsyncOpenAIClient, OpenAIClient
+from lib.resilience import CircuitBreaker, CircuitOpenError, Resilience, RetryPolicy
+from utils.prompts import CONVERSATION_ANALYSIS_PROMPT, EMAIL_GENERATION_PROMPT, FUSED_ANALYSIS_EMAIL_PROMPT
+
+
+@pytest.fixture
+def server():
+    with FakeOpenAIServer(FakeBehavior(retry_after=0.01, seed=0)) as fake:
+        yield fake
+
+
+def _client(server, cls=OpenAIClient, **kwargs):
+    kwargs.setdefault("resilience", Resilience(retry=RetryPolicy(max_attempts=3, base_delay=0.01)))
+    return cls(api_key="sk-fake", base_url=server.base_url, cache=None, limiter=None, single_flight=None, **kwargs)
+
+
+def test_json_mode_returns_canned_analysis(server) -> None:
+    client = _client(server)
+
+    analysis = client.analyze_conversation("Met Sarah Chen at the summit.", CONVERSATION_ANALYSIS_PROMPT)
+
+    assert analysis == DEFAULT_PAYLOADS["analysis"]
+
+
+def test_fused_prompt_returns_analysis_and_email(server) -> None:
+    client = _client(server)
+
+    response = client.analyze_conversation("Met Sarah Chen.", FUSED_ANALYSIS_EMAIL_PROMPT, call_type="fused")
+
+    assert response["analysis"]["person"]["name"] == "Sarah Chen"
+    assert response["email"]["subject"] == DEFAULT_PAYLOADS["email"]["subject"]
+
+
+def test_email_streams_in_chunks(server) -> None:
+    client = _client(server)
+
+    chunks = list(client.generate_email_stream("request", EMAIL_GENERATION_PROMPT))
+
+    assert len(chunks) > 1
+    assert "".join(chunks).startswith("Subject: Great meeting you at the summit")
+
+
+def test_transient_errors_are_retried(server) -> None:
+    server.behavior.scripted_errors = [500, 429]
+    client = _client(server)
+
+    assert client.generate_email("request", EMAIL_GENERATION_PROMPT).startswith("Subject:")
+    assert server.behavior.counts == {"requests": 3, "ok": 1, "errors": 1, "rate_limited": 1}
+
+
+def test_circuit_breaker_stops_calling_a_failing_server(server) -> None:
+    server.behavior.scripted_errors = [500] * 10
+    resilience = Resilience(retry=RetryPolicy(max_attempts=1), breaker=CircuitBreaker(failure_threshold=2))
+    client = _client(server, resilience=resilience)
+
+    for _ in range(2):
+        with pytest.raises(openai.InternalServerError):
+            client._complete({"model": "gpt-4", "messages": [{"role": "user", "content": "hi"}]})
+    with pytest.raises(CircuitOpenError):
+        client._complete({"model": "gpt-4", "messages": [{"role": "user", "content": "hi"}]})
+
+    assert server.behavior.counts["requests"] == 2
+
+
+def test_async_client_runs_concurrently(server) -> None:
+    server.behavior.latency = LatencyModel("constant:0.1")
+    client = _client(server, cls=AsyncOpenAIClient)
+
+    async def run():
+        return await asyncio.gather(
+            *(client.analyze_conversation(f"Met person {i}", CONVERSATION_ANALYSIS_PROMPT) for i in range(10))
+        )
+
+    results = asyncio.run(run())
+
+    assert all(result == DEFAULT_PAYLOADS["analysis"] for result in results)
+
+
+def test_stats_endpoint(server) -> None:
+    _client(server).generate_email("request", EMAIL_GENERATION_PROMPT)
+
+    with urllib.request.urlopen(server.base_url + "/stats") as response:
+        assert json.load(response)["ok"] == 1
+
+
+def test_latency_models() -> None:
+    assert LatencyModel("constant:0.25").sample() == 0.25
+    assert 0.1 <= LatencyModel("uniform:0.1:0.2").sample() <= 0.2
+    assert LatencyModel("lognormal:0.5:0.3").sample() > 0
+    with pytest.raises(ValueError):
+        LatencyModel("bogus:1")
@@ -0,0 +1,72 @@
+"""Unit tests for the host-application hooks and Streamlit-free imports."""
+
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib import hooks
+
+
+@pytest.fixture(autouse=True)
+def restore_hooks():
+    handler = hooks.set_error_handler(None)
+    source = hooks.set_secret_source(None)
+    yield
+    hooks.set_error_handler(handler)
+    hooks.set_secret_source(source)
+
+
+def test_errors_reach_the_registered_handler() -> None:
+    messages = []
+    hooks.report_error("dropped without a handler")
+    hooks.set_error_handler(messages.append)
+
+    hooks.report_error("OpenAI API error")
+
+    assert messages == ["OpenAI API error"]
+
+
+def test_failing_handler_is_ignored() -> None:
+    def broken(message: str) -> None:
+        raise RuntimeError("no script context")
+
+    hooks.set_error_handler(broken)
+
+    hooks.report_error("OpenAI API error")
+
+
+def test_secrets_prefer_the_environment(monkeypatch) -> None:
+    monkeypatch.delenv("CONVOFLOW_TEST_SECRET", raising=False)
+    hooks.set_secret_source({"CONVOFLOW_TEST_SECRET": "from-secrets"}.get)
+    assert hooks.get_secret("CONVOFLOW_TEST_SECRET") == "from-secrets"
+
+    monkeypatch.setenv("CONVOFLOW_TEST_SECRET", "from-env")
+    assert hooks.get_secret("CONVOFLOW_TEST_SECRET") == "from-env"
+
+
+def test_missing_secrets_file_means_no_secret(monkeypatch) -> None:
+    def no_secrets(name: str):
+        raise FileNotFoundError("secrets.toml")
+
+    monkeypatch.delenv("CONVOFLOW_TEST_SECRET", raising=False)
+    hooks.set_secret_source(no_secrets)
+
+    assert hooks.get_secret("CONVOFLOW_TEST_SECRET") is None
+
+
+def test_library_imports_without_streamlit_or_openai() -> None:
+    code = (
+        "import sys, lib.pipeline, lib.batch\n"
+        "print(sorted(m for m in ('streamlit', 'openai', 'httpx') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
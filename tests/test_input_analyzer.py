@@ -78,3 +78,101 @@ def test_analyze_input_quality_empty_input():
     result = analyzer.analyze_input_quality(empty_input)
     
     assert result is None
+
+def _equivalence_corpus():
+    """Generated notes covering every keyword, overlaps and word-count boundaries"""
+    import random
+    from lib.input_analyzer import RULES
+    
+    rng = random.Random(42)
+    keywords = [keyword for rule in RULES for keyword in rule.get("keywords", ())]
+    fillers = ["Met", "Sarah", "Chen", "spoke", "with", "Bob", "the", "conference", "we", "coffee", "atalked",
+               "samet", "John", "Doe", "AT", "Shared", "\n", "  ", "met  two", "spoke with"]
+    corpus = ["", "met someone", "   short   ", "x" * 20]
+    for _ in range(3000):
+        vocabulary = keywords + fillers if rng.random() < 0.7 else fillers
+        length = rng.choice([3, 10, 49, 50, 51, 99, 100, 101, 150])
+        corpus.append(" ".join(rng.choice(vocabulary) for _ in range(length)))
+    return corpus
+
+def test_compiled_rules_match_reference_implementation():
+    """Compiled rule engine returns exactly what the original implementation did"""
+    from input_analyzer_reference import ReferenceInputAnalyzer
+    
+    analyzer = InputAnalyzer()
+    reference = ReferenceInputAnalyzer()
+    
+    for text in _equivalence_corpus():
+        assert analyzer._analyze_with_rules(text) == reference._analyze_with_rules(text), text
+        assert analyzer.analyze_input_quality(text) == reference.analyze_input_quality(text), text
+
+def test_format_handles_unknown_suggestions():
+    """Suggestions outside the rule table are still categorized"""
+    analyzer = InputAnalyzer()
+    
+    formatted = analyzer._format_qualitative_suggestions(0, ["Share their title"])
+    
+    assert formatted["person_identification"]["improvement"] == "Share their title"
+    assert formatted["conversation_topics"]["score"] == "Excellent"
+
+def test_incremental_analyzer_matches_full_analysis():
+    """Editing keystroke by keystroke gives the same result as re-analyzing from scratch"""
+    import random
+    from lib.input_analyzer import IncrementalInputAnalyzer
+    
+    rng = random.Random(3)
+    pieces = ["Met", "Sarah", "Chen", "spoke with", "at", "discussed", "shared", "alumni", "introduce",
+              "samet", "İ", " ", "\n", "  ", "x"]
+    full = InputAnalyzer()
+    
+    for _ in range(200):
+        incremental = IncrementalInputAnalyzer()
+        text = ""
+        for _ in range(25):
+            piece = " ".join(rng.choice(pieces) for _ in range(rng.randint(1, 4)))
+            start = rng.randint(0, len(text))
+            end = rng.randint(start, min(len(text), start + rng.choice([0, 0, 3, 12])))
+            text = text[:start] + piece + text[end:]
+            assert incremental.analyze_input_quality(text) == full.analyze_input_quality(text), text
+
+def test_incremental_analyzer_handles_deletion_to_empty():
+    """Clearing the text area resets the assistant"""
+    from lib.input_analyzer import IncrementalInputAnalyzer
+    
+    analyzer = IncrementalInputAnalyzer()
+    good_input = "Met Sarah Chen, VP of Engineering at Databricks. We discussed ML hiring."
+    
+    assert analyzer.analyze_input_quality(good_input) is not None
+    assert analyzer.analyze_input_quality("") is None
+    assert analyzer.analyze_input_quality(good_input) == InputAnalyzer().analyze_input_quality(good_input)
+
+def test_analyze_many_matches_scalar_path():
+    """Bulk columnar scoring agrees with analyze_input_quality for every text"""
+    from lib.input_analyzer import LIKELIHOOD_LABELS, FEEDBACK_CATEGORIES
+    
+    analyzer = InputAnalyzer()
+    corpus = _equivalence_corpus()
+    
+    bulk = analyzer.analyze_many(corpus)
+    
+    assert bulk.scores.shape == (len(corpus),)
+    assert bulk.category_issues.shape == (len(corpus), len(FEEDBACK_CATEGORIES))
+    for index, text in enumerate(corpus):
+        expected = analyzer.analyze_input_quality(text)
+        assert bulk.result(index) == expected, text
+        assert bool(bulk.valid[index]) == (expected is not None)
+        if expected is not None:
+            assert LIKELIHOOD_LABELS[bulk.likelihood_codes[index]] == expected["overall_score"]
+            issues = [feedback["score"] != "Excellent" for feedback in expected["suggestions"].values()]
+            assert list(bulk.category_issues[index]) == issues
+
+def test_analyze_many_rule_hits():
+    """Per-rule hit matrices record which keywords each text contains"""
+    analyzer = InputAnalyzer()
+    
+    bulk = analyzer.analyze_many(["We discussed AI and talked shop at length", "nothing relevant here"])
+    
+    conversation_hits = bulk.rule_hits["conversation_depth"]
+    assert conversation_hits[0].sum() == 2
+    assert not conversation_hits[1].any()
+    assert bulk.likelihood_codes.dtype.kind == "i"
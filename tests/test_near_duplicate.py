@@ -0,0 +1,161 @@
+"""Unit tests for near-duplicate conversation detection."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.conversation_analyzer import ConversationAnalyzer
+from lib.near_duplicate import NearDuplicateIndex, minhash_signature, normalize_words
+from lib.pipeline import FusedPipeline
+
+
+CONVERSATION = (
+    "Met Sarah Chen, VP of Engineering at Databricks, at the AI summit. We discussed their OpenAI "
+    "partnership and the ML hiring challenges her team is facing this quarter. She mentioned they are "
+    "looking for senior engineers with distributed systems experience. We are both Stanford alumni and "
+    "talked about the old campus coffee shops. She offered to introduce me to her recruiting team."
+)
+OTHER_CONVERSATION = (
+    "Met James Park, founder of a logistics startup, at a fintech meetup. We discussed payment rails "
+    "in Southeast Asia, his seed round and whether he should hire a head of sales before product "
+    "market fit. He asked me to send over the pricing deck we talked about."
+)
+
+
+def test_normalization_ignores_case_punctuation_and_whitespace() -> None:
+    assert normalize_words("  Met SARAH—at   Databricks!\n") == ["met", "sarah", "at", "databricks"]
+    assert (minhash_signature("Met Sarah, at Databricks.") == minhash_signature("met sarah at   databricks")).all()
+    assert minhash_signature(" ... ") is None
+
+
+def test_small_edits_match_and_other_conversations_do_not() -> None:
+    index = NearDuplicateIndex()
+    index.add(CONVERSATION, '{"id": 1}')
+
+    typo = CONVERSATION.replace("challenges", "chalenges")
+    sentences = CONVERSATION.split(". ")
+    reordered = ". ".join(sentences[1:] + sentences[:1])
+
+    assert index.lookup(CONVERSATION.upper()) == '{"id": 1}'
+    assert index.lookup(typo) == '{"id": 1}'
+    assert index.lookup(reordered) == '{"id": 1}'
+    assert index.lookup(OTHER_CONVERSATION) is None
+    assert (index.hits, index.misses) == (3, 1)
+
+
+def test_negated_edits_do_not_match() -> None:
+    index = NearDuplicateIndex()
+    index.add(CONVERSATION, "offered")
+    index.add(CONVERSATION.replace("She offered", "She didn't offer") + " Not now.", "declined")
+
+    assert index.lookup(CONVERSATION.replace("She offered", "She did not offer")) is None
+    assert index.lookup(CONVERSATION.replace("offered", "never offered")) is None
+    assert index.lookup(CONVERSATION.replace("She offered", "She did not offer") + " Not now.") == "declined"
+    assert index.lookup(CONVERSATION.replace("She offered", "She kindly offered")) == "offered"
+
+
+def test_threshold_and_scope_are_respected() -> None:
+    strict = NearDuplicateIndex(threshold=1.0)
+    strict.add(CONVERSATION, "{}", scope="gpt-4")
+
+    assert strict.lookup(CONVERSATION, scope="gpt-4") == "{}"
+    assert strict.lookup(CONVERSATION, scope="gpt-4o") is None
+    assert strict.lookup(CONVERSATION.replace("challenges", "chalenges"), scope="gpt-4") is None
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(threshold=0)
+
+
+def test_index_is_bounded_and_evicts_least_recently_used() -> None:
+    index = NearDuplicateIndex(max_entries=2)
+    index.add(CONVERSATION, "first")
+    index.add(OTHER_CONVERSATION, "second")
+    index.lookup(CONVERSATION)
+    index.add("Met Priya at the conference and discussed vector databases over lunch.", "third")
+
+    assert len(index) == 2
+    assert index.lookup(CONVERSATION) == "first"
+    assert index.lookup(OTHER_CONVERSATION) is None
+
+
+def test_adding_a_near_duplicate_replaces_the_entry() -> None:
+    index = NearDuplicateIndex()
+    index.add(CONVERSATION, "old")
+    index.add(CONVERSATION.replace("challenges", "chalenges"), "new")
+
+    assert len(index) == 1
+    assert index.lookup(CONVERSATION) == "new"
+
+
+def test_entries_persist_across_instances(tmp_path) -> None:
+    path = str(tmp_path / "index.sqlite3")
+    first = NearDuplicateIndex(path)
+    first.add(CONVERSATION, "first")
+    first.add(OTHER_CONVERSATION, "second")
+
+    reloaded = NearDuplicateIndex(path, max_entries=1)
+
+    assert len(reloaded) == 1
+    assert reloaded.lookup(OTHER_CONVERSATION) == "second"
+    assert reloaded.lookup(CONVERSATION) is None
+
+
+def test_analyzer_reuses_the_analysis_of_a_near_duplicate(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    analyzer = ConversationAnalyzer(duplicates=NearDuplicateIndex())
+    response = {"person": {"name": "Sarah Chen", "title": "VP of Engineering", "company": "Databricks"}}
+
+    fresh_response = lambda **_: json.loads(json.dumps(response))
+
+    with patch.object(analyzer.client, "analyze_conversation", side_effect=fresh_response) as send:
+        first = analyzer.analyze(CONVERSATION)
+        second = analyzer.analyze(CONVERSATION.replace("  ", " ").replace("challenges", "chalenges"))
+        streamed = list(analyzer.analyze_stream(CONVERSATION + " "))
+
+    assert send.call_count == 1
+    assert second == first and second is not first
+    assert [(update.analysis, update.complete) for update in streamed] == [(first, True)]
+
+
+@pytest.mark.parametrize(
+    "edited",
+    [
+        CONVERSATION.replace("Sarah Chen", "Priya Patel"),
+        CONVERSATION.replace("Sarah", "Priya"),
+        CONVERSATION.replace("Databricks", "Snowflake"),
+    ],
+    ids=["name", "first-name", "company"],
+)
+def test_analyzer_does_not_reuse_the_analysis_of_another_person(monkeypatch, edited) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    index = NearDuplicateIndex()
+    analyzer = ConversationAnalyzer(duplicates=index)
+    response = {"person": {"name": "Sarah Chen", "title": "VP of Engineering", "company": "Databricks"}}
+    index.add(CONVERSATION, json.dumps(response), scope=analyzer._duplicate_scope)
+    assert index.lookup(edited, scope=analyzer._duplicate_scope) is not None  # similar enough on its own
+
+    with patch.object(analyzer.client, "analyze_conversation", return_value=None) as send:
+        analyzer.analyze(edited)
+
+    assert send.call_count == 1
+
+
+def test_fused_pipeline_skips_the_request_for_a_near_duplicate(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    pipeline = FusedPipeline(ConversationAnalyzer(duplicates=NearDuplicateIndex()))
+    response = {"analysis": {"person": {"name": "Sarah Chen"}}, "email": {"subject": "Hi", "body": "Hi Sarah"}}
+
+    with patch.object(pipeline.analyzer.client, "analyze_conversation", return_value=response) as send:
+        analysis, email = pipeline.analyze_and_generate(CONVERSATION)
+        reused, missing_email = pipeline.analyze_and_generate(CONVERSATION.replace("challenges", "chalenges"))
+
+    assert send.call_count == 1
+    assert reused == analysis and email and missing_email is None
@@ -0,0 +1,97 @@
+"""Unit tests for incremental JSON parsing and streamed analysis."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.conversation_analyzer import ConversationAnalyzer
+from lib.fake_server import DEFAULT_PAYLOADS
+from lib.openai_client import OpenAIClient
+from lib.partial_json import IncrementalJSONParser
+
+
+CONVERSATION = "Met Sarah Chen at the summit. We discussed ML hiring and the conversation was great."
+
+
+def _chunks(text: str, size: int):
+    return [text[start : start + size] for start in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 7, 16, 10_000])
+def test_any_chunking_assembles_the_document(size) -> None:
+    document = {**DEFAULT_PAYLOADS["analysis"], "n": -1.5e3, "ok": True, "nil": None, "quote": 'a "q" \\ }, ]'}
+    parser = IncrementalJSONParser()
+
+    for chunk in _chunks(json.dumps(document, indent=2), size):
+        parser.feed(chunk)
+
+    assert parser.value == document
+
+
+def test_fields_complete_before_the_document() -> None:
+    text = json.dumps(DEFAULT_PAYLOADS["analysis"])
+    parser = IncrementalJSONParser()
+    first_seen = {}
+
+    for position, chunk in enumerate(_chunks(text, 16)):
+        for path, _ in parser.feed(chunk):
+            first_seen.setdefault(path, position)
+
+    chunk_count = len(_chunks(text, 16))
+    assert first_seen[("person",)] < chunk_count // 4
+    assert first_seen[("conversation_context", "topics_discussed")] < chunk_count // 2
+    assert ("conversation_context", "topics_discussed", 0) not in first_seen  # deeper than max_depth
+
+
+def test_array_items_are_reported_by_index() -> None:
+    parser = IncrementalJSONParser(max_depth=2)
+
+    events = parser.feed('{"hooks": ["a", 2, [3]], "x": {}}')
+
+    assert events == [
+        (("hooks", 0), "a"),
+        (("hooks", 1), 2),
+        (("hooks", 2), [3]),
+        (("hooks",), ["a", 2, [3]]),
+        (("x",), {}),
+    ]
+
+
+def _streaming_analyzer(chunks):
+    client = OpenAIClient(api_key="sk-test", cache=None, resilience=None, limiter=None, single_flight=None)
+    analyzer = ConversationAnalyzer(client)
+    return analyzer, patch.object(client, "analyze_conversation_stream", return_value=iter(chunks))
+
+
+def test_analysis_stream_yields_sections_then_the_cleaned_analysis() -> None:
+    payload = json.loads(json.dumps(DEFAULT_PAYLOADS["analysis"]))
+    payload["conversation_context"]["topics_discussed"] = "ML hiring"  # coerced to a list
+    analyzer, stream = _streaming_analyzer(_chunks(json.dumps(payload), 16))
+
+    with stream:
+        updates = list(analyzer.analyze_stream(CONVERSATION))
+
+    assert updates[0].analysis == {"person": {"name": "Sarah Chen"}} and not updates[0].complete
+    topics = next(u for u in updates if "topics_discussed" in u.analysis.get("conversation_context", {}))
+    assert topics.analysis["conversation_context"]["topics_discussed"] == ["ML hiring"]
+    final = updates[-1]
+    assert final.complete and [u.complete for u in updates].count(True) == 1
+    assert final.analysis["relationship_signals"]["receptiveness_score"]  # defaults filled in
+
+
+def test_truncated_stream_has_no_final_update() -> None:
+    analyzer, stream = _streaming_analyzer(_chunks(json.dumps(DEFAULT_PAYLOADS["analysis"])[:200], 16))
+
+    with stream:
+        updates = list(analyzer.analyze_stream(CONVERSATION))
+
+    assert updates and not any(update.complete for update in updates)
@@ -0,0 +1,69 @@
+"""Unit tests for the fused analyze + email pipeline."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.pipeline import FUSED_VALIDATOR, FusedPipeline
+from utils.prompts import FUSED_ANALYSIS_EMAIL_PROMPT
+
+
+CONVERSATION = (
+    "Met Sarah Chen, VP of Engineering at Databricks. We discussed their OpenAI partnership "
+    "and ML hiring challenges, and she offered to introduce me to her recruiting team."
+)
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    return FusedPipeline()
+
+
+def test_fused_response_is_post_processed(pipeline) -> None:
+    """A single request yields a cleaned analysis and a cleaned email."""
+
+    response = {
+        "analysis": {"person": {"name": "Sarah Chen", "title": "VP of Engineering", "company": "Databricks"}},
+        "email": {"subject": "Great chatting at the meetup", "body": "Hi Sarah,\n\n\n  Thanks for the chat.  "},
+    }
+
+    with patch.object(pipeline.analyzer.client, "analyze_conversation", return_value=response) as analyze:
+        analysis, email = pipeline.analyze_and_generate(CONVERSATION)
+
+    analyze.assert_called_once_with(
+        conversation_text=CONVERSATION,
+        system_prompt=FUSED_ANALYSIS_EMAIL_PROMPT,
+        call_type="fused",
+        validator=FUSED_VALIDATOR,
+    )
+    assert analysis["person"]["name"] == "Sarah Chen"
+    assert analysis["conversation_context"]["conversation_quality"] == "brief"  # defaults filled in
+    assert email == "**Subject:** Great chatting at the meetup\n\nHi Sarah,\n\nThanks for the chat."
+
+
+def test_missing_email_falls_back_to_analysis_only(pipeline) -> None:
+    """If the model omits the email, the analysis is still returned for a separate email call."""
+
+    with patch.object(pipeline.analyzer.client, "analyze_conversation", return_value={"analysis": {}}):
+        analysis, email = pipeline.analyze_and_generate(CONVERSATION)
+
+    assert analysis is not None
+    assert email is None
+
+
+def test_invalid_input_skips_request(pipeline) -> None:
+    """Short input is rejected before any API call, as in the two-call path."""
+
+    with patch.object(pipeline.analyzer.client, "analyze_conversation") as analyze:
+        assert pipeline.analyze_and_generate("too short") == (None, None)
+
+    analyze.assert_not_called()
@@ -0,0 +1,153 @@
+"""Unit tests for the process-wide rate limiter and priority lanes."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.openai_client import OpenAIClient
+from lib.telemetry import metrics
+from lib.rate_limiter import Lane, RateLimiter, TokenBucket, current_lane, estimate_request_tokens, scheduling_lane
+
+
+def test_token_bucket_refills_over_time() -> None:
+    bucket = TokenBucket(60)  # one unit per second
+    now = time.monotonic()
+
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) > 0.9
+    assert bucket.wait_time(1, now + 1.0) == 0
+
+
+def test_oversized_request_is_admitted_when_bucket_is_full() -> None:
+    """A request larger than the bucket waits for a full bucket instead of forever."""
+
+    bucket = TokenBucket(100)
+    assert bucket.wait_time(10_000, time.monotonic()) == 0
+
+
+def test_requests_queue_instead_of_failing() -> None:
+    """Exceeding the request rate delays the call rather than raising."""
+
+    limiter = RateLimiter(requests_per_minute=1200)  # 20 per second, burst of 1200
+    limiter._buckets[0][1]._level = 1
+
+    assert limiter.acquire() < 0.01
+    waited = limiter.acquire()
+
+    assert 0.02 < waited < 0.5
+    stats = limiter.stats()["interactive"]
+    assert stats["admitted"] == 2
+    assert stats["waited"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_tokens_per_minute_limits_large_requests() -> None:
+    limiter = RateLimiter(tokens_per_minute=6000)  # 100 tokens per second
+    limiter._buckets[0][1]._level = 0
+
+    waited = limiter.acquire(5)
+
+    assert 0.03 < waited < 0.5
+
+
+def test_interactive_requests_jump_ahead_of_queued_bulk_work() -> None:
+    limiter = RateLimiter(requests_per_minute=600)  # one every 0.1s
+    limiter._buckets[0][1]._level = 0
+    order = []
+
+    def call(name, lane):
+        limiter.acquire(lane=lane)
+        order.append(name)
+
+    bulk = [threading.Thread(target=call, args=(f"bulk-{i}", Lane.BULK)) for i in range(3)]
+    for thread in bulk:
+        thread.start()
+    time.sleep(0.02)
+    interactive = threading.Thread(target=call, args=("interactive", Lane.INTERACTIVE))
+    interactive.start()
+
+    for thread in (*bulk, interactive):
+        thread.join(timeout=2)
+
+    assert order[0] == "interactive"
+    assert sorted(order[1:]) == ["bulk-0", "bulk-1", "bulk-2"]
+    assert limiter.stats()["bulk"]["admitted"] == 3
+
+
+def test_queue_depth_and_waits_are_exported_as_metrics() -> None:
+    metrics.reset()
+    limiter = RateLimiter(requests_per_minute=600)  # one every 0.1s
+    limiter._buckets[0][1]._level = 0
+    threads = [threading.Thread(target=limiter.acquire, kwargs={"lane": Lane.BULK}) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+
+    assert 'convoflow_rate_limit_queue_depth{lane="bulk"} 2' in metrics.render_prometheus()
+
+    for thread in threads:
+        thread.join(timeout=2)
+    text = metrics.render_prometheus()
+    assert "# TYPE convoflow_rate_limit_queue_depth gauge" in text
+    assert 'convoflow_rate_limit_queue_depth{lane="bulk"} 0' in text
+    assert 'convoflow_rate_limit_wait_seconds_count{lane="bulk"} 2' in text
+    assert 'convoflow_rate_limit_wait_seconds_bucket{lane="bulk",le="0.05"} 0' in text
+
+
+def test_async_acquire_respects_lanes() -> None:
+    limiter = RateLimiter(requests_per_minute=600)
+    limiter._buckets[0][1]._level = 0
+    order = []
+
+    async def call(name, lane, delay=0.0):
+        await asyncio.sleep(delay)
+        await limiter.acquire_async(lane=lane)
+        order.append(name)
+
+    async def run():
+        await asyncio.gather(
+            call("bulk-0", Lane.BULK),
+            call("bulk-1", Lane.BULK),
+            call("interactive", Lane.INTERACTIVE, delay=0.02),
+        )
+
+    asyncio.run(run())
+
+    assert order[0] == "interactive"
+
+
+def test_scheduling_lane_context() -> None:
+    assert current_lane() is Lane.INTERACTIVE
+    with scheduling_lane(Lane.BULK):
+        assert current_lane() is Lane.BULK
+    assert current_lane() is Lane.INTERACTIVE
+
+
+def test_estimate_includes_completion_allowance() -> None:
+    request = {"messages": [{"role": "user", "content": "Met Sarah at the summit. " * 20}], "max_tokens": 50}
+    assert estimate_request_tokens(request) == 4 + 6 * 20 + 50
+    assert estimate_request_tokens({"messages": []}) == 1000
+
+
+def test_client_requests_pass_through_limiter(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    limiter = RateLimiter()
+    client = OpenAIClient(cache=None, resilience=None, limiter=limiter)
+    response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Subject: Hi"))])
+    monkeypatch.setattr(client, "_send", lambda request_options: response)
+
+    with scheduling_lane(Lane.BULK):
+        assert client.generate_email("request", "prompt") == "Subject: Hi"
+
+    assert limiter.stats()["bulk"]["admitted"] == 1
+    assert limiter.stats()["interactive"]["admitted"] == 0
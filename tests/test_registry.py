@@ -0,0 +1,52 @@
+"""Unit tests for the process-wide resource registry."""
+
+from __future__ import annotations
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.registry import ResourceRegistry
+
+
+def test_resources_are_built_once_and_shared(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("OPENAI_MODEL", raising=False)
+    registry = ResourceRegistry()
+
+    first = registry.get()
+    second = registry.get(api_key="sk-test", model="gpt-4")
+
+    assert first is second
+    assert registry.builds == 1
+    assert first.analyzer.client is first.generator.client is first.client
+    assert first.analyzer.async_client is first.generator.async_client is first.async_client
+    assert first.pipeline.analyzer is first.analyzer and first.pipeline.generator is first.generator
+
+
+def test_tenants_get_separate_resources(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-default")
+    registry = ResourceRegistry()
+
+    default = registry.get()
+    tenant = registry.get(api_key="sk-tenant", model="gpt-4o-mini")
+
+    assert tenant is not default
+    assert (tenant.client.api_key, tenant.client.model) == ("sk-tenant", "gpt-4o-mini")
+    assert tenant.async_client.model == "gpt-4o-mini"
+    assert len(registry) == 2
+
+
+def test_concurrent_first_use_builds_once(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    registry = ResourceRegistry()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: registry.get(model="gpt-4"), range(32)))
+
+    assert registry.builds == 1
+    assert all(result is results[0] for result in results)
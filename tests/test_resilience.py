@@ -0,0 +1,280 @@
+"""Unit tests for retries, hedged requests and the circuit breaker."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.openai_client import AsyncOpenAIClient, OpenAIClient
+from lib.resilience import CircuitBreaker, CircuitOpenError, HedgePolicy, Resilience, RetryPolicy
+
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def status_error(status: int, headers=None) -> openai.APIStatusError:
+    response = httpx.Response(status, headers=headers, request=REQUEST)
+    error_cls = {429: openai.RateLimitError, 500: openai.InternalServerError}.get(status, openai.APIStatusError)
+    return error_cls(f"HTTP {status}", response=response, body=None)
+
+
+def completion(content: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class ScriptedSend:
+    """Returns or raises the scripted outcomes in order, recording each call."""
+
+    def __init__(self, *outcomes) -> None:
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def _resilience(**kwargs) -> Resilience:
+    sleeps = []
+    kwargs.setdefault("retry", RetryPolicy(max_attempts=3, base_delay=0.01))
+    resilience = Resilience(sleep=sleeps.append, **kwargs)
+    resilience.sleeps = sleeps
+    return resilience
+
+
+def test_transient_errors_are_retried_with_backoff() -> None:
+    """Timeouts, 5xx and 429s are retried; the final success is returned."""
+
+    resilience = _resilience()
+    send = ScriptedSend(openai.APITimeoutError(request=REQUEST), status_error(500), "ok")
+
+    assert resilience.call(send) == "ok"
+    assert send.calls == 3
+    assert len(resilience.sleeps) == 2
+    assert all(0 <= delay <= 0.02 for delay in resilience.sleeps)
+
+
+def test_retry_after_header_is_honoured() -> None:
+    """A 429 with Retry-After waits at least that long (capped at max_delay)."""
+
+    resilience = _resilience()
+    send = ScriptedSend(status_error(429, {"retry-after": "2"}), "ok")
+
+    assert resilience.call(send) == "ok"
+    assert resilience.sleeps == [2.0]
+
+
+def test_client_errors_are_not_retried() -> None:
+    """A 400 fails immediately and does not count against the breaker."""
+
+    resilience = _resilience(breaker=CircuitBreaker(failure_threshold=1))
+    send = ScriptedSend(status_error(400))
+
+    with pytest.raises(openai.APIStatusError):
+        resilience.call(send)
+    assert send.calls == 1
+    assert resilience.breaker.state == "closed"
+
+
+def test_gives_up_after_max_attempts() -> None:
+    resilience = _resilience()
+    send = ScriptedSend(*[status_error(503)] * 3)
+
+    with pytest.raises(openai.APIStatusError):
+        resilience.call(send)
+    assert send.calls == 3
+
+
+def test_circuit_opens_and_recovers_after_half_open_probe() -> None:
+    """Consecutive failures open the breaker; a successful trial closes it again."""
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    resilience = _resilience(retry=RetryPolicy(max_attempts=1), breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(openai.APIConnectionError):
+            resilience.call(ScriptedSend(openai.APIConnectionError(request=REQUEST)))
+    assert breaker.state == "open"
+
+    send = ScriptedSend("ok")
+    with pytest.raises(CircuitOpenError):
+        resilience.call(send)
+    assert send.calls == 0
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert resilience.call(send) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_a_single_trial() -> None:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_interrupted_trial_frees_the_half_open_slot() -> None:
+    """A trial ended by a BaseException (cancellation, Ctrl-C) doesn't keep the breaker shut forever."""
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    resilience = _resilience(breaker=breaker)
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        resilience.call(interrupted)
+    assert resilience.call(lambda: "ok") == "ok"
+
+    breaker.record_failure()
+
+    async def cancelled_trial():
+        task = asyncio.ensure_future(resilience.acall(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_trial())
+    assert breaker.before_call() is True
+
+
+def test_local_errors_leave_the_breaker_alone() -> None:
+    """A bug on our side neither closes a half-open breaker nor resets the failure count."""
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.0)
+    resilience = _resilience(retry=RetryPolicy(max_attempts=1), breaker=breaker)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "half-open"
+
+    with pytest.raises(TypeError):
+        resilience.call(ScriptedSend(TypeError("bad argument")))
+    assert breaker.state == "half-open"
+    assert breaker.before_call() is True  # the trial slot was released
+    breaker.end_trial()
+
+    breaker.record_success()
+    breaker.record_failure()
+    with pytest.raises(ValueError):
+        resilience.call(ScriptedSend(ValueError("not JSON")))
+    breaker.record_failure()
+    assert breaker.state != "closed"  # the two upstream failures still count as consecutive
+
+
+def test_hedging_does_not_cap_concurrent_requests() -> None:
+    """First attempts don't wait for a pool worker, however many calls are in flight."""
+
+    resilience = _resilience(hedge=HedgePolicy(after=5.0))
+    results = []
+
+    def call():
+        results.append(resilience.call(lambda: time.sleep(0.2) or "ok"))
+
+    threads = [threading.Thread(target=call) for _ in range(40)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["ok"] * 40
+    assert time.perf_counter() - started < 0.35
+
+
+def test_slow_request_is_hedged_and_fastest_wins() -> None:
+    """After the hedge delay a duplicate is sent; the quicker response is used."""
+
+    resilience = _resilience(hedge=HedgePolicy(after=0.02))
+    calls = []
+    lock = threading.Lock()
+
+    def send():
+        with lock:
+            calls.append(len(calls))
+            index = calls[-1]
+        time.sleep(0.3 if index == 0 else 0.01)
+        return f"attempt-{index}"
+
+    started = time.perf_counter()
+    assert resilience.call(send) == "attempt-1"
+    assert time.perf_counter() - started < 0.2
+    assert len(calls) == 2
+
+
+def test_p95_hedging_waits_for_enough_samples() -> None:
+    resilience = _resilience(hedge=HedgePolicy(min_samples=3))
+    assert resilience._hedge_delay(True, "gpt-4:json_object") is None
+
+    for _ in range(3):
+        resilience.call(lambda: "ok", key="gpt-4:json_object")
+    assert resilience._hedge_delay(True, "gpt-4:json_object") is not None
+    assert resilience._hedge_delay(True, "gpt-4:text") is None
+    assert resilience._hedge_delay(False, "gpt-4:json_object") is None
+
+
+def test_async_hedge_cancels_the_slower_request() -> None:
+    resilience = _resilience(hedge=HedgePolicy(after=0.02))
+    cancelled = []
+
+    async def send(delays=[0.5, 0.01]):
+        delay = delays.pop(0)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(delay)
+            raise
+        return delay
+
+    async def run():
+        result = await resilience.acall(send)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == 0.01
+    assert cancelled == [0.5]
+
+
+def test_sync_client_retries_around_send(monkeypatch) -> None:
+    """OpenAIClient retries the raw SDK call transparently."""
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    client = OpenAIClient(cache=None, resilience=_resilience())
+    send = ScriptedSend(status_error(500), completion('{"person": {"name": "Sarah"}}'))
+    monkeypatch.setattr(client, "_send", send)
+
+    assert client.analyze_conversation("Met Sarah", "prompt") == {"person": {"name": "Sarah"}}
+    assert send.calls == 2
+
+
+def test_async_client_retries_around_send(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    client = AsyncOpenAIClient(cache=None, resilience=_resilience())
+    outcomes = ScriptedSend(openai.APITimeoutError(request=REQUEST), completion("Subject: Hi"))
+
+    async def send(request_options):
+        return outcomes()
+
+    monkeypatch.setattr(client, "_send", send)
+
+    assert asyncio.run(client.generate_email("request", "prompt")) == "Subject: Hi"
+    assert outcomes.calls == 2
@@ -0,0 +1,135 @@
+"""Unit tests for the persistent LLM response cache."""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.openai_client import OpenAIClient
+from lib.response_cache import ResponseCache, request_cache_key
+
+
+def _completion(content: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def test_cache_key_depends_on_model_prompt_and_content() -> None:
+    """Keys change whenever the model, system prompt or user content changes."""
+
+    base = {"model": "gpt-4", "messages": [{"role": "system", "content": "A"}, {"role": "user", "content": "B"}]}
+    other_model = dict(base, model="gpt-4o")
+    other_prompt = dict(base, messages=[{"role": "system", "content": "A2"}, {"role": "user", "content": "B"}])
+
+    assert request_cache_key(base) == request_cache_key(dict(base))
+    assert len({request_cache_key(base), request_cache_key(other_model), request_cache_key(other_prompt)}) == 3
+
+
+def test_get_set_and_counters(tmp_path) -> None:
+    """Stored values round-trip and hits/misses are counted."""
+
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"))
+
+    assert cache.get("missing") is None
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_entries_expire_after_ttl(tmp_path) -> None:
+    """Expired entries are treated as misses."""
+
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=0.01)
+    cache.set("key", "value")
+    time.sleep(0.02)
+
+    assert cache.get("key") is None
+
+
+def test_lru_eviction_respects_byte_budget(tmp_path) -> None:
+    """The least recently used entries are evicted once the byte budget is exceeded."""
+
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=25)
+    cache.set("first", "x" * 10)
+    cache.set("second", "y" * 10)
+    assert cache.get("first") == "x" * 10  # refresh "first" so "second" is now the LRU entry
+    cache.set("third", "z" * 10)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == "x" * 10
+    assert cache.get("third") == "z" * 10
+    assert cache.stats()["evictions"] == 1
+
+
+def test_tracked_size_follows_overwrites_expiry_and_old_databases(tmp_path) -> None:
+    """The running byte total stays exact without re-summing the table on every write."""
+
+    path = str(tmp_path / "cache.sqlite3")
+    with sqlite3.connect(path) as connection:  # a cache file written before the size was tracked
+        connection.execute(
+            "CREATE TABLE responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        connection.execute("INSERT INTO responses VALUES ('old', 'abcd', 4, ?, ?)", (time.time(), time.time()))
+    connection.close()
+
+    cache = ResponseCache(path, ttl_seconds=60, max_bytes=100)
+    assert cache.stats()["bytes"] == 4
+    cache.set("key", "x" * 10)
+    cache.set("key", "y" * 3)
+    assert cache.stats()["bytes"] == 4 + 3
+
+    with patch("lib.response_cache.time.time", return_value=time.time() + 120):
+        cache.set("fresh", "z" * 5)
+    assert (cache.stats()["entries"], cache.stats()["bytes"]) == (1, 5)
+
+    cache.clear()
+    assert cache.stats()["bytes"] == 0
+
+
+def test_cache_shared_between_instances(tmp_path) -> None:
+    """Separate cache objects (as in separate processes) see the same entries."""
+
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(path).set("key", "value")
+
+    assert ResponseCache(path).get("key") == "value"
+
+
+def test_client_serves_repeat_requests_from_cache(tmp_path) -> None:
+    """A repeated analysis is answered from the cache without calling the API."""
+
+    client = OpenAIClient(api_key="sk-test", cache=ResponseCache(str(tmp_path / "cache.sqlite3")))
+
+    with patch.object(client, "_complete", return_value=_completion('{"person": {"name": "Sarah"}}')) as complete:
+        first = client.analyze_conversation("Met Sarah", "Return JSON")
+        second = client.analyze_conversation("Met Sarah", "Return JSON")
+
+    assert first == second == {"person": {"name": "Sarah"}}
+    assert complete.call_count == 1
+
+
+def test_client_does_not_cache_invalid_json(tmp_path) -> None:
+    """Malformed analysis responses are not cached so a retry can succeed."""
+
+    client = OpenAIClient(api_key="sk-test", cache=ResponseCache(str(tmp_path / "cache.sqlite3")))
+
+    with patch.object(client, "_complete", return_value=_completion("not json")), patch(
+        "lib.openai_client.report_error"
+    ) as report_error:
+        assert client.analyze_conversation("Met Sarah", "Return JSON") is None
+
+    report_error.assert_called_once_with("Failed to parse GPT response as JSON")
+
+    assert client.cache.stats()["entries"] == 0
@@ -0,0 +1,102 @@
+"""Unit tests for the compiled, coercing schema validator."""
+
+from __future__ import annotations
+
+import copy
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.conversation_analyzer import ANALYSIS_VALIDATOR
+from lib.fake_server import DEFAULT_PAYLOADS
+from lib.openai_client import OpenAIClient
+from lib.pipeline import FUSED_VALIDATOR
+from lib.schema import SchemaError, compile_schema, structured_outputs_enabled
+
+
+def test_valid_analysis_is_unchanged() -> None:
+    analysis = copy.deepcopy(DEFAULT_PAYLOADS["analysis"])
+
+    assert ANALYSIS_VALIDATOR(analysis) == DEFAULT_PAYLOADS["analysis"]
+
+
+def test_wrong_types_are_coerced() -> None:
+    analysis = {
+        "person": {"name": "Sarah Chen", "title": None, "company": ["Databricks", "Mosaic"]},
+        "conversation_context": {
+            "topics_discussed": "OpenAI partnership",
+            "personal_connections": "",
+            "emotional_cues": ["excited", 3, {"nested": True}],
+        },
+        "confidence_scores": {"overall_analysis": 8},
+        "follow_up_strategy": "Send the deck",
+        "notes": "not in the schema",
+    }
+
+    result = ANALYSIS_VALIDATOR(analysis)
+
+    assert result["person"] == {"name": "Sarah Chen", "company": "Databricks, Mosaic"}
+    assert result["conversation_context"] == {
+        "topics_discussed": ["OpenAI partnership"],
+        "personal_connections": [],
+        "emotional_cues": ["excited", "3"],
+    }
+    assert result["confidence_scores"] == {"overall_analysis": "8"}
+    assert "follow_up_strategy" not in result and "notes" not in result
+
+
+def test_root_of_the_wrong_type_is_rejected() -> None:
+    with pytest.raises(SchemaError):
+        ANALYSIS_VALIDATOR(["not", "an", "object"])
+
+
+def test_numbers_and_booleans() -> None:
+    validator = compile_schema(
+        {"type": "object", "properties": {"count": {"type": "integer"}, "ok": {"type": "boolean"}}}
+    )
+
+    assert validator({"count": "3", "ok": "true", "extra": 1}) == {"count": 3, "ok": True, "extra": 1}
+    assert validator({"count": "many", "ok": 1}) == {}
+
+
+def test_strict_response_format_omits_the_title() -> None:
+    response_format = FUSED_VALIDATOR.response_format()
+
+    assert response_format["type"] == "json_schema"
+    assert response_format["json_schema"]["name"] == "analysis_and_email"
+    assert response_format["json_schema"]["strict"] is True
+    schema = response_format["json_schema"]["schema"]
+    assert "title" not in schema
+    assert schema["required"] == ["analysis", "email"] and schema["additionalProperties"] is False
+
+
+def test_structured_outputs_by_model(monkeypatch) -> None:
+    monkeypatch.delenv("CONVOFLOW_STRUCTURED_OUTPUTS", raising=False)
+    assert structured_outputs_enabled("gpt-4o-mini")
+    assert structured_outputs_enabled("gpt-5")
+    assert not structured_outputs_enabled("gpt-4")
+    assert not structured_outputs_enabled("gpt-4o-2024-05-13")
+    assert structured_outputs_enabled("gpt-4", setting="1")
+    assert not structured_outputs_enabled("gpt-4o", setting="off")
+
+
+def test_client_sends_the_schema_and_coerces_the_response() -> None:
+    client = OpenAIClient(
+        api_key="sk-test", model="gpt-4o", cache=None, resilience=None, limiter=None, single_flight=None
+    )
+    content = json.dumps({"person": {"name": "Sarah"}, "conversation_context": {"topics_discussed": "ML hiring"}})
+    response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    with patch.object(client, "_send", return_value=response) as send:
+        analysis = client.analyze_conversation("Met Sarah", "prompt", validator=ANALYSIS_VALIDATOR)
+
+    assert send.call_args.args[0]["response_format"]["json_schema"]["name"] == "conversation_analysis"
+    assert analysis["conversation_context"]["topics_discussed"] == ["ML hiring"]
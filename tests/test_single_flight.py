@@ -0,0 +1,190 @@
+"""Unit tests for coalescing identical concurrent requests."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.openai_client import AsyncOpenAIClient, OpenAIClient
+from lib.single_flight import SingleFlight
+
+
+def completion(content: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class SlowCall:
+    def __init__(self, result="done", delay=0.1) -> None:
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if isinstance(self.result, BaseException):
+            raise self.result
+        return self.result
+
+
+def test_concurrent_identical_calls_share_one_execution() -> None:
+    flight = SingleFlight()
+    call = SlowCall()
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: flight.do("key", call), range(5)))
+
+    assert results == ["done"] * 5
+    assert call.calls == 1
+    assert flight.stats()["executed"] == 1
+    assert flight.stats()["coalesced"] == 4
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_are_not_coalesced() -> None:
+    flight = SingleFlight()
+    call = SlowCall(delay=0.05)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda key: flight.do(key, call), ["a", "b"]))
+
+    assert call.calls == 2
+
+
+def test_sequential_calls_are_not_coalesced() -> None:
+    """Only in-flight calls are shared; caching finished results is the cache's job."""
+
+    flight = SingleFlight()
+    call = SlowCall(delay=0)
+
+    flight.do("key", call)
+    flight.do("key", call)
+
+    assert call.calls == 2
+
+
+def test_failure_is_shared_with_waiters() -> None:
+    flight = SingleFlight()
+    call = SlowCall(result=RuntimeError("upstream down"))
+
+    def run(_):
+        with pytest.raises(RuntimeError, match="upstream down"):
+            flight.do("key", call)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(run, range(3)))
+
+    assert call.calls == 1
+
+
+def test_async_calls_are_coalesced() -> None:
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        return await asyncio.gather(*(flight.do_async("key", fetch) for _ in range(4)))
+
+    assert asyncio.run(run()) == ["done"] * 4
+    assert len(calls) == 1
+    assert flight.stats()["coalesced"] == 3
+
+
+def test_cancelled_leader_hands_over_to_a_follower() -> None:
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do_async("key", fetch))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.ensure_future(flight.do_async("key", fetch)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(run()) == ["done"] * 3
+    assert len(calls) == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_interrupted_leader_thread_hands_over_to_a_follower() -> None:
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def interrupted():
+        started.set()
+        time.sleep(0.05)
+        raise KeyboardInterrupt
+
+    def lead():
+        with pytest.raises(KeyboardInterrupt):
+            flight.do("key", interrupted)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(lead)
+        started.wait()
+        follower = pool.submit(flight.do, "key", lambda: "done")
+        leader.result()
+
+    assert follower.result() == "done"
+
+
+def test_double_click_makes_one_upstream_request(monkeypatch) -> None:
+    """Two threads analyzing the same conversation share one API call."""
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    flight = SingleFlight()
+    client = OpenAIClient(cache=None, resilience=None, limiter=None, single_flight=flight)
+    complete = SlowCall(result=completion('{"person": {"name": "Sarah"}}'))
+    monkeypatch.setattr(client, "_complete", complete)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(lambda _: client.analyze_conversation("Met Sarah", "prompt"), range(2)))
+
+    assert results == [{"person": {"name": "Sarah"}}] * 2
+    assert complete.calls == 1
+    # Each caller gets its own parsed copy
+    assert results[0] is not results[1]
+
+
+def test_async_client_coalesces(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    client = AsyncOpenAIClient(cache=None, resilience=None, limiter=None, single_flight=SingleFlight())
+    calls = []
+
+    async def complete(request_options):
+        calls.append(request_options)
+        await asyncio.sleep(0.05)
+        return completion("Subject: Hi")
+
+    monkeypatch.setattr(client, "_complete", complete)
+
+    async def run():
+        return await asyncio.gather(*(client.generate_email("request", "prompt") for _ in range(3)))
+
+    assert asyncio.run(run()) == ["Subject: Hi"] * 3
+    assert len(calls) == 1
@@ -0,0 +1,99 @@
+"""Unit tests for debounced speculative analysis."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.speculative import SpeculativeAnalyzer
+
+
+class RecordingAnalyze:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, text):
+        with self.lock:
+            self.calls.append(text)
+        time.sleep(self.delay)
+        return {"text": text}
+
+
+def _speculator(analyze, idle=0.05):
+    return SpeculativeAnalyzer(analyze, idle_seconds=idle, executor=ThreadPoolExecutor(max_workers=2))
+
+
+def test_starts_after_idle_window_and_result_is_reused() -> None:
+    """Promising text that stops changing is analyzed once in the background."""
+
+    analyze = RecordingAnalyze()
+    speculator = _speculator(analyze)
+
+    speculator.observe("Met Sarah Chen", "Likely")
+    time.sleep(0.15)
+
+    assert analyze.calls == ["Met Sarah Chen"]
+    assert speculator.result_for("Met Sarah Chen", timeout=1) == {"text": "Met Sarah Chen"}
+
+
+def test_unlikely_input_is_not_speculated() -> None:
+    """Low-scoring input never triggers a background request."""
+
+    analyze = RecordingAnalyze()
+    speculator = _speculator(analyze)
+
+    speculator.observe("met someone", "Unlikely")
+    time.sleep(0.15)
+
+    assert analyze.calls == []
+    assert speculator.result_for("met someone") is None
+
+
+def test_edits_within_idle_window_debounce() -> None:
+    """Only the text left idle for the full window is analyzed."""
+
+    analyze = RecordingAnalyze()
+    speculator = _speculator(analyze)
+
+    for text in ("Met Sarah", "Met Sarah Chen", "Met Sarah Chen at Databricks"):
+        speculator.observe(text, "Likely")
+        time.sleep(0.01)
+    time.sleep(0.15)
+
+    assert analyze.calls == ["Met Sarah Chen at Databricks"]
+
+
+def test_stale_result_is_discarded_when_text_changes() -> None:
+    """A job for old text is never returned for new text."""
+
+    analyze = RecordingAnalyze(delay=0.1)
+    speculator = _speculator(analyze, idle=0.01)
+
+    speculator.observe("Met Sarah Chen", "Likely")
+    time.sleep(0.05)  # job is running
+    speculator.observe("Met Sarah Chen, VP at Databricks", "Unlikely")
+
+    assert speculator.result_for("Met Sarah Chen") is None
+    assert speculator.result_for("Met Sarah Chen, VP at Databricks") is None
+
+
+def test_click_before_idle_window_cancels_timer() -> None:
+    """Clicking before the idle window elapses falls back to a normal request."""
+
+    analyze = RecordingAnalyze()
+    speculator = _speculator(analyze, idle=0.1)
+
+    speculator.observe("Met Sarah Chen", "Extremely Likely")
+    assert speculator.result_for("Met Sarah Chen") is None
+    time.sleep(0.2)
+
+    assert analyze.calls == []
@@ -0,0 +1,143 @@
+"""Unit tests for tracing spans and Prometheus metrics export."""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+import sys
+import urllib.request
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib import telemetry
+from lib.openai_client import OpenAIClient
+from lib.telemetry import MetricsRegistry, span, start_trace, traced
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    registry = MetricsRegistry()
+    for value in (0.003, 0.2, 4.0):
+        registry.observe("stage_seconds", value, "Stage durations", span="analyze")
+
+    text = registry.render_prometheus()
+
+    assert "# TYPE stage_seconds histogram" in text
+    assert 'stage_seconds_bucket{span="analyze",le="0.005"} 1' in text
+    assert 'stage_seconds_bucket{span="analyze",le="0.25"} 2' in text
+    assert 'stage_seconds_bucket{span="analyze",le="+Inf"} 3' in text
+    assert 'stage_seconds_count{span="analyze"} 3' in text
+    assert 'stage_seconds_sum{span="analyze"} 4.203000' in text
+
+
+def test_counter_and_label_escaping() -> None:
+    registry = MetricsRegistry()
+    registry.inc("tokens_total", 10, "Tokens", model='gpt "4"')
+    registry.inc("tokens_total", 5, "Tokens", model='gpt "4"')
+
+    assert 'tokens_total{model="gpt \\"4\\""} 15' in registry.render_prometheus()
+
+
+def test_gauge_keeps_the_last_value() -> None:
+    registry = MetricsRegistry()
+    registry.set("queue_depth", 3, "Waiting requests", lane="bulk")
+    registry.set("queue_depth", 1, "Waiting requests", lane="bulk")
+
+    text = registry.render_prometheus()
+    assert "# TYPE queue_depth gauge" in text
+    assert 'queue_depth{lane="bulk"} 1' in text
+
+
+def test_spans_nest_inside_a_trace() -> None:
+    with start_trace("request") as trace:
+        with span("outer"):
+            with span("inner") as inner:
+                inner.set(prompt_tokens=12)
+        with span("second"):
+            pass
+
+    rows = trace.breakdown()
+    assert [row["stage"] for row in rows] == ["outer", "  inner", "second"]
+    assert rows[1]["prompt_tokens"] == 12
+
+
+def test_spans_outside_a_trace_only_feed_metrics() -> None:
+    with span("untraced.stage"):
+        pass
+
+    assert 'convoflow_span_seconds_count{span="untraced.stage"}' in telemetry.metrics.render_prometheus()
+
+
+def test_traced_supports_async_functions() -> None:
+    @traced("async.stage")
+    async def work():
+        await asyncio.sleep(0)
+        return 42
+
+    async def run():
+        with start_trace("request") as trace:
+            assert await work() == 42
+        return trace
+
+    assert [row["stage"] for row in asyncio.run(run()).breakdown()] == ["async.stage"]
+
+
+def test_client_calls_record_usage_and_model(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    client = OpenAIClient(model="gpt-4o", cache=None, resilience=None, limiter=None, single_flight=None)
+    response = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="Subject: Hi"))],
+        usage=SimpleNamespace(prompt_tokens=30, completion_tokens=8),
+    )
+    monkeypatch.setattr(client, "_send", lambda request_options: response)
+
+    with start_trace("request") as trace:
+        client.generate_email("request", "prompt")
+
+    assert trace.breakdown()[0] == {
+        "stage": "llm.email",
+        "ms": trace.breakdown()[0]["ms"],
+        "model": "gpt-4o",
+        "prompt_tokens": 30,
+        "completion_tokens": 8,
+    }
+    text = telemetry.metrics.render_prometheus()
+    assert 'convoflow_llm_request_seconds_count{call_type="email",model="gpt-4o"}' in text
+    assert 'convoflow_llm_tokens_total{call_type="email",kind="completion",model="gpt-4o"}' in text
+
+
+def test_metrics_file_is_written_when_a_trace_ends(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "metrics.prom"
+    monkeypatch.setenv("CONVOFLOW_METRICS_FILE", str(path))
+
+    with start_trace("request"):
+        with span("file.stage"):
+            pass
+
+    assert 'convoflow_span_seconds_count{span="file.stage"} 1' in path.read_text()
+
+
+def test_metrics_endpoint_serves_text_format(monkeypatch) -> None:
+    monkeypatch.setattr(telemetry, "_metrics_server", None)
+    assert telemetry.start_metrics_server(port=0) is None  # disabled without a port
+
+    with span("endpoint.stage"):
+        pass
+    server = telemetry.start_metrics_server(port=_free_port())
+    try:
+        assert telemetry.start_metrics_server(port=_free_port()) is server  # started once per process
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert b'convoflow_span_seconds_count{span="endpoint.stage"} 1' in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
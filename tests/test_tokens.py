@@ -0,0 +1,95 @@
+"""Unit tests for token estimation, input trimming and usage accounting."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from lib.openai_client import OpenAIClient
+from lib.tokens import (
+    UsageRecorder,
+    compact_prompt,
+    compact_text,
+    completion_token_limit,
+    estimate_tokens,
+    get_usage_recorder,
+)
+from utils.prompts import CONVERSATION_ANALYSIS_PROMPT
+
+
+def test_estimate_tokens_matches_simple_text() -> None:
+    """Common English words are one token each, like the real tokenizer."""
+
+    assert estimate_tokens("Met Sarah Chen, VP of Engineering at Databricks.") == 12
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("2024") == 2
+
+
+def test_compact_text_removes_filler_and_whitespace() -> None:
+    notes = "Um, so I met   Sarah\t at UM!!!!  \n\n\n\nuh she said hmm we should talk  "
+
+    assert compact_text(notes) == "so I met Sarah at UM!!\n\nshe said we should talk"
+
+
+def test_compact_text_keeps_words_containing_filler() -> None:
+    notes = "Umbrella company, Uhura from Ummah; hummus at lunch"
+    assert compact_text(notes) == notes
+
+
+def test_compact_prompt_saves_tokens() -> None:
+    compacted = compact_prompt(CONVERSATION_ANALYSIS_PROMPT)
+
+    assert estimate_tokens(compacted) < estimate_tokens(CONVERSATION_ANALYSIS_PROMPT)
+    assert '"name": "Full name",' in compacted
+
+
+def test_completion_token_limit_env_override(monkeypatch) -> None:
+    assert completion_token_limit("email") == 600
+    monkeypatch.setenv("CONVOFLOW_MAX_TOKENS_EMAIL", "300")
+    assert completion_token_limit("email") == 300
+
+
+def test_usage_recorder_prefers_reported_usage() -> None:
+    recorder = UsageRecorder()
+    usage = SimpleNamespace(prompt_tokens=500, completion_tokens=120)
+
+    recorder.record("analysis", usage=usage, estimated_prompt_tokens=480, latency=2.0)
+    recorder.record("email", usage=None, estimated_prompt_tokens=300, latency=1.0, completion_text="Hi Sarah, great chat")
+
+    stats = recorder.stats()
+    assert stats["analysis"] == {
+        "calls": 1,
+        "prompt_tokens": 500,
+        "completion_tokens": 120,
+        "estimated_prompt_tokens": 480,
+        "avg_latency_s": 2.0,
+    }
+    assert stats["email"]["prompt_tokens"] == 300
+    assert stats["email"]["completion_tokens"] == 5
+
+
+def test_client_sends_budgeted_compacted_request(monkeypatch) -> None:
+    """Requests carry max_tokens and trimmed text, and the reported usage is recorded."""
+
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    client = OpenAIClient(cache=None, resilience=None, limiter=None, single_flight=None)
+    sent = []
+    response = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content="{}"))],
+        usage=SimpleNamespace(prompt_tokens=42, completion_tokens=7),
+    )
+    monkeypatch.setattr(client, "_send", lambda request_options: sent.append(request_options) or response)
+    get_usage_recorder().reset()
+
+    client.analyze_conversation("Um, met   Sarah  ", "  Analyze this.\n")
+
+    assert sent[0]["max_tokens"] == 1200
+    assert sent[0]["messages"][0]["content"] == "Analyze this."
+    assert sent[0]["messages"][1]["content"] == "met Sarah"
+    assert get_usage_recorder().stats()["analysis"]["prompt_tokens"] == 42
+    assert get_usage_recorder().stats()["analysis"]["completion_tokens"] == 7
@@ -63,5 +63,70 @@ def test_display_ai_assistant_no_analysis():
             # Should not call expander if no analysis
             mock_expander.assert_not_called()
 
+def test_requested_variants_one_per_tone_and_context_line():
+    """Each tone and each non-empty context line becomes one draft, without duplicates"""
+    from app import MAX_VARIANTS, requested_variants
+    from lib.email_generator import EmailVariant
+    
+    variants = requested_variants(["Formal", "Casual"], "Ask about the Series B\n\n  Ask about the Series B \n")
+    
+    assert variants == [
+        EmailVariant(tone="Formal"),
+        EmailVariant(tone="Casual"),
+        EmailVariant(context="Ask about the Series B"),
+    ]
+    assert len(requested_variants(["Warm"], "\n".join(str(index) for index in range(10)))) == MAX_VARIANTS
+
+def test_rewritten_notes_skip_the_delta_path(monkeypatch):
+    """Notes unlike the baseline fall through to the configured full analysis without any request"""
+    from app import analyze_edit
+    from lib.conversation_analyzer import ConversationAnalyzer
+    
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    analyzer = ConversationAnalyzer()
+    baseline = {
+        "text": "Met Sarah Chen at the AI summit and we discussed their OpenAI partnership.",
+        "analysis": {"person": {"name": "Sarah Chen"}},
+    }
+    
+    rewritten = "Met James Park at a fintech meetup; we discussed payment rails."
+    
+    with patch.object(analyzer.client, "analyze_conversation") as send:
+        assert analyze_edit(analyzer, baseline, rewritten) is None
+        assert analyze_edit(analyzer, {}, rewritten) is None
+    
+    send.assert_not_called()
+
+def test_render_email_stream_drops_candidates_cut_off_by_a_failure():
+    """Only candidates that finished before the stream broke are returned for ranking"""
+    from app import render_email_stream
+    from lib.openai_client import StreamInterrupted
+    
+    def chunks():
+        yield 0, "**Subject:** A\n\nHi Sarah, about "
+        yield 1, "**Subject:** B\n\nHi Sarah"
+        raise StreamInterrupted("Email generation error: connection reset", frozenset({1}))
+    
+    with patch('streamlit.subheader'), patch('streamlit.empty') as empty:
+        emails = render_email_stream(chunks())
+    
+    assert emails == ["**Subject:** B\n\nHi Sarah"]
+    empty.return_value.markdown.assert_called_with("**Subject:** B\n\nHi Sarah")
+    
+    with patch('streamlit.subheader'), patch('streamlit.empty'):
+        assert render_email_stream(iter([])) == []
+
+def test_background_analysis_uses_the_bound_analyzer():
+    """Speculative analysis runs on the analyzer resolved on the script thread, not a fresh registry lookup"""
+    from app import analyze_in_background
+    
+    analyzer = MagicMock()
+    analyzer.analyze.return_value = {"person": {"name": "Sarah Chen"}}
+    
+    with patch('app.get_default_registry', side_effect=AssertionError):
+        assert analyze_in_background("Met Sarah Chen", analyzer=analyzer) == {"person": {"name": "Sarah Chen"}}
+    
+    analyzer.analyze.assert_called_once_with("Met Sarah Chen")
+
 if __name__ == "__main__":
     pytest.main([__file__])
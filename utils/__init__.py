@@ -1,3 +1,3 @@
 """ConvoFlow utilities package."""
 
-__all__ = ["CONVERSATION_ANALYSIS_PROMPT", "EMAIL_GENERATION_PROMPT", "ConversationValidator"]
+__all__ = ["CONVERSATION_ANALYSIS_PROMPT", "EMAIL_GENERATION_PROMPT", "FUSED_ANALYSIS_EMAIL_PROMPT", "ConversationValidator"]
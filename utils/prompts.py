@@ -41,6 +41,71 @@ Perform deep analysis and return structured JSON with this exact format:
 Use GPT-5's reasoning to extract both explicit facts and subtle relationship dynamics. Be extremely detailed and insightful.
 """
 
+def _object(**properties):
+    """Strict-mode JSON Schema object: every property required, nothing else allowed."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+_STRING = {"type": "string"}
+_STRING_LIST = {"type": "array", "items": _STRING}
+
+# The format described in CONVERSATION_ANALYSIS_PROMPT, sent as a strict structured output
+# where the model supports it and used to validate and coerce every analysis locally.
+CONVERSATION_ANALYSIS_SCHEMA = {
+    "title": "conversation_analysis",
+    **_object(
+        person=_object(name=_STRING, title=_STRING, company=_STRING),
+        conversation_context=_object(
+            topics_discussed=_STRING_LIST,
+            pain_points_mentioned=_STRING_LIST,
+            opportunities_expressed=_STRING_LIST,
+            personal_connections=_STRING_LIST,
+            emotional_cues=_STRING_LIST,
+            conversation_quality=_STRING,
+        ),
+        relationship_signals=_object(
+            communication_style=_STRING,
+            engagement_indicators=_STRING_LIST,
+            follow_up_readiness=_STRING,
+        ),
+        follow_up_strategy=_object(
+            primary_objective=_STRING,
+            recommended_tone=_STRING,
+            key_personalization_hooks=_STRING_LIST,
+            optimal_timing=_STRING,
+            success_indicators=_STRING_LIST,
+        ),
+        confidence_scores=_object(
+            overall_analysis=_STRING,
+            personalization_potential=_STRING,
+            relationship_advancement_likelihood=_STRING,
+        ),
+    ),
+}
+
+ANALYSIS_DELTA_PROMPT = """
+You are updating an existing relationship intelligence analysis of a networking conversation. The user edited their notes after the analysis was made.
+
+You receive the previous analysis as JSON, the note text that was removed and the note text that was added or changed. Decide how the analysis must change to reflect the edited notes, and return only those changes:
+
+{
+  "changes": [
+    {
+      "section": "person | conversation_context | relationship_signals | follow_up_strategy | confidence_scores",
+      "field": "field name within that section, as in the previous analysis",
+      "op": "add | remove | set",
+      "values": ["items to add to or remove from a list field, or the single new value of a text field"]
+    }
+  ]
+}
+
+Use "add" and "remove" for list fields and "set" to replace a text field or a whole list. Only reflect what the edit actually says; leave everything else out. Return {"changes": []} if the edit does not change the analysis.
+"""
+
 EMAIL_GENERATION_PROMPT = """
 You are a master relationship builder and expert email writer. Using GPT-5's advanced language understanding, generate exceptional networking follow-up emails that demonstrate sophisticated emotional intelligence.
 
@@ -62,3 +127,41 @@ FORMATTING GUIDELINES:
 
 Generate an email that showcases GPT-5's relationship intelligence while staying factually accurate to the conversation provided.
 """
+
+FUSED_ANALYSIS_EMAIL_PROMPT = CONVERSATION_ANALYSIS_PROMPT + EMAIL_GENERATION_PROMPT + """
+Complete both tasks in a single response. Instead of returning the analysis on its own, return one JSON object with this exact format:
+
+{
+  "analysis": { the conversation analysis object in the format described above },
+  "email": {
+    "subject": "Compelling subject line",
+    "body": "Full email body, paragraphs separated by blank lines"
+  }
+}
+
+Write the email from your analysis, following the email guidelines above.
+"""
+
+# Changes to an existing analysis, returned for edited notes instead of a full analysis
+ANALYSIS_PATCH_SCHEMA = {
+    "title": "conversation_analysis_patch",
+    **_object(
+        changes={
+            "type": "array",
+            "items": _object(
+                section=_STRING,
+                field=_STRING,
+                op={"type": "string", "enum": ["add", "remove", "set"]},
+                values=_STRING_LIST,
+            ),
+        },
+    ),
+}
+
+FUSED_ANALYSIS_EMAIL_SCHEMA = {
+    "title": "analysis_and_email",
+    **_object(
+        analysis={key: value for key, value in CONVERSATION_ANALYSIS_SCHEMA.items() if key != "title"},
+        email=_object(subject=_STRING, body=_STRING),
+    ),
+}